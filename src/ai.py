@@ -1,9 +1,11 @@
-from collections import deque
+from functools import cached_property
 from random import choice, shuffle
-from time import time
 from typing import Optional
 
-from data_structs import SeenTiles
+from assignment import assign_food
+from budget import REDUCED_EXPANSIONS, Quality, TurnBudget, smoothed_latency
+from cooperative import CooperativeTruncator, ReservationTable
+from data_structs import FrontierIndex, SeenTiles
 from game_types import (
     UNIT_TYPE_STATS,
     Ant,
@@ -14,21 +16,53 @@ from game_types import (
     PlayerEnemy,
     PlayerMoveCommands,
     PlayerResponse,
-    Tile,
     UnitType,
 )
 from hex import distance, neighbors
+from hierarchy import LONG_TRIP_DISTANCE, MapHierarchy
+from instrumentation import Instrumentation
+from intents import Intent, follow
+from parallel import AntJob, ParallelPlanner, Target, TurnTargets
 from pathfinding import (
-    PathTruncator,
-    bfs_to_nearest_unexplored,
+    DistanceField,
+    PathTruncator,  # noqa: F401, still imported from here
+    ReachEnvelopes,
+    bfs_to_frontier,
     find_min_cost_path_to_any,
+    find_safest_path,
 )
+from replanning import IncrementalPlanner
+from spatial import SpatialIndex
+from threat import ThreatMap
+
+# Ants this close to a visible enemy are planned first
+THREAT_RADIUS = 2
+# Scouts this close to a visible enemy flee instead of exploring
+SCOUT_DANGER_RADIUS = 4
+# While the colony is small, no ant ends its move where it expects this much damage
+DANGEROUS_DAMAGE = UNIT_TYPE_STATS[UnitType.FIGHTER].attack
+# Share of the remaining turn the AI waits for the parallel planner, the rest
+# is left to plan the ants of the workers that did not finish
+PARALLEL_WAIT_SHARE = 0.5
+# Span the planning of each unit type is measured in
+ROLE_SPANS = {
+    UnitType.WORKER: "workers",
+    UnitType.FIGHTER: "fighters",
+    UnitType.SCOUT: "scouts",
+}
 
 
 class AIMemory:
+    """
+    Food and enemies seen so far, by hex, each with a spatial index for
+    radius queries.
+    """
+
     def __init__(self):
         self.food: dict[Hex, FoodOnMap] = {}
         self.enemies: dict[Hex, PlayerEnemy] = {}
+        self.food_index = SpatialIndex()
+        self.enemy_index = SpatialIndex()
 
     def update_food(self, player_response: PlayerResponse):
         current_food_hexes = {
@@ -52,10 +86,12 @@ class AIMemory:
 
         for hex_, food in current_food_hexes.items():
             self.food[hex_] = food
+            self.food_index.add(hex_, food.q, food.r)
 
     def forget_food(self, hex_: Hex):
         if hex_ in self.food:
             del self.food[hex_]
+            self.food_index.remove(hex_)
 
     def get_food_hexes(self):
         return set(self.food.keys())
@@ -80,24 +116,132 @@ class AIMemory:
 
         for hex_, enemy in current_enemies.items():
             self.enemies[hex_] = enemy
+            self.enemy_index.add(hex_, enemy.q, enemy.r)
 
     def forget_enemy(self, hex_: Hex):
         if hex_ in self.enemies:
             del self.enemies[hex_]
+            self.enemy_index.remove(hex_)
 
     def get_enemy_hexes(self):
         return set(self.enemies.keys())
 
 
+class TurnContext:
+    """
+    Turn-level sets the per-ant strategies share, each built on first use and
+    kept for the rest of the turn. It is made at the start of
+    `get_move_commands`, the fields from memory are first read after the
+    memory update of the turn.
+    """
+
+    def __init__(
+        self,
+        player_response: PlayerResponse,
+        memory: AIMemory,
+        seen_tiles: SeenTiles,
+    ):
+        self.player_response = player_response
+        self.memory = memory
+        self.seen_tiles = seen_tiles
+
+    @cached_property
+    def home(self) -> frozenset[Hex]:
+        return frozenset(self.player_response.home)
+
+    @cached_property
+    def enemy_hexes(self) -> frozenset[Hex]:
+        """Enemies in sight this turn."""
+        return frozenset(Hex(e.q, e.r) for e in self.player_response.enemies)
+
+    @cached_property
+    def remembered_enemies(self) -> frozenset[Hex]:
+        """Enemies seen on earlier turns and out of sight now."""
+        return frozenset(self.memory.enemies.keys()) - self.enemy_hexes
+
+    @cached_property
+    def threat(self) -> ThreatMap:
+        """Expected damage per hex from visible and remembered enemies and hills."""
+        memory = self.memory
+        return ThreatMap.build(
+            self.player_response.enemies,
+            [memory.enemies[hex_] for hex_ in self.remembered_enemies],
+            self.seen_tiles.of_type(HexType.ANTHILL) - self.home,
+        )
+
+    @cached_property
+    def food_hexes(self) -> frozenset[Hex]:
+        """Food in sight and remembered."""
+        return frozenset(self.memory.food.keys())
+
+    @cached_property
+    def worker_food(self) -> frozenset[Hex]:
+        """Food workers go for: nectar on enemy hives is left alone."""
+        enemy_hive_hexes = self.seen_tiles.of_type(HexType.ANTHILL) - self.home
+        food = self.memory.food
+        return frozenset(
+            hex_
+            for hex_ in self.food_hexes
+            if not (food[hex_].type == 3 and hex_ in enemy_hive_hexes)  # 3 == NECTAR
+        )
+
+    def food_for(self, ant: Ant) -> frozenset[Hex]:
+        if ant.type == UnitType.WORKER:
+            return self.worker_food
+        return self.food_hexes
+
+
 class AI:
-    def __init__(self):
-        self.seen_tiles = SeenTiles()
+    def __init__(
+        self, workers: int = 0, instrumentation: Optional[Instrumentation] = None
+    ):
+        self.seen_tiles = SeenTiles(dense=True)
         self.taken_destinations: set[Hex] = set()
-        self.path_truncator = PathTruncator(self.seen_tiles, self.taken_destinations)
-        self._scout_bfs_cache = {}  # (ant_pos, unexplored_key) -> path
-        self._scout_bfs_cache_tiles_count = 0
+        self.reservations = ReservationTable()
+        # ant id -> everything the ant can reach this turn, shared by all local moves
+        self.envelopes = ReachEnvelopes(self.seen_tiles)
+        self.path_truncator = CooperativeTruncator(
+            self.seen_tiles, self.taken_destinations, self.reservations, self.envelopes
+        )
+        # seen hexes out of sight this turn, minus known food
+        self.frontier = FrontierIndex(self.seen_tiles)
+        self._scout_bfs_cache = {}  # ant_pos -> path, for one frontier version
+        self._scout_bfs_cache_version = -1
         self.memory = AIMemory()
         self.same_place_counter: dict[Hex, tuple[str, int]] = {}
+        self.hive_field: Optional[DistanceField] = None
+        # ant id -> search state towards the goal it picked on an earlier turn
+        self.ant_planners: dict[str, IncrementalPlanner] = {}
+        self.map_hierarchy = MapHierarchy(self.seen_tiles)
+        # ant id -> food hex picked for it by this turn's batch assignment
+        self.food_assignment: dict[str, Hex] = {}
+        # seconds our moves need to reach the server, measured by the caller
+        self.network_latency = 0.2
+        self.budget = TurnBudget(0)
+        # node expansions the searches of the ant being planned may use
+        self.search_limit: Optional[int] = None
+        # with workers, the long searches of the turn run on a process pool
+        self.planner = ParallelPlanner(self.seen_tiles, workers) if workers else None
+        # ant id -> path planned by the pool this turn, checked before use
+        self.planned_paths: dict[str, list[Hex]] = {}
+        self.turn: Optional[TurnContext] = None
+        # ant id -> where the ant is headed, recorded this turn and checked
+        # against the ant's position on the next one
+        self.intents: dict[str, Intent] = {}
+        self.previous_intents: dict[str, Intent] = {}
+        self.kept_intents = 0
+        # ant id -> target of a path found this turn that stops short of it
+        self.path_targets: dict[str, Hex] = {}
+        # nested spans of what each phase and search of the turn cost
+        self.instrumentation = instrumentation or Instrumentation()
+
+    def close(self):
+        if self.planner is not None:
+            self.planner.close()
+
+    def record_latency(self, seconds: float):
+        """Fold one measured request round trip into `network_latency`."""
+        self.network_latency = smoothed_latency(self.network_latency, seconds)
 
     # Pathfinding logic moved to pathfinding.py
     # def _bfs_to_nearest_unexplored ...
@@ -132,14 +276,16 @@ class AI:
 
     def _pick_valid_neighbor(
         self,
-        ant_pos: Hex,
+        ant: Ant,
         exclude: Optional[set[Hex]] = None,
         not_on_food: Optional[set[Hex]] = None,
-        not_stone: bool = False,
         not_on_hive: Optional[set[Hex]] = None,
     ) -> Optional[Hex]:
-        """Pick a valid neighbor for fallback movement, with optional filters."""
-        neighbors_list = list(neighbors(ant_pos))
+        """
+        Pick a neighbor the ant can step on this turn for fallback movement,
+        with optional filters.
+        """
+        neighbors_list = self.envelopes.of(ant).first_steps()
         shuffle(neighbors_list)
         for neighbor in neighbors_list:
             if exclude and neighbor in exclude:
@@ -148,245 +294,384 @@ class AI:
                 continue
             if not_on_hive and neighbor in not_on_hive:
                 continue
-            if not_stone:
-                tile = self.seen_tiles.get(neighbor)
-                if not tile or tile.type == HexType.STONE:
-                    continue
             return neighbor
         return None
 
-    def _mark_taken_destinations(self, path: list[Hex]):
-        for hex in path:
-            self.taken_destinations.add(hex)
-
-    def _get_cached_scout_path(
-        self, ant_pos: Hex, unexplored: set[Hex], food_hexes: set[Hex]
-    ) -> list[Hex]:
-        unexplored_key = (ant_pos, frozenset(unexplored))
-        # Invalidate cache if new tiles were added
-        if len(self.seen_tiles) != self._scout_bfs_cache_tiles_count:
+    def _mark_taken_destinations(self, ant: Ant, path: list[Hex]):
+        """
+        The hexes `ant` passes are reserved only for the step it is on them,
+        the hex it ends on stays taken for the whole turn.
+        """
+        if not path:
+            return
+        self.reservations.reserve(ant.id, Hex(ant.q, ant.r), path)
+        self.taken_destinations.add(path[-1])
+
+    def _truncate(self, ant: Ant, path: list[Hex] | DistanceField) -> list[Hex]:
+        """The part of `path` the ant moves this turn, around other ants' moves."""
+        with self.instrumentation.span("truncate"):
+            return self.path_truncator.truncate(ant, path)
+
+    def _get_cached_scout_path(self, ant_pos: Hex) -> list[Hex]:
+        # the frontier version changes with every change of its hexes
+        if self.frontier.version != self._scout_bfs_cache_version:
             self._scout_bfs_cache.clear()
-            self._scout_bfs_cache_tiles_count = len(self.seen_tiles)
-        if unexplored_key in self._scout_bfs_cache:
-            return self._scout_bfs_cache[unexplored_key]
-        min_path = bfs_to_nearest_unexplored(
-            ant_pos, unexplored, food_hexes, self.seen_tiles
-        )
-        self._scout_bfs_cache[unexplored_key] = min_path
+            self._scout_bfs_cache_version = self.frontier.version
+        if ant_pos in self._scout_bfs_cache:
+            return self._scout_bfs_cache[ant_pos]
+        with self.instrumentation.span("frontier search"):
+            min_path = bfs_to_frontier(
+                ant_pos,
+                self.frontier,
+                self.seen_tiles,
+                max_expansions=self.search_limit,
+            )
+        # a capped search that found nothing may have stopped short
+        if min_path or self.search_limit is None:
+            self._scout_bfs_cache[ant_pos] = min_path
         return min_path
 
-    def move_to_hive(self, ant: Ant, player_response: PlayerResponse) -> AntMoveCommand:
+    def _path_to(self, ant: Ant, goal: Hex) -> list[Hex]:
+        """
+        Path to a single `goal`: long trips go through the cluster hierarchy,
+        shorter ones repair the ant's incremental search.
+        """
         ant_pos = Hex(ant.q, ant.r)
-        min_path = find_min_cost_path_to_any(
-            ant_pos, set(player_response.home), self.seen_tiles, self.taken_destinations
+        if distance(ant_pos, goal) >= LONG_TRIP_DISTANCE:
+            speed = UNIT_TYPE_STATS[UnitType(ant.type)].speed
+            # the truncator looks this far ahead along the path
+            with self.instrumentation.span("hierarchy search"):
+                min_path = self.map_hierarchy.find_path(
+                    ant_pos,
+                    goal,
+                    self.taken_destinations,
+                    refine_cost=2 * speed,
+                    max_expansions=self.search_limit,
+                )
+            if min_path:
+                if min_path[-1] != goal:
+                    # refined only up to a cluster entrance
+                    self.path_targets[ant.id] = goal
+                return min_path
+        planner = self.ant_planners.get(ant.id)
+        if planner is None or planner.goal != goal:
+            planner = self.ant_planners[ant.id] = IncrementalPlanner(goal)
+        with self.instrumentation.span("replan"):
+            return planner.plan(
+                ant_pos,
+                self.seen_tiles,
+                self.taken_destinations,
+                max_expansions=self.search_limit,
+            )
+
+    def _intent_path(
+        self, ant: Ant, targets, blocked: Optional[set[Hex]] = None
+    ) -> list[Hex]:
+        """
+        The rest of the path the ant followed last turn, while it still leads
+        to one of `targets` and nothing broke it (see `Intent.valid`).
+        """
+        intent = self.previous_intents.get(ant.id)
+        if intent is None or self._threatened(
+            ant, self.turn.enemy_hexes, THREAT_RADIUS
+        ):
+            return []
+        if not intent.valid(Hex(ant.q, ant.r), targets, blocked, self.seen_tiles):
+            return []
+        self.kept_intents += 1
+        if intent.target is not None:
+            self.path_targets[ant.id] = intent.target
+        return intent.path
+
+    def _follow(self, ant: Ant, full_path: list[Hex], move_path: list[Hex]):
+        """Remember where `ant` is headed after sending it along `move_path`."""
+        intent = follow(
+            full_path,
+            move_path,
+            self.seen_tiles,
+            self.turn.player_response.turnNo,
+            self.path_targets.pop(ant.id, None),
         )
-        move_path = self.path_truncator.truncate(ant, min_path)
-        self._mark_taken_destinations(move_path)
-        return AntMoveCommand(ant=ant.id, path=move_path)
+        if intent is not None:
+            self.intents[ant.id] = intent
 
-    def go_to_food(self, ant: Ant, player_response: PlayerResponse) -> AntMoveCommand:
+    def _planned_path(
+        self, ant: Ant, targets, blocked: Optional[set[Hex]] = None
+    ) -> list[Hex]:
+        """
+        The pool's path for `ant` if it still ends on one of `targets` and
+        stays off `blocked`: ants of other groups may have claimed its hexes
+        since, the ant is then planned here instead.
+        """
+        path = self.planned_paths.get(ant.id)
+        if not path or path[-1] not in targets:
+            return []
+        if blocked and any(h in blocked for h in path):
+            return []
+        return path
+
+    def _find_path_keeping_goal(self, ant: Ant, targets: set[Hex]) -> list[Hex]:
+        """
+        Keep heading to the goal picked on an earlier turn while it is still
+        one of `targets`, repairing the previous search instead of starting
+        over. Otherwise search all `targets` from scratch and remember the pick.
+        """
         ant_pos = Hex(ant.q, ant.r)
-        # Use both current and remembered food
-        food_hexes = set(Hex(food.q, food.r) for food in player_response.food)
-        memory_food_hexes = self.memory.get_food_hexes()
-        all_food_hexes = food_hexes | memory_food_hexes
-
-        # --- Filter NECTAR on enemy hives for WORKER ants ---
-        if ant.type == UnitType.WORKER:
-            # Identify all anthill tiles
-            home_hexes = set(player_response.home)
-            anthill_hexes = set(
-                Hex(tile.q, tile.r)
-                for tile in player_response.map
-                if tile.type == HexType.ANTHILL
-            )
-            enemy_hive_hexes = anthill_hexes - home_hexes
-            # Build a set of food hexes that are NECTAR on enemy hives
-            nectar_on_enemy_hive = set(
-                Hex(food.q, food.r)
-                for food in player_response.food
-                if food.type == 3
-                and Hex(food.q, food.r) in enemy_hive_hexes  # 3 == FoodType.NECTAR
-            )
-            # Also filter from memory
-            nectar_on_enemy_hive |= set(
-                hex_
-                for hex_ in memory_food_hexes
-                if ((self.memory.food[hex_].type == 3) and (hex_ in enemy_hive_hexes))
+        min_path = self._intent_path(ant, targets, self.taken_destinations)
+        if min_path:
+            return min_path
+        min_path = self._planned_path(ant, targets, self.taken_destinations)
+        if min_path:
+            self.ant_planners[ant.id] = IncrementalPlanner(min_path[-1])
+            return min_path
+        planner = self.ant_planners.get(ant.id)
+        if (
+            planner is not None
+            and planner.goal in targets
+            and planner.goal not in self.taken_destinations
+        ):
+            min_path = self._path_to(ant, planner.goal)
+            if min_path:
+                return min_path
+        if len(targets) == 1:
+            # a single target needs no search to pick it
+            (goal,) = targets
+            if goal not in self.taken_destinations and goal != ant_pos:
+                min_path = self._path_to(ant, goal)
+                if min_path:
+                    return min_path
+        with self.instrumentation.span("search"):
+            min_path = find_min_cost_path_to_any(
+                ant_pos,
+                targets,
+                self.seen_tiles,
+                self.taken_destinations,
+                max_expansions=self.search_limit,
+                astar=True,
             )
-            all_food_hexes = all_food_hexes - nectar_on_enemy_hive
-        # --- End filter ---
+        if min_path:
+            self.ant_planners[ant.id] = IncrementalPlanner(min_path[-1])
+        return min_path
+
+    def move_to_hive(self, ant: Ant, player_response: PlayerResponse) -> AntMoveCommand:
+        move_path = []
+        if self.hive_field is not None:
+            move_path = self._truncate(ant, self.hive_field)
+        if not move_path:
+            # the shared field ignores paths claimed this turn, search around them
+            ant_pos = Hex(ant.q, ant.r)
+            with self.instrumentation.span("search"):
+                min_path = find_min_cost_path_to_any(
+                    ant_pos,
+                    self.turn.home,
+                    self.seen_tiles,
+                    self.taken_destinations,
+                    max_expansions=self.search_limit,
+                )
+            move_path = self._truncate(ant, min_path)
+        self._mark_taken_destinations(ant, move_path)
+        return AntMoveCommand(ant=ant.id, path=move_path)
 
+    def go_to_food(self, ant: Ant, player_response: PlayerResponse) -> AntMoveCommand:
         # Exclude food hexes already taken by other ants
-        available_food_hexes = all_food_hexes - self.taken_destinations
+        available_food_hexes = self.turn.food_for(ant) - self.taken_destinations
         if not available_food_hexes:
             return AntMoveCommand(ant=ant.id, path=[])
-        min_path = find_min_cost_path_to_any(
-            ant_pos, available_food_hexes, self.seen_tiles, self.taken_destinations
-        )
-        move_path = self.path_truncator.truncate(ant, min_path)
-        self._mark_taken_destinations(move_path)
+        min_path = []
+        assigned_food = self.food_assignment.get(ant.id)
+        if assigned_food in available_food_hexes:
+            min_path = self._find_path_keeping_goal(ant, {assigned_food})
+        if not min_path:
+            min_path = self._find_path_keeping_goal(ant, available_food_hexes)
+        move_path = self._truncate(ant, min_path)
+        self._mark_taken_destinations(ant, move_path)
+        self._follow(ant, min_path, move_path)
         return AntMoveCommand(ant=ant.id, path=move_path)
 
     def move_scout_explore(
         self, ant: Ant, player_response: PlayerResponse
     ) -> AntMoveCommand:
-        seen_hexes = set(self.seen_tiles.keys())
-        known_hexes = set(Hex(tile.q, tile.r) for tile in player_response.map)
-        unexplored = seen_hexes - known_hexes
-        food_hexes = set(Hex(food.q, food.r) for food in self.memory.get_food_hexes())
-        unexplored = unexplored - food_hexes
-        DANGER_RADIUS = 4
+        food_hexes = self.turn.food_hexes
         ant_pos = Hex(ant.q, ant.r)
-        enemy_hexes = set(Hex(e.q, e.r) for e in player_response.enemies)
-        close_enemies = [
-            e for e in enemy_hexes if distance(ant_pos, e) <= DANGER_RADIUS
-        ]
-        if close_enemies:
-            # Flee: find the most distant reachable hex from all enemies within speed
-
-            speed = UNIT_TYPE_STATS[UnitType(ant.type)].speed
-            visited = set()
-            queue = deque()
-            queue.append((ant_pos, [ant_pos], 0))  # (current, path, cost)
-            best_path = None
-            best_min_dist = -1
-            while queue:
-                curr, path, cost = queue.popleft()
-                if curr in visited:
-                    continue
-                visited.add(curr)
-                if cost > speed:
-                    continue
-                # Only consider non-initial positions for fleeing
-                if curr != ant_pos:
-                    tile = self.seen_tiles.get(curr)
-                    if not tile or tile.type == HexType.STONE:
-                        continue
-                    if curr in self.taken_destinations or curr in food_hexes:
-                        continue
-                    min_dist = (
-                        min(distance(curr, e) for e in enemy_hexes)
-                        if enemy_hexes
-                        else 999
-                    )
-                    if min_dist > best_min_dist or (
-                        min_dist == best_min_dist and best_path is None
-                    ):
-                        best_min_dist = min_dist
-                        best_path = path[1:]  # exclude start
-                for neighbor in neighbors(curr):
-                    if neighbor in visited:
-                        continue
-                    tile = self.seen_tiles.get(neighbor)
-                    if not tile or tile.type == HexType.STONE:
-                        continue
-                    step_cost = 1
-                    if tile.type == HexType.DIRT:
-                        step_cost = 2
-                    if cost + step_cost > speed:
-                        continue
-                    queue.append((neighbor, path + [neighbor], cost + step_cost))
+        enemy_hexes = self.turn.enemy_hexes
+        if self._threatened(ant, enemy_hexes, SCOUT_DANGER_RADIUS):
+            # Flee: find the reachable hex with the least expected damage
+            with self.instrumentation.span("flee search"):
+                best_path = find_safest_path(
+                    self.envelopes.of(ant),
+                    self.turn.threat,
+                    self.taken_destinations | food_hexes,
+                )
             if best_path:
-                self._mark_taken_destinations(best_path)
+                self._mark_taken_destinations(ant, best_path)
                 return AntMoveCommand(ant=ant.id, path=best_path)
             # fallback: if all are blocked, just pick any non-taken neighbor
-            fallback = self._pick_valid_neighbor(
-                ant_pos, exclude=self.taken_destinations
-            )
+            fallback = self._pick_valid_neighbor(ant, exclude=self.taken_destinations)
             if fallback:
                 self.taken_destinations.add(fallback)
                 return AntMoveCommand(ant=ant.id, path=[fallback])
             return AntMoveCommand(ant=ant.id, path=[])
-        if not unexplored:
+        if not self.frontier:
             # fallback: move to random neighbor not on food
             fallback = self._pick_valid_neighbor(
-                ant_pos, exclude=self.taken_destinations, not_on_food=food_hexes
+                ant, exclude=self.taken_destinations, not_on_food=food_hexes
             )
             if fallback:
                 self.taken_destinations.add(fallback)
                 return AntMoveCommand(ant=ant.id, path=[fallback])
             # if all neighbors are food or taken, just pick any
-            fallback = self._pick_valid_neighbor(
-                ant_pos, exclude=self.taken_destinations
-            )
+            fallback = self._pick_valid_neighbor(ant, exclude=self.taken_destinations)
             if fallback:
                 self.taken_destinations.add(fallback)
                 return AntMoveCommand(ant=ant.id, path=[fallback])
             return AntMoveCommand(ant=ant.id, path=[])
-        min_path = self._get_cached_scout_path(ant_pos, unexplored, food_hexes)
-        move_path = self.path_truncator.truncate(ant, min_path)
+        min_path = self._intent_path(ant, self.frontier)
+        if not min_path:
+            min_path = self._planned_path(ant, self.frontier)
+        if not min_path:
+            min_path = self._get_cached_scout_path(ant_pos)
+        move_path = self._truncate(ant, min_path)
         while move_path and move_path[-1] in food_hexes:
             move_path = move_path[:-1]
-        self._mark_taken_destinations(move_path)
+        self._mark_taken_destinations(ant, move_path)
+        self._follow(ant, min_path, move_path)
         return AntMoveCommand(ant=ant.id, path=move_path)
 
     def move_to_enemy(
         self, ant: Ant, player_response: PlayerResponse
     ) -> AntMoveCommand:
-        ant_pos = Hex(ant.q, ant.r)
-        current_enemies = set(Hex(e.q, e.r) for e in player_response.enemies)
-        remembered_enemies = self.memory.get_enemy_hexes() - current_enemies
-        min_path = find_min_cost_path_to_any(
-            ant_pos, current_enemies, self.seen_tiles, self.taken_destinations
-        )
+        current_enemies = self.turn.enemy_hexes
+        remembered_enemies = self.turn.remembered_enemies
+        min_path = self._find_path_keeping_goal(ant, current_enemies)
         if not min_path and remembered_enemies:
-            min_path = find_min_cost_path_to_any(
-                ant_pos, remembered_enemies, self.seen_tiles, self.taken_destinations
-            )
-        move_path = self.path_truncator.truncate(ant, min_path)
-        self._mark_taken_destinations(move_path)
+            min_path = self._find_path_keeping_goal(ant, remembered_enemies)
+        move_path = self._truncate(ant, min_path)
+        self._mark_taken_destinations(ant, move_path)
+        self._follow(ant, min_path, move_path)
         return AntMoveCommand(ant=ant.id, path=move_path)
 
-    def timeit(self, label: str, func, *args, **kwargs):
-        start_time = time()
-        result = func(*args, **kwargs)
-        end_time = time()
-        diff = end_time - start_time
-        if diff > 0.1:
-            print(f"{label} in {diff} seconds")
-        return result
-
     def unstuck(self, ant: Ant, player_response: PlayerResponse) -> AntMoveCommand:
         ant_pos = Hex(ant.q, ant.r)
-        # Build set of hive (anthill) tiles
-        hive_hexes = set(
-            Hex(tile.q, tile.r)
-            for tile in self.seen_tiles.values()
-            if tile.type == HexType.ANTHILL
-        )
+        hive_hexes = self.seen_tiles.of_type(HexType.ANTHILL)
         fallback = self._pick_valid_neighbor(
-            ant_pos, exclude=self.taken_destinations, not_on_hive=hive_hexes
+            ant, exclude=self.taken_destinations, not_on_hive=hive_hexes
         )
         if fallback:
             self.taken_destinations.add(fallback)
             return AntMoveCommand(ant=ant.id, path=[fallback])
         print(f"Ant {ant} is stuck")
-        # As a last resort, pick any neighbor not on hive
-        neighbors_list = [n for n in neighbors(ant_pos) if n not in hive_hexes]
-        # remove stone and acid from neighbors list
-        neighbors_list = [
-            n
-            for n in neighbors_list
-            if n not in self.taken_destinations
-            and self.seen_tiles.get(n, Tile(cost=0, q=0, r=0, type=HexType.EMPTY)).type
-            != HexType.STONE
-            and self.seen_tiles.get(n, Tile(cost=0, q=0, r=0, type=HexType.EMPTY)).type
-            != HexType.ACID
-        ]
+        # As a last resort, pick any neighbor not on hive, taken, stone or acid,
+        # unseen ones included
+        neighbors_list = []
+        for n in neighbors(ant_pos):
+            if n in hive_hexes or n in self.taken_destinations:
+                continue
+            tile = self.seen_tiles.get(n)
+            if tile is not None and tile.type in (HexType.STONE, HexType.ACID):
+                continue
+            neighbors_list.append(n)
         if neighbors_list:
             return AntMoveCommand(ant=ant.id, path=[choice(neighbors_list)])
-        # If all neighbors are hives (very rare), just pick any
+        # If all neighbors are ruled out (very rare), just pick any
         neighbors_list = list(neighbors(ant_pos))
         return AntMoveCommand(ant=ant.id, path=[choice(neighbors_list)])
 
-    def get_move_commands(self, player_response: PlayerResponse) -> PlayerMoveCommands:
-        new_tiles = self.seen_tiles.update(player_response.map)
+    def _limit_searches(self) -> Quality:
+        """Check the budget and cap the next searches to it."""
+        quality = self.budget.quality()
+        self.search_limit = None if quality == Quality.FULL else REDUCED_EXPANSIONS
+        return quality
+
+    def _plan_quality(self) -> Quality:
+        """Check the budget before planning an ant and cap its searches to it."""
+        quality = self._limit_searches()
+        self.budget.record(quality)
+        return quality
+
+    def _threatened(self, ant: Ant, enemy_hexes: set[Hex], radius: int) -> bool:
+        # remembered enemies out of sight may have moved on, only fear visible ones
+        close = self.memory.enemy_index.within(Hex(ant.q, ant.r), radius)
+        return any(e in enemy_hexes for e in close)
+
+    def _in_priority_order(self, ants: list[Ant], enemy_hexes: set[Hex]) -> list[Ant]:
+        """Ants next to visible enemies first, they lose most by being planned late."""
+        return sorted(
+            ants, key=lambda ant: not self._threatened(ant, enemy_hexes, THREAT_RADIUS)
+        )
+
+    def _plan_in_parallel(
+        self, ants: list[Ant], player_response: PlayerResponse
+    ) -> dict[str, list[Hex]]:
+        """
+        Search the targets `go_to_food`, `move_to_enemy` and
+        `move_scout_explore` would search for `ants`, on the planner's pool.
+        """
+        enemy_hexes = self.turn.enemy_hexes
+        jobs = []
+        for ant in ants:
+            intent = self.previous_intents.get(ant.id)
+            if intent is not None and intent.path[0] == Hex(ant.q, ant.r):
+                # most likely still on track, checked when the ant is moved
+                continue
+            if ant.type == UnitType.SCOUT:
+                # fleeing scouts only look as far as they can go this turn
+                if self.frontier and not self._threatened(
+                    ant, enemy_hexes, SCOUT_DANGER_RADIUS
+                ):
+                    jobs.append(AntJob(ant.id, ant.q, ant.r, Target.FRONTIER))
+            elif ant.type == UnitType.FIGHTER:
+                if enemy_hexes:
+                    jobs.append(AntJob(ant.id, ant.q, ant.r, Target.ENEMY))
+            else:
+                goal = self.food_assignment.get(ant.id)
+                target = Target.FOOD if goal is None else Target.GOAL
+                jobs.append(AntJob(ant.id, ant.q, ant.r, target, goal))
+        if not jobs:
+            return {}
+        targets = TurnTargets.of(
+            self.taken_destinations,
+            self.frontier.hexes,
+            self.turn.worker_food - self.taken_destinations,
+            enemy_hexes,
+        )
+        timeout = None
+        if not self.budget.unbounded:
+            timeout = max(PARALLEL_WAIT_SHARE * self.budget.remaining(), 0)
+        return self.planner.plan(
+            jobs, targets, max_expansions=self.search_limit, timeout=timeout
+        )
+
+    def _set_up_turn(self, player_response: PlayerResponse):
+        """Take in the response and build the hexes no ant may end on."""
+        spans = self.instrumentation
+        self.turn = TurnContext(player_response, self.memory, self.seen_tiles)
+        with spans.span("seen tiles"):
+            new_tiles = self.seen_tiles.update(
+                player_response.map, player_response.turnNo
+            )
+        spans.count("new tiles", len(new_tiles))
         print(
             f"Seen tiles: {len(self.seen_tiles)}, new tiles: {len(new_tiles)}, map: {len(player_response.map)}, ants: {len(player_response.ants)}"
         )
 
-        self.taken_destinations = set()
+        with spans.span("memory"):
+            self.memory.update_enemies(player_response)
+            self.memory.update_food(player_response)
+
+        with spans.span("blocked set"):
+            self._build_taken_destinations(player_response)
+        spans.count("blocked hexes", len(self.taken_destinations))
+
+        with spans.span("frontier"):
+            self.frontier.update(player_response.map, self.turn.food_hexes)
+
+    def _build_taken_destinations(self, player_response: PlayerResponse):
+        # clear in place: the path truncator holds a reference to this set
+        self.taken_destinations.clear()
+        self.reservations.clear()
+        self.envelopes.clear()
+        for ant in player_response.ants:
+            self.reservations.reserve_start(ant.id, Hex(ant.q, ant.r))
 
         # add main hive to taken destinations if we have less than 100 ants
         if len(player_response.ants) < 100:
@@ -395,42 +680,81 @@ class AI:
             )
 
         # add stones and acid to taken destinations
-        for tile in self.seen_tiles.values():
-            if player_response.turnNo > 200:
-                if tile.type == HexType.STONE:
-                    self.taken_destinations.add(Hex(tile.q, tile.r))
-            else:
-                if tile.type == HexType.STONE or tile.type == HexType.ACID:
-                    self.taken_destinations.add(Hex(tile.q, tile.r))
+        self.taken_destinations |= self.seen_tiles.of_type(HexType.STONE)
+        if player_response.turnNo <= 200:
+            self.taken_destinations |= self.seen_tiles.of_type(HexType.ACID)
 
         # add enemies to taken destinations
-        enemy_hexes = set(Hex(e.q, e.r) for e in player_response.enemies)
+        enemy_hexes = self.turn.enemy_hexes
         self.taken_destinations |= enemy_hexes
 
         if len(player_response.ants) < 70:
-            print("Adding fighter enemies neighbor tiles to taken destinations")
-            # add fighter enemies neighbor tiles to taken destinations
-            warrior_enemies = [
-                e for e in player_response.enemies if e.type == UnitType.FIGHTER
-            ]
-            for enemy in warrior_enemies:
-                for neighbor in neighbors(Hex(enemy.q, enemy.r)):
-                    self.taken_destinations.add(neighbor)
+            # keep out of reach of enemies that hit hard or gang up
+            self.taken_destinations.update(
+                self.turn.threat.hexes_at_least(DANGEROUS_DAMAGE)
+            )
 
         # add food near enemies to taken destinations
         FOOD_NEAR_ENEMY_RADIUS = 3
-        food_hexes = self.memory.get_food_hexes()
-        for food_hex in food_hexes:
-            counter = 0
-            for enemy_hex in enemy_hexes:
-                if distance(food_hex, enemy_hex) <= FOOD_NEAR_ENEMY_RADIUS:
-                    counter += 1
-            if counter > 2:
-                print(f"Food near enemy: {food_hex}, counter: {counter}")
-                self.taken_destinations.add(food_hex)
-
-        self.memory.update_enemies(player_response)
-        self.memory.update_food(player_response)
+        if enemy_hexes:
+            enemy_index = self.memory.enemy_index
+            for food_hex in self.turn.food_hexes:
+                counter = sum(
+                    1
+                    for e in enemy_index.within(food_hex, FOOD_NEAR_ENEMY_RADIUS)
+                    if e in enemy_hexes
+                )
+                if counter > 2:
+                    print(f"Food near enemy: {food_hex}, counter: {counter}")
+                    self.taken_destinations.add(food_hex)
+
+    def get_move_commands(
+        self, player_response: PlayerResponse, received_at: Optional[float] = None
+    ) -> PlayerMoveCommands:
+        """
+        Moves of this turn. `received_at` is the `time.perf_counter` time the
+        response arrived at, the time since then comes off the budget.
+        """
+        # the server starts the next turn in `nextTurnIn`, our moves must be
+        # there before it
+        self.budget = TurnBudget(
+            player_response.nextTurnIn, self.network_latency, start=received_at
+        )
+        spans = self.instrumentation
+        spans.start_turn(player_response.turnNo)
+        with spans.span("setup"):
+            self._set_up_turn(player_response)
+        enemy_hexes = self.turn.enemy_hexes
+
+        # one shared search from the hive for every ant carrying food,
+        # also giving the trip back from every food tile for the food assignment
+        carrier_hexes = set(
+            Hex(ant.q, ant.r) for ant in player_response.ants if ant.food.amount > 0
+        )
+        food_hexes = self.turn.food_hexes
+        self.hive_field = None
+        if carrier_hexes or food_hexes:
+            self._limit_searches()
+            with spans.span("hive field"):
+                self.hive_field = DistanceField(
+                    player_response.home,
+                    self.seen_tiles,
+                    self.taken_destinations,
+                    stop_at=carrier_hexes | food_hexes,
+                    max_expansions=self.search_limit,
+                )
+
+        # intents are kept only by ants that follow them again this turn
+        self.previous_intents = self.intents
+        self.intents = {}
+        self.kept_intents = 0
+        self.path_targets.clear()
+
+        # forget the goals of ants that died
+        ant_ids = set(ant.id for ant in player_response.ants)
+        for ant_id in list(self.ant_planners):
+            if ant_id not in ant_ids:
+                del self.ant_planners[ant_id]
 
         self._update_same_place_counter(player_response.ants)
         moves: list[AntMoveCommand] = []
@@ -438,17 +762,14 @@ class AI:
 
         for ant in player_response.ants:
             if ant.food.amount > 0:
-                move = self.timeit(
-                    f"Ant {ant} moved to hive",
-                    self.move_to_hive,
-                    ant,
-                    player_response,
-                )
                 already_moved_ants.add(ant.id)
-                if move.path:
-                    moves.append(move)
-                else:
-                    moves.append(self.unstuck(ant, player_response))
+                if self._plan_quality() == Quality.SKIPPED:
+                    continue
+                with spans.span("carriers"):
+                    move = self.move_to_hive(ant, player_response)
+                    if not move.path:
+                        move = self.unstuck(ant, player_response)
+                moves.append(move)
 
         for ant in player_response.ants:
             move = self.unstuck_same_place(ant, player_response)
@@ -456,40 +777,68 @@ class AI:
                 moves.append(move)
                 already_moved_ants.add(ant.id)
 
-        for ant in player_response.ants:
-            move = None
-            if ant.id in already_moved_ants:
-                continue
-            elif ant.type == UnitType.SCOUT:
-                move = self.timeit(
-                    f"Ant {ant} explore map",
-                    self.move_scout_explore,
-                    ant,
-                    player_response,
+        # match all food-bound workers to food at once instead of first come
+        # first served, go_to_food then heads for the assigned tile
+        food_workers = [
+            ant
+            for ant in player_response.ants
+            if ant.id not in already_moved_ants and ant.type == UnitType.WORKER
+        ]
+        self.food_assignment = {}
+        if food_workers and self.budget.quality() == Quality.FULL:
+            worker_food_hexes = self.turn.worker_food
+            # workers still on their way keep their food, the rest share what is left
+            for ant in food_workers:
+                intent = self.previous_intents.get(ant.id)
+                if intent is not None and intent.valid(
+                    Hex(ant.q, ant.r),
+                    worker_food_hexes,
+                    self.taken_destinations,
+                    self.seen_tiles,
+                ):
+                    self.food_assignment[ant.id] = intent.goal
+            kept_goals = set(self.food_assignment.values())
+            with spans.span("food assignment"):
+                self.food_assignment |= assign_food(
+                    [ant for ant in food_workers if ant.id not in self.food_assignment],
+                    {
+                        hex_: self.memory.food[hex_]
+                        for hex_ in worker_food_hexes - kept_goals
+                    },
+                    self.seen_tiles,
+                    self.taken_destinations,
+                    self.hive_field,
                 )
-            elif ant.type == UnitType.FIGHTER:
-                move = self.timeit(
-                    f"Ant {ant} attack enemy",
-                    self.move_to_enemy,
-                    ant,
+
+        self.planned_paths = {}
+        if self.planner is not None:
+            self._limit_searches()
+            with spans.span("parallel planning"):
+                self.planned_paths = self._plan_in_parallel(
+                    [a for a in player_response.ants if a.id not in already_moved_ants],
                     player_response,
                 )
+
+        for ant in self._in_priority_order(player_response.ants, enemy_hexes):
+            if ant.id in already_moved_ants:
+                continue
+            elif self._plan_quality() == Quality.SKIPPED:
+                # out of time, the ant stays where it is
+                continue
+            with spans.span(ROLE_SPANS[ant.type]):
+                if ant.type == UnitType.SCOUT:
+                    move = self.move_scout_explore(ant, player_response)
+                elif ant.type == UnitType.FIGHTER:
+                    move = self.move_to_enemy(ant, player_response)
+                    if not move.path:
+                        move = self.go_to_food(ant, player_response)
+                else:
+                    move = self.go_to_food(ant, player_response)
                 if not move.path:
-                    move = self.timeit(
-                        f"Ant {ant} moved to food",
-                        self.go_to_food,
-                        ant,
-                        player_response,
-                    )
-            else:
-                move = self.timeit(
-                    f"Ant {ant} moved to food",
-                    self.go_to_food,
-                    ant,
-                    player_response,
-                )
-            if move.path:
-                moves.append(move)
-            else:
-                moves.append(self.unstuck(ant, player_response))
+                    move = self.unstuck(ant, player_response)
+            moves.append(move)
+        spans.count("moves", len(moves))
+        spans.count("kept intents", self.kept_intents)
+        print(self.budget.summary())
+        print(f"Kept {self.kept_intents} ant intents")
         return PlayerMoveCommands(moves=moves)
@@ -0,0 +1,126 @@
+"""
+Batch assignment of worker ants to food tiles.
+
+Every ant gets a few candidate food tiles from one bounded search, each pair
+is valued by the calories the ant can bring home per step of the round trip,
+and the auction algorithm picks the matching with the highest total value.
+"""
+
+from collections import deque
+from typing import Hashable, Iterable, Optional, Set, TypeVar
+
+from data_structs import VERY_LARGE_INT, SeenTiles
+from game_types import (
+    FOOD_TYPE_STATS,
+    UNIT_TYPE_STATS,
+    Ant,
+    FoodOnMap,
+    FoodType,
+    Hex,
+    UnitType,
+)
+from pathfinding import DistanceField, SearchSpace
+from search import best_first_search
+
+P = TypeVar("P", bound=Hashable)
+O = TypeVar("O", bound=Hashable)
+
+# Food tiles each ant considers, closest first
+CANDIDATES_PER_ANT = 6
+# Bound on nodes expanded while looking for an ant's candidates
+MAX_CANDIDATE_EXPANSIONS = 3000
+
+
+def auction_assignment(
+    benefits: dict[P, dict[O, float]], eps: Optional[float] = None
+) -> dict[P, O]:
+    """
+    Bertsekas' auction for a one-to-one assignment maximizing total benefit.
+    `benefits[person][object]` lists only the allowed pairs; a person may stay
+    unassigned, which is worth 0. The total is within `len(benefits) * eps`
+    of the optimum.
+    """
+    if eps is None:
+        top = max((b for row in benefits.values() for b in row.values()), default=0)
+        eps = max(top, 1.0) / 1000
+    prices: dict[O, float] = {}
+    owner: dict[O, P] = {}
+    assigned: dict[P, O] = {}
+    queue = deque(benefits)
+    while queue:
+        person = queue.popleft()
+        best, best_value, second_value = None, 0.0, 0.0
+        for obj, benefit in benefits[person].items():
+            value = benefit - prices.get(obj, 0.0)
+            if value > best_value:
+                best, best_value, second_value = obj, value, best_value
+            elif value > second_value:
+                second_value = value
+        if best is None:
+            # nothing is worth its price, staying unassigned is the best bid
+            continue
+        prices[best] = prices.get(best, 0.0) + best_value - second_value + eps
+        previous = owner.get(best)
+        owner[best] = person
+        assigned[person] = best
+        if previous is not None:
+            del assigned[previous]
+            queue.append(previous)
+    return assigned
+
+
+def food_value(ant: Ant, food: FoodOnMap) -> int:
+    """Calories `ant` can carry away from `food` in one trip."""
+    capacity = UNIT_TYPE_STATS[UnitType(ant.type)].capacity
+    calories = FOOD_TYPE_STATS[FoodType(food.type)].calories
+    return min(food.amount, capacity) * calories
+
+
+def assign_food(
+    ants: Iterable[Ant],
+    food: dict[Hex, FoodOnMap],
+    seen_tiles: SeenTiles,
+    blocked: Set[Hex],
+    hive_field: Optional[DistanceField] = None,
+) -> dict[str, Hex]:
+    """
+    Match ants to food tiles, at most one ant per tile, maximizing the total
+    calories per step. The trip home is read from `hive_field` when given.
+    Returns ant id -> food hex for the ants that got a tile.
+    """
+    space = SearchSpace(seen_tiles, blocked)
+    food_nodes = {
+        node: hex_
+        for hex_, node in ((h, space.node(h)) for h in food if h not in blocked)
+        if node is not None
+    }
+    benefits: dict[str, dict[Hex, float]] = {}
+    for ant in ants:
+        start = space.node(Hex(ant.q, ant.r))
+        if start is None or not food_nodes:
+            continue
+        found = []
+
+        def is_goal(node, start=start, found=found) -> bool:
+            if node in food_nodes and node != start:
+                found.append(node)
+            return len(found) >= CANDIDATES_PER_ANT
+
+        result = best_first_search(
+            [start],
+            space.expand,
+            is_goal=is_goal,
+            max_expansions=MAX_CANDIDATE_EXPANSIONS,
+        )
+        row = {}
+        for node in found:
+            food_hex = food_nodes[node]
+            trip = result.dist[node]
+            if hive_field is not None:
+                trip += hive_field.cost_from(food_hex)
+            if trip >= VERY_LARGE_INT:
+                continue
+            row[food_hex] = food_value(ant, food[food_hex]) / trip
+        if row:
+            benefits[ant.id] = row
+    return auction_assignment(benefits)
@@ -0,0 +1,452 @@
+"""
+Offline benchmarks for the planner.
+
+uv run ./src/benchmark.py astar|assign|packed|parallel|turn [ai_ignore/player_response_<realm>.json ...]
+uv run ./src/benchmark.py replay [recordings ...] [--fixture sim-80] [--baseline bench.json] [--save-baseline bench.json]
+
+Without recorded files a synthetic map is used, `replay` uses one of the
+`FIXTURES` instead: games played by the simulator with randomly walking
+ants, so they do not change with the planner.
+"""
+
+import argparse
+import contextlib
+import dataclasses
+import io
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Iterable, Iterator, Optional
+
+import numpy as np
+
+from ai import AI
+from assignment import assign_food
+from data_structs import SeenTiles
+from game_types import (
+    Ant,
+    Food,
+    FoodOnMap,
+    Hex,
+    HexType,
+    PlayerEnemy,
+    PlayerResponse,
+    Tile,
+    UnitType,
+)
+from pathfinding import DistanceField, find_min_cost_path_to_any, min_cost_search
+from replay import TurnRecord, iter_player_responses, replay
+from simulator import Game, wander
+
+# Ratio over the baseline above which a statistic counts as a regression
+REGRESSION_THRESHOLD = 0.1
+# Baseline values below these are noise and not compared
+NOISE_FLOOR = {"seconds": 0.002, "expanded": 200, "peak_memory": 1_000_000}
+STATISTICS = {"p50": 50, "p95": 95, "max": 100}
+
+
+def synthetic_player_response(
+    seed: int = 0,
+    size: int = 120,
+    ants: int = 100,
+    enemies: int = 40,
+    food: int = 300,
+    turn: int = 100,
+) -> PlayerResponse:
+    """Fully visible square map with stone walls, dirt patches and acid."""
+    rng = random.Random(seed)
+    types = {}
+    for q in range(size):
+        for r in range(size):
+            types[Hex(q, r)] = rng.choices(
+                [HexType.EMPTY, HexType.DIRT, HexType.ACID, HexType.STONE],
+                [75, 12, 3, 10],
+            )[0]
+    # a few long walls with gaps so that detours matter
+    for _ in range(size // 10):
+        q, r = rng.randrange(size), rng.randrange(size)
+        horizontal = rng.random() < 0.5
+        for i in range(size // 3):
+            wall = Hex(q + i, r) if horizontal else Hex(q, r + i)
+            if wall in types and i % 9:
+                types[wall] = HexType.STONE
+    center = size // 2
+    home = [Hex(center, center), Hex(center + 1, center), Hex(center, center + 1)]
+    for h in home:
+        types[h] = HexType.ANTHILL
+    free = [h for h, t in types.items() if t not in (HexType.STONE, HexType.ANTHILL)]
+    ant_hexes = rng.sample(free, ants)
+    return PlayerResponse(
+        ants=[
+            Ant(
+                food=Food(amount=rng.choice([0, 0, 0, 2]), type=1),
+                health=100,
+                id=f"ant-{i}",
+                lastAttack=None,
+                lastEnemyAnt=None,
+                q=h.q,
+                r=h.r,
+                type=rng.choices(list(UnitType), [60, 30, 10])[0],
+            )
+            for i, h in enumerate(ant_hexes)
+        ],
+        enemies=[
+            PlayerEnemy(
+                attack=30,
+                food=Food(amount=0, type=0),
+                health=100,
+                q=h.q,
+                r=h.r,
+                type=rng.choice(list(UnitType)),
+            )
+            for h in rng.sample(free, enemies)
+        ],
+        food=[
+            FoodOnMap(amount=rng.randint(1, 9), q=h.q, r=h.r, type=rng.randint(1, 3))
+            for h in rng.sample(free, food)
+        ],
+        home=home,
+        map=[Tile(cost=1, q=h.q, r=h.r, type=t) for h, t in types.items()],
+        nextTurnIn=2.0,
+        score=0,
+        spot=home[0],
+        turnNo=turn,
+    )
+
+
+def simulated_responses(
+    size: int, players: int, turns: int, seed: int = 0
+) -> Iterator[PlayerResponse]:
+    """What player 0 sees over `turns` turns of a game where every ant wanders."""
+    game = Game.generate(players, size, seed)
+    rng = random.Random(seed)
+    yield game.response(0)
+    for _ in range(turns - 1):
+        commands = {p: wander(game, p, rng) for p in range(players)}
+        yield game.step(commands)[0]
+
+
+def repeated_responses(turns: int, **kwargs) -> Iterator[PlayerResponse]:
+    """One fully visible synthetic map, the same ants on it every turn."""
+    player_response = synthetic_player_response(**kwargs)
+    for turn in range(turns):
+        yield dataclasses.replace(player_response, turnNo=turn)
+
+
+FIXTURES: dict[str, Callable[[], Iterator[PlayerResponse]]] = {
+    "sim-80": lambda: simulated_responses(size=80, players=2, turns=150, seed=1),
+    "sim-160": lambda: simulated_responses(size=160, players=4, turns=150, seed=2),
+    "open-200": lambda: repeated_responses(
+        turns=20, seed=3, size=200, ants=100, enemies=60, food=600
+    ),
+}
+
+
+def load_responses(paths: Iterable[str]) -> Iterator[PlayerResponse]:
+    paths = list(paths)
+    if not paths:
+        yield synthetic_player_response()
+        return
+    for path in paths:
+        yield from iter_player_responses(path)
+
+
+def bench_astar(responses: Iterable[PlayerResponse]):
+    """Node expansions of Dijkstra vs A* for the per-ant food and enemy searches."""
+    seen_tiles = SeenTiles(dense=True)
+    totals = {False: [0, 0.0], True: [0, 0.0]}
+    searches = 0
+    for player_response in responses:
+        seen_tiles.update(player_response.map)
+        taken = set(h for h, t in seen_tiles.items() if t.type == HexType.STONE)
+        target_sets = [
+            set(Hex(f.q, f.r) for f in player_response.food),
+            set(Hex(e.q, e.r) for e in player_response.enemies),
+        ]
+        # single known target is the common case for fighters
+        target_sets += [
+            {min(targets, key=lambda h: (h.q, h.r))}
+            for targets in target_sets
+            if targets
+        ]
+        for ant in player_response.ants:
+            start = Hex(ant.q, ant.r)
+            for targets in target_sets:
+                costs = {}
+                for astar in (False, True):
+                    started = time.perf_counter()
+                    space, result = min_cost_search(
+                        start, targets, seen_tiles, taken, astar=astar
+                    )
+                    totals[astar][1] += time.perf_counter() - started
+                    totals[astar][0] += result.expanded
+                    costs[astar] = (
+                        result.dist[result.goal] if result.goal is not None else None
+                    )
+                assert costs[False] == costs[True], (start, costs)
+                searches += 1
+    print(f"searches: {searches}")
+    for astar, (expanded, seconds) in totals.items():
+        name = "A*" if astar else "Dijkstra"
+        print(f"{name:>9}: {expanded:>10} nodes expanded, {seconds:.3f} s")
+    if totals[True][0]:
+        print(f"expansion ratio: {totals[False][0] / totals[True][0]:.2f}x")
+
+
+def bench_assign(responses: Iterable[PlayerResponse]):
+    """Time of the batch worker-to-food assignment, per turn."""
+    seen_tiles = SeenTiles(dense=True)
+    for player_response in responses:
+        seen_tiles.update(player_response.map)
+        taken = set(h for h, t in seen_tiles.items() if t.type == HexType.STONE)
+        food = {Hex(f.q, f.r): f for f in player_response.food}
+        workers = [
+            ant
+            for ant in player_response.ants
+            if ant.type == UnitType.WORKER and ant.food.amount == 0
+        ]
+        started = time.perf_counter()
+        hive_field = DistanceField(
+            player_response.home, seen_tiles, taken, stop_at=set(food)
+        )
+        field_seconds = time.perf_counter() - started
+        assigned = assign_food(workers, food, seen_tiles, taken, hive_field)
+        seconds = time.perf_counter() - started
+        print(
+            f"turn {player_response.turnNo}: {len(workers)} workers, "
+            f"{len(food)} food, {len(assigned)} assigned, "
+            f"{seconds:.3f} s ({field_seconds:.3f} s hive field)"
+        )
+
+
+def bench_packed(responses: Iterable[PlayerResponse]):
+    """Memory and search time of SeenTiles keyed by Hex vs packed int keys."""
+    modes = {"Hex": SeenTiles(), "packed": SeenTiles(packed=True)}
+    memory = dict.fromkeys(modes, 0)
+    seconds = dict.fromkeys(modes, 0.0)
+    searches = 0
+    for player_response in responses:
+        for name, seen_tiles in modes.items():
+            tracemalloc.start()
+            seen_tiles.update(player_response.map)
+            memory[name] += tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+        food = set(Hex(f.q, f.r) for f in player_response.food)
+        taken = set(Hex(e.q, e.r) for e in player_response.enemies)
+        for ant in player_response.ants:
+            start = Hex(ant.q, ant.r)
+            paths = {}
+            for name, seen_tiles in modes.items():
+                started = time.perf_counter()
+                paths[name] = find_min_cost_path_to_any(start, food, seen_tiles, taken)
+                seconds[name] += time.perf_counter() - started
+            assert paths["Hex"] == paths["packed"], start
+            searches += 1
+    print(f"searches: {searches}")
+    for name in modes:
+        print(
+            f"{name:>6}: {memory[name] / 1e6:.2f} MB seen tiles, "
+            f"{seconds[name]:.3f} s searching"
+        )
+    if seconds["packed"]:
+        print(f"search speedup: {seconds['Hex'] / seconds['packed']:.2f}x")
+
+
+def bench_parallel(responses: Iterable[PlayerResponse], workers: list[int]):
+    """Turn time with the planning on 0 (in process), 1, 2, ... worker processes."""
+    responses = list(responses)
+    seconds = {}
+    moves = {}
+    for n in workers:
+        ai = AI(workers=n)
+        random.seed(0)
+        try:
+            # the first turn starts the pool and copies the map, time the rest
+            with contextlib.redirect_stdout(io.StringIO()):
+                ai.get_move_commands(responses[0])
+                started = time.perf_counter()
+                moves[n] = [ai.get_move_commands(r).moves for r in responses]
+                seconds[n] = time.perf_counter() - started
+        finally:
+            ai.close()
+        print(f"{n} workers: {seconds[n] / len(responses):.3f} s per turn")
+    pooled = [n for n in workers if n > 0]
+    for n in pooled:
+        if 0 in seconds:
+            print(f"{n} workers: {seconds[0] / seconds[n]:.2f}x speedup")
+    if pooled:
+        same = all(moves[n] == moves[pooled[0]] for n in pooled)
+        print(f"same moves with every worker count: {same}")
+
+
+def bench_turn(responses: Iterable[PlayerResponse]):
+    """Time of a full AI turn, i.e. planning the whole colony."""
+    ai = AI()
+    for player_response in responses:
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            move_commands = ai.get_move_commands(player_response)
+            seconds = time.perf_counter() - started
+        moved = sum(1 for move in move_commands.moves if move.path)
+        print(
+            f"turn {player_response.turnNo}: {len(player_response.ants)} ants, "
+            f"{moved} moving, {seconds:.3f} s"
+        )
+
+
+def percentiles(values: Iterable[float]) -> dict[str, float]:
+    values = np.asarray(list(values), dtype=np.float64)
+    if not len(values):
+        return dict.fromkeys(STATISTICS, 0.0)
+    return {
+        name: float(np.percentile(values, q, method="inverted_cdf"))
+        for name, q in STATISTICS.items()
+    }
+
+
+def summarize(records: list[TurnRecord]) -> dict[str, dict[str, dict[str, float]]]:
+    """Phase ("turn" for the whole call) -> metric -> p50/p95/max over turns."""
+    names = sorted({name for record in records for name in record.phases})
+    summary = {"turn": {}}
+    for metric in NOISE_FLOOR:
+        summary["turn"][metric] = percentiles(getattr(r, metric) for r in records)
+    for name in names:
+        summary[name] = {}
+        for metric in NOISE_FLOOR:
+            # a phase that did not run on a turn cost nothing on it
+            summary[name][metric] = percentiles(
+                getattr(r.phases[name], metric) if name in r.phases else 0
+                for r in records
+            )
+    return summary
+
+
+def regressions(
+    summary: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD
+) -> list[str]:
+    """Statistics of `summary` more than `threshold` above the same in `baseline`."""
+    found = []
+    for name, metrics in summary.items():
+        for metric, statistics in metrics.items():
+            for statistic in ("p50", "p95"):
+                old = baseline.get(name, {}).get(metric, {}).get(statistic)
+                new = statistics[statistic]
+                if old is None or old < NOISE_FLOOR[metric]:
+                    continue
+                if new > old * (1 + threshold):
+                    found.append(
+                        f"{name} {metric} {statistic}: {old:.4g} -> {new:.4g} "
+                        f"(+{(new / old - 1) * 100:.0f}%)"
+                    )
+    return found
+
+
+def print_summary(summary: dict):
+    print(f"{'phase':<28} {'metric':>12} {'p50':>10} {'p95':>10} {'max':>10}")
+    units = {"seconds": ("s", 1), "expanded": ("", 1), "peak_memory": ("MB", 1e6)}
+    for name, metrics in summary.items():
+        for metric, statistics in metrics.items():
+            unit, scale = units[metric]
+            values = " ".join(f"{statistics[s] / scale:>10.4g}" for s in STATISTICS)
+            print(f"{name:<28} {metric + (f' {unit}' if unit else ''):>12} {values}")
+
+
+def bench_replay(
+    responses: Iterable[PlayerResponse],
+    baseline: Optional[str] = None,
+    save_baseline: Optional[str] = None,
+    threshold: float = REGRESSION_THRESHOLD,
+    trace_memory: bool = True,
+) -> bool:
+    """
+    Per-turn time, node expansions and peak memory of a fresh AI, by phase,
+    against a saved baseline. False when something regressed.
+    """
+    random.seed(0)
+    ai = AI()
+    records = []
+    try:
+        for record in replay(responses, ai, trace_memory):
+            records.append(record)
+    finally:
+        ai.close()
+    summary = summarize(records)
+    print(f"{len(records)} turns")
+    print_summary(summary)
+    if save_baseline:
+        with open(save_baseline, "w") as f:
+            json.dump(summary, f, indent=1)
+        print(f"baseline saved to {save_baseline}")
+    if not baseline:
+        return True
+    with open(baseline, "r") as f:
+        found = regressions(summary, json.load(f), threshold)
+    for line in found:
+        print(f"regression: {line}")
+    if not found:
+        print(f"no regressions over {threshold:.0%} against {baseline}")
+    return not found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    astar = subparsers.add_parser("astar", help=bench_astar.__doc__)
+    astar.add_argument("recordings", nargs="*")
+    assign = subparsers.add_parser("assign", help=bench_assign.__doc__)
+    assign.add_argument("recordings", nargs="*")
+    packed = subparsers.add_parser("packed", help=bench_packed.__doc__)
+    packed.add_argument("recordings", nargs="*")
+    parallel = subparsers.add_parser("parallel", help=bench_parallel.__doc__)
+    parallel.add_argument("recordings", nargs="*")
+    parallel.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=sorted({0, 1, 2, os.cpu_count() or 1}),
+    )
+    replay_ = subparsers.add_parser("replay", help=bench_replay.__doc__)
+    replay_.add_argument("recordings", nargs="*")
+    replay_.add_argument("--fixture", choices=sorted(FIXTURES), default="sim-80")
+    replay_.add_argument("--baseline", help="summary JSON to compare against")
+    replay_.add_argument("--save-baseline", help="write this run's summary here")
+    replay_.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    replay_.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="skip tracemalloc, which slows the AI down",
+    )
+    turn = subparsers.add_parser("turn", help=bench_turn.__doc__)
+    turn.add_argument("recordings", nargs="*")
+    args = parser.parse_args()
+    if args.command == "astar":
+        bench_astar(load_responses(args.recordings))
+    elif args.command == "assign":
+        bench_assign(load_responses(args.recordings))
+    elif args.command == "packed":
+        bench_packed(load_responses(args.recordings))
+    elif args.command == "parallel":
+        bench_parallel(load_responses(args.recordings), args.workers)
+    elif args.command == "replay":
+        if args.recordings:
+            responses = load_responses(args.recordings)
+        else:
+            responses = FIXTURES[args.fixture]()
+        ok = bench_replay(
+            responses,
+            args.baseline,
+            args.save_baseline,
+            args.threshold,
+            not args.no_memory,
+        )
+        if not ok:
+            sys.exit(1)
+    elif args.command == "turn":
+        bench_turn(load_responses(args.recordings))
+
+
+if __name__ == "__main__":
+    main()
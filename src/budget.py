@@ -0,0 +1,84 @@
+"""
+Time budget of one turn.
+
+The server gives `nextTurnIn` seconds until the next turn; our moves also
+have to travel back, so the network latency and a safety margin come off the
+top. Planning checks the budget per ant and degrades from full searches to
+capped ones, and finally to leaving ants where they are, so the moves are
+always sent in time.
+"""
+
+import time
+from enum import IntEnum
+from typing import Callable, Optional
+
+# Seconds kept free on top of the measured latency
+SAFETY_MARGIN = 0.05
+# Below this share of the budget left, searches are capped
+REDUCED_BELOW = 0.3
+# Node expansions a capped search may use
+REDUCED_EXPANSIONS = 1500
+# Weight of the newest sample in the latency average
+LATENCY_SMOOTHING = 0.3
+
+
+class Quality(IntEnum):
+    FULL = 2
+    REDUCED = 1
+    SKIPPED = 0
+
+
+class TurnBudget:
+    """
+    Deadline for planning one turn. A non-positive `seconds` means the server
+    did not say (e.g. recorded or synthetic turns) and the budget never runs
+    out. `start` is when the response arrived on `clock`, now by default.
+    """
+
+    def __init__(
+        self,
+        seconds: float,
+        latency: float = 0.0,
+        clock: Callable[[], float] = time.perf_counter,
+        start: Optional[float] = None,
+    ):
+        self.clock = clock
+        self.start = clock() if start is None else start
+        self.unbounded = seconds <= 0
+        self.seconds = max(seconds - latency - SAFETY_MARGIN, 0.0)
+        self.planned = dict.fromkeys(Quality, 0)
+
+    def elapsed(self) -> float:
+        return self.clock() - self.start
+
+    def remaining(self) -> float:
+        if self.unbounded:
+            return float("inf")
+        return self.seconds - self.elapsed()
+
+    def quality(self) -> Quality:
+        """How much planning the next ant can afford."""
+        if self.unbounded:
+            return Quality.FULL
+        remaining = self.remaining()
+        if remaining <= 0:
+            return Quality.SKIPPED
+        if remaining < REDUCED_BELOW * self.seconds:
+            return Quality.REDUCED
+        return Quality.FULL
+
+    def record(self, quality: Quality):
+        self.planned[quality] += 1
+
+    def summary(self) -> str:
+        budget = "unbounded" if self.unbounded else f"{self.seconds:.3f} s"
+        return (
+            f"Planned {self.planned[Quality.FULL]} ants at full quality, "
+            f"{self.planned[Quality.REDUCED]} reduced, "
+            f"{self.planned[Quality.SKIPPED]} skipped, "
+            f"in {self.elapsed():.3f} s of {budget}"
+        )
+
+
+def smoothed_latency(previous: float, sample: float) -> float:
+    return (1 - LATENCY_SMOOTHING) * previous + LATENCY_SMOOTHING * sample
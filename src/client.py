@@ -1,4 +1,6 @@
+import json
 from dataclasses import asdict
+from typing import Optional
 
 from dacite import from_dict
 from httpx import Client
@@ -10,6 +12,10 @@ from game_types import (
 )
 
 
+def encode_moves(commands: PlayerMoveCommands) -> bytes:
+    return json.dumps(asdict(commands)).encode()
+
+
 class DatsClient:
     def __init__(self, api_token: str, production: bool = False):
         if production:
@@ -40,8 +46,15 @@ class DatsClient:
             raise Exception(f"Failed to register: {response.json()}")
         return from_dict(PlayerRegistration, response.json())
 
-    def move(self, commands: PlayerMoveCommands) -> PlayerResponse:
-        response = self.client.post("/api/move", json=asdict(commands))
+    def move(
+        self, commands: PlayerMoveCommands, body: Optional[bytes] = None
+    ) -> PlayerResponse:
+        """Send `commands`, or their `body` when already encoded."""
+        if body is None:
+            body = encode_moves(commands)
+        response = self.client.post(
+            "/api/move", content=body, headers={"Content-Type": "application/json"}
+        )
         if response.status_code != 200:
             raise Exception(f"Failed to move: {response.json()}")
         return from_dict(PlayerResponse, response.json())
@@ -0,0 +1,189 @@
+"""
+Cooperative pathfinding for the ants of one turn.
+
+Instead of blocking every hex of every chosen path for the whole turn, ants
+reserve (hex, step) pairs, where step `i` is the i-th hex an ant enters this
+turn. Later ants plan their moves in space-time against those reservations,
+so paths may cross as long as the ants pass the crossing at different steps.
+"""
+
+from typing import Callable, List, Optional, Set
+
+from data_structs import VERY_LARGE_INT, SeenTiles
+from game_types import UNIT_TYPE_STATS, Ant, Hex, UnitType
+from hex import distance, neighbors
+from pathfinding import (
+    MIN_STEP_COST,
+    DistanceField,
+    PathTruncator,
+    ReachEnvelope,
+    ReachEnvelopes,
+    tile_cost,
+)
+
+# Last step of a turn, no ant moves further than the fastest one
+LAST_STEP = max(stats.speed for stats in UNIT_TYPE_STATS.values())
+
+
+class ReservationTable:
+    """Which ant holds a hex at a given step of this turn."""
+
+    def __init__(self):
+        self.cells: dict[tuple[Hex, int], str] = {}
+        # (from, to, step) of every reserved move, to forbid head-on swaps
+        self.moves: set[tuple[Hex, Hex, int]] = set()
+
+    def clear(self):
+        self.cells.clear()
+        self.moves.clear()
+
+    def reserve_start(self, ant_id: str, start: Hex):
+        """An ant stands on `start` for the whole turn until it is given a path."""
+        for step in range(LAST_STEP + 1):
+            self.cells[(start, step)] = ant_id
+
+    def reserve(self, ant_id: str, start: Hex, path: List[Hex]):
+        """
+        Hold every hex of `path` for the step the ant enters it and the last
+        one from then on. The start is released after the ant left it.
+        """
+        for step in range(2, LAST_STEP + 1):
+            if self.cells.get((start, step)) == ant_id:
+                del self.cells[(start, step)]
+        prev = start
+        for step, hex_ in enumerate(path, 1):
+            self.cells[(hex_, step)] = ant_id
+            self.moves.add((prev, hex_, step))
+            prev = hex_
+        for step in range(len(path) + 1, LAST_STEP + 1):
+            self.cells[(prev, step)] = ant_id
+
+    def is_free(self, hex_: Hex, step: int, came_from: Hex, ant_id: str) -> bool:
+        holder = self.cells.get((hex_, step))
+        if holder is not None and holder != ant_id:
+            return False
+        return (hex_, came_from, step) not in self.moves
+
+    def is_free_after(self, hex_: Hex, step: int, ant_id: str) -> bool:
+        """Whether an ant may stop on `hex_` at `step` for the rest of the turn."""
+        for later in range(step + 1, LAST_STEP + 1):
+            holder = self.cells.get((hex_, later))
+            if holder is not None and holder != ant_id:
+                return False
+        return True
+
+
+def path_cost_to_go(path: List[Hex], seen_tiles: SeenTiles, window: int):
+    """
+    Estimated cost from a hex near the start of `path` to its end: walk to one
+    of the first `window` hexes of the path (hex distance times the cheapest
+    step) and follow the path from there.
+    """
+    remaining = [0] * len(path)
+    for i in range(len(path) - 2, -1, -1):
+        remaining[i] = remaining[i + 1] + tile_cost(seen_tiles[path[i + 1]])
+    anchors = list(zip(path[: window + 1], remaining))
+    # the same hex is scored once per step it can be reached on
+    cache: dict[Hex, int] = {}
+
+    def cost_to_go(hex_: Hex) -> int:
+        cost = cache.get(hex_)
+        if cost is None:
+            cost = cache[hex_] = min(
+                MIN_STEP_COST * distance(hex_, p) + rest for p, rest in anchors
+            )
+        return cost
+
+    return cost_to_go
+
+
+def plan_window(
+    ant_id: str,
+    envelope: ReachEnvelope,
+    cost_to_go: Callable[[Hex], int],
+    blocked: Set[Hex],
+    reservations: ReservationTable,
+) -> List[Hex]:
+    """
+    Moves for this turn that end as close to the goal as `cost_to_go` says,
+    staying inside the ant's reach envelope, never entering a hex at a step
+    another ant reserved and never stopping where another ant passes later.
+    Returns the path without the start, or [] if nothing
+    beats standing still.
+    """
+    start, speed = envelope.start, envelope.speed
+    best_key = (cost_to_go(start), 0)
+    best: Optional[tuple[Hex, int]] = None
+    # cheapest cost of reaching each hex in exactly `step` moves
+    layer = {start: 0}
+    parents: dict[tuple[Hex, int], Hex] = {}
+    for step in range(1, speed + 1):
+        next_layer: dict[Hex, int] = {}
+        for node, cost in layer.items():
+            for neighbor in neighbors(node):
+                if neighbor in blocked:
+                    continue
+                new_cost = cost + envelope.step_cost(neighbor)
+                if new_cost > speed or next_layer.get(neighbor, speed + 1) <= new_cost:
+                    continue
+                if not reservations.is_free(neighbor, step, node, ant_id):
+                    continue
+                next_layer[neighbor] = new_cost
+                parents[(neighbor, step)] = node
+        for node, cost in next_layer.items():
+            key = (cost_to_go(node), cost)
+            if key < best_key and reservations.is_free_after(node, step, ant_id):
+                best_key, best = key, (node, step)
+        layer = next_layer
+        if not layer:
+            break
+    if best is None or best_key[0] >= VERY_LARGE_INT:
+        return []
+    node, step = best
+    path = [node]
+    while step > 1:
+        node = parents[(node, step)]
+        step -= 1
+        path.append(node)
+    path.reverse()
+    return path
+
+
+class CooperativeTruncator(PathTruncator):
+    """
+    PathTruncator that plans this turn's part of a path in space-time.
+    `taken_destinations` holds hexes blocked for the whole turn (obstacles and
+    where other ants end up), `reservations` the hexes other ants pass.
+    """
+
+    def __init__(
+        self,
+        seen_tiles: SeenTiles,
+        taken_destinations: Set[Hex],
+        reservations: ReservationTable,
+        envelopes: Optional[ReachEnvelopes] = None,
+    ):
+        super().__init__(seen_tiles, taken_destinations)
+        self.reservations = reservations
+        if envelopes is None:
+            envelopes = ReachEnvelopes(seen_tiles)
+        self.envelopes = envelopes
+
+    def truncate(self, ant: Ant, path: List[Hex] | DistanceField) -> List[Hex]:
+        speed = UNIT_TYPE_STATS[UnitType(ant.type)].speed
+        if isinstance(path, DistanceField):
+            if not self.field_path(ant, path):
+                return []
+            cost_to_go = path.cost_from
+        else:
+            if not path or len(path) < 2:
+                return []
+            # hexes past the window are out of reach this turn anyway
+            cost_to_go = path_cost_to_go(path, self.seen_tiles, 2 * speed)
+        return plan_window(
+            ant.id,
+            self.envelopes.of(ant),
+            cost_to_go,
+            self.taken_destinations,
+            self.reservations,
+        )
@@ -1,22 +1,256 @@
-from game_types import Hex, Tile
+from typing import Callable, Optional
+
+import numpy as np
+
+import hex_batch
+from game_types import Hex, HexType, Tile
+from hex import neighbors, pack, pack_hex, unpack_hex
 
 VERY_LARGE_INT = 999999999
 
 
-class SeenTiles(dict[Hex, Tile]):
+def hex_type_cost(type: int) -> int:
+    t = HexType(type)
+    if t in (HexType.EMPTY, HexType.ANTHILL):
+        return 1
+    elif t == HexType.DIRT:
+        return 2
+    elif t == HexType.ACID:
+        return 3
+    else:  # STONE
+        return VERY_LARGE_INT  # Use a large int for impassible
+
+
+class MapGraph:
+    """
+    Dense, array-backed copy of the seen map for hot search loops.
+    Every seen hex gets an integer node index; `cost[i]` is the cost of
+    stepping onto node `i` and `adj[6 * i + d]` is the node in direction `d`
+    (same order as `hex.neighbors`) or -1 if that hex was not seen yet.
+    `changed` logs every node that was added or changed type, in order, so
+    incremental searches can catch up from the position they last read.
+    """
+
     def __init__(self):
-        super().__init__()
+        self.index: dict[Hex, int] = {}
+        self.hexes: list[Hex] = []
+        self.type: list[int] = []
+        self.cost: list[int] = []
+        self.adj: list[int] = []
+        self.changed: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self.hexes)
+
+    def add_tile(self, tile: Tile) -> int:
+        tile_hex = Hex(tile.q, tile.r)
+        node = self.index.get(tile_hex)
+        if node is not None:
+            if self.type[node] != tile.type:
+                self.changed.append(node)
+            self.type[node] = tile.type
+            self.cost[node] = hex_type_cost(tile.type)
+            return node
+        node = len(self.hexes)
+        self.index[tile_hex] = node
+        self.hexes.append(tile_hex)
+        self.type.append(tile.type)
+        self.cost.append(hex_type_cost(tile.type))
+        self.adj.extend((-1, -1, -1, -1, -1, -1))
+        self.changed.append(node)
+        for d, neighbor in enumerate(neighbors(tile_hex)):
+            other = self.index.get(neighbor)
+            if other is not None:
+                self.adj[6 * node + d] = other
+                # directions are ordered so that the opposite one is 3 steps away
+                self.adj[6 * other + (d + 3) % 6] = node
+        return node
+
+    def add_tiles(self, tiles: list[Tile]):
+        """
+        `add_tile` for many tiles of distinct hexes. An empty graph links them
+        in one batch, e.g. a map restored from disk.
+        """
+        if self.hexes:
+            for tile in tiles:
+                self.add_tile(tile)
+            return
+        hexes = [Hex(tile.q, tile.r) for tile in tiles]
+        if not hexes:
+            return
+        coords = hex_batch.as_array(hexes)
+        keys = hex_batch.pack(coords)
+        order = np.argsort(keys)
+        sorted_keys = keys[order]
+        neighbor_keys = hex_batch.pack(hex_batch.neighbors(coords))
+        found = np.searchsorted(sorted_keys, neighbor_keys).clip(max=len(keys) - 1)
+        adj = np.where(sorted_keys[found] == neighbor_keys, order[found], -1)
+        self.index = dict(zip(hexes, range(len(hexes))))
+        self.hexes = hexes
+        self.type = [tile.type for tile in tiles]
+        self.cost = [hex_type_cost(t) for t in self.type]
+        self.adj = adj.ravel().tolist()
+        self.changed = list(range(len(hexes)))
 
+    def nodes_of(self, hexes) -> set[int]:
+        index = self.index
+        return {index[h] for h in hexes if h in index}
+
+
+class SeenTiles(dict[Hex, Tile]):
     """
-    Update the seen tiles with new tiles.
-    Returns the new tiles.
+    Every tile seen so far. `dense` also keeps a MapGraph for the searches;
+    `packed` keys the tiles by `hex.pack` ints instead of Hex, the searches
+    then run on those keys (see SearchSpace).
+    Every update that adds a tile or changes the type of one bumps `version`,
+    stamps the tiles in `changed_turn` and tells the subscribers which keys
+    changed, so caches can drop exactly what is stale. The hexes of each type
+    are kept in `of_type` sets, updated from the changed tiles only.
     """
 
-    def update(self, map: list[Tile]) -> list[Tile]:
+    def __init__(self, dense: bool = False, packed: bool = False):
+        super().__init__()
+        if dense and packed:
+            raise ValueError("SeenTiles is either dense or packed")
+        self.graph: Optional[MapGraph] = MapGraph() if dense else None
+        self.packed = packed
+        self.version = 0
+        self.last_changed: frozenset = frozenset()
+        self.subscribers: tuple[Callable[[set], None], ...] = ()
+        # key -> turn (or version, without turns) the tile last changed on
+        self.changed_turn: dict = {}
+        # type -> keys of the seen hexes of that type
+        self.by_type: dict[int, set] = {hex_type: set() for hex_type in HexType}
+
+    def key(self, hex_: Hex):
+        """The key of `hex_` in this dict."""
+        return pack_hex(hex_) if self.packed else hex_
+
+    def of_type(self, hex_type: int) -> set[Hex]:
+        """
+        Every seen hex of `hex_type`, as Hex also when packed. Without packing
+        the set is live, do not modify.
+        """
+        keys = self.by_type[hex_type]
+        if self.packed:
+            return {unpack_hex(key) for key in keys}
+        return keys
+
+    def subscribe(self, callback: Callable[[set], None]):
+        """
+        Call `callback` with the set of changed keys after every update that
+        changed something.
+        """
+        self.subscribers = self.subscribers + (callback,)
+
+    def restore(self, tiles: list[Tile], turns: list[int]):
+        """
+        Fill an empty SeenTiles with `tiles` of distinct hexes, each last
+        changed on the turn at the same place of `turns`, e.g. from a MapStore.
+        Subscribers are not told, the tiles come from where they would go.
+        """
+        if self:
+            raise ValueError("restore needs an empty SeenTiles")
+        if self.packed:
+            keys = [pack(tile.q, tile.r) for tile in tiles]
+        else:
+            keys = [Hex(tile.q, tile.r) for tile in tiles]
+        dict.update(self, zip(keys, tiles))
+        by_type = self.by_type
+        for key, tile in zip(keys, tiles):
+            by_type[tile.type].add(key)
+        self.changed_turn.update(zip(keys, turns))
+        if self.graph is not None:
+            self.graph.add_tiles(tiles)
+        self.last_changed = frozenset(keys)
+        if tiles:
+            self.version += 1
+
+    def update(self, map: list[Tile], turn: Optional[int] = None) -> list[Tile]:
+        """
+        Update the seen tiles with new tiles.
+        Returns the new tiles.
+        """
         new_tiles: list[Tile] = []
+        changed = set()
+        by_type = self.by_type
         for tile in map:
-            tile_hex = Hex(tile.q, tile.r)
-            if tile_hex not in self:
+            tile_hex = pack(tile.q, tile.r) if self.packed else Hex(tile.q, tile.r)
+            old = self.get(tile_hex)
+            if old is None:
                 new_tiles.append(tile)
+                changed.add(tile_hex)
+                by_type[tile.type].add(tile_hex)
+            elif old.type != tile.type:
+                changed.add(tile_hex)
+                by_type[old.type].discard(tile_hex)
+                by_type[tile.type].add(tile_hex)
             self[tile_hex] = tile
+            if self.graph is not None:
+                self.graph.add_tile(tile)
+        self.last_changed = frozenset(changed)
+        if changed:
+            self.version += 1
+            stamp = self.version if turn is None else turn
+            for tile_hex in changed:
+                self.changed_turn[tile_hex] = stamp
+            for callback in self.subscribers:
+                callback(changed)
         return new_tiles
+
+
+class FrontierIndex:
+    """
+    Seen hexes that are out of sight this turn and not `excluded` (e.g. known
+    food), i.e. the places scouts go to refresh. Kept up to date from the
+    difference between this turn's and last turn's visible tiles instead of
+    being rebuilt from every seen tile. `version` changes whenever the
+    frontier does, so it can key caches instead of the set itself.
+    `nodes` holds the same hexes as search nodes: MapGraph indexes when the
+    graph is on, packed keys for packed SeenTiles.
+    """
+
+    def __init__(self, seen_tiles: SeenTiles):
+        self.seen_tiles = seen_tiles
+        self.hexes: set[Hex] = set()
+        self.nodes: set = set()
+        self.visible: set[Hex] = set()
+        self.excluded: set[Hex] = set()
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self.hexes)
+
+    def __contains__(self, hex_: Hex) -> bool:
+        return hex_ in self.hexes
+
+    def update(self, visible_tiles: list[Tile], excluded: set[Hex]):
+        visible = set(Hex(tile.q, tile.r) for tile in visible_tiles)
+        if visible == self.visible and excluded == self.excluded:
+            return
+        seen_tiles = self.seen_tiles
+        if self.version == 0:
+            # nothing to diff against yet, e.g. a map restored from disk
+            joined = set(Hex(tile.q, tile.r) for tile in seen_tiles.values())
+        else:
+            joined = (self.visible - visible) | (self.excluded - excluded)
+        key = seen_tiles.key
+        joined = (
+            set(h for h in joined if key(h) in seen_tiles and h not in visible)
+            - excluded
+        )
+        left = (visible | excluded) & self.hexes
+        self.hexes -= left
+        self.hexes |= joined
+        graph = seen_tiles.graph
+        if graph is not None:
+            self.nodes -= graph.nodes_of(left)
+            self.nodes |= graph.nodes_of(joined)
+        elif seen_tiles.packed:
+            self.nodes -= {pack_hex(h) for h in left}
+            self.nodes |= {pack_hex(h) for h in joined}
+        else:
+            self.nodes = self.hexes
+        self.visible = visible
+        self.excluded = set(excluded)
+        self.version += 1
@@ -57,6 +57,41 @@ def neighbors(hex: Hex) -> tuple[Hex]:
     return tuple(neighbors)
 
 
+# Packed keys: q and r biased into 16 bits each of one int, which hashes
+# natively instead of through the generated dataclass `__hash__`
+PACK_BITS = 16
+PACK_OFFSET = 1 << (PACK_BITS - 1)
+PACK_MASK = (1 << PACK_BITS) - 1
+
+
+def pack(q: int, r: int) -> int:
+    return ((r + PACK_OFFSET) << PACK_BITS) | (q + PACK_OFFSET)
+
+
+def pack_hex(hex: Hex) -> int:
+    return ((hex.r + PACK_OFFSET) << PACK_BITS) | (hex.q + PACK_OFFSET)
+
+
+def unpack(key: int) -> tuple[int, int]:
+    return (key & PACK_MASK) - PACK_OFFSET, (key >> PACK_BITS) - PACK_OFFSET
+
+
+def unpack_hex(key: int) -> Hex:
+    return Hex((key & PACK_MASK) - PACK_OFFSET, (key >> PACK_BITS) - PACK_OFFSET)
+
+
+# neighbor offsets added straight to a packed key, the offset is even so the
+# parity of the biased row is the parity of the row
+even_r_packed = tuple(dq + (dr << PACK_BITS) for dq, dr in even_r_neighbors)
+odd_r_packed = tuple(dq + (dr << PACK_BITS) for dq, dr in odd_r_neighbors)
+
+
+def packed_neighbors(key: int) -> tuple[int, ...]:
+    """`neighbors` on packed keys, in the same order."""
+    deltas = odd_r_packed if (key >> PACK_BITS) & 1 else even_r_packed
+    return tuple(key + d for d in deltas)
+
+
 def diff_q_r(a: Hex, b: Hex) -> tuple[int, int]:
     return abs(a.q - b.q), abs(a.r - b.r)
 
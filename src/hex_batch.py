@@ -0,0 +1,105 @@
+"""
+NumPy versions of the `hex` functions for many hexes at once, over (N, 2)
+int arrays of odd-r (q, r) coordinates.
+Every function matches its scalar counterpart in `hex.py` exactly, including
+the order of neighbors and ring hexes.
+"""
+
+from typing import Iterable
+
+import numpy as np
+
+from game_types import Hex
+from hex import PACK_BITS, PACK_MASK, PACK_OFFSET, even_r_neighbors, odd_r_neighbors
+
+# neighbor offsets by row parity, in the order `hex.neighbors` yields them
+NEIGHBOR_OFFSETS = np.array([even_r_neighbors, odd_r_neighbors], dtype=np.int64)
+
+# the cube directions `hex.hex_ring` walks, starting from direction 4
+CUBE_DIRECTIONS = np.array(
+    [
+        (1, -1, 0),
+        (1, 0, -1),
+        (0, 1, -1),
+        (-1, 1, 0),
+        (-1, 0, 1),
+        (0, -1, 1),
+    ],
+    dtype=np.int64,
+)
+
+
+def as_array(hexes: Iterable[Hex]) -> np.ndarray:
+    """(N, 2) array of (q, r) for `hexes`."""
+    coords = [(h.q, h.r) for h in hexes]
+    return np.array(coords, dtype=np.int64).reshape(len(coords), 2)
+
+
+def to_hexes(coords: np.ndarray) -> list[Hex]:
+    return [Hex(q, r) for q, r in coords.reshape(-1, 2).tolist()]
+
+
+def pack(coords: np.ndarray) -> np.ndarray:
+    """`hex.pack` keys of (..., 2) coordinates, shape (...)."""
+    return ((coords[..., 1] + PACK_OFFSET) << PACK_BITS) | (
+        coords[..., 0] + PACK_OFFSET
+    )
+
+
+def unpack(keys: np.ndarray) -> np.ndarray:
+    return np.stack(
+        [(keys & PACK_MASK) - PACK_OFFSET, (keys >> PACK_BITS) - PACK_OFFSET], axis=-1
+    )
+
+
+def oddr_to_cube(coords: np.ndarray) -> np.ndarray:
+    """(..., 2) offset coordinates to (..., 3) cube coordinates."""
+    q, r = coords[..., 0], coords[..., 1]
+    x = q - (r - (r & 1)) // 2
+    return np.stack([x, -x - r, r], axis=-1)
+
+
+def cube_to_oddr(cubes: np.ndarray) -> np.ndarray:
+    x, z = cubes[..., 0], cubes[..., 2]
+    return np.stack([x + (z - (z & 1)) // 2, z], axis=-1)
+
+
+def _cube_distance(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.abs(a - b).max(axis=-1)
+
+
+def distance(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Distance between the hexes of `a` and `b` pairwise. The arrays broadcast,
+    so a single (2,) hex gives the distance from it to every hex of the other.
+    """
+    return _cube_distance(oddr_to_cube(a), oddr_to_cube(b))
+
+
+def distance_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(N, M) distances from every hex of `a` (N, 2) to every hex of `b` (M, 2)."""
+    return _cube_distance(oddr_to_cube(a)[:, None, :], oddr_to_cube(b)[None, :, :])
+
+
+def neighbors(coords: np.ndarray) -> np.ndarray:
+    """(N, 6, 2) neighbors of every hex of `coords` (N, 2)."""
+    return coords[:, None, :] + NEIGHBOR_OFFSETS[coords[:, 1] & 1]
+
+
+def hex_ring(center: Hex, radius: int) -> np.ndarray:
+    """(6 * radius, 2) hexes at `radius` around `center`, or just `center`."""
+    cube = np.array(oddr_to_cube(np.array([center.q, center.r])))
+    if radius == 0:
+        return cube_to_oddr(cube[None, :])
+    # walk each direction `radius` times, starting `radius` steps along direction 4
+    steps = np.repeat(CUBE_DIRECTIONS, radius, axis=0)
+    walked = np.cumsum(steps, axis=0) - steps
+    return cube_to_oddr(cube + radius * CUBE_DIRECTIONS[4] + walked)
+
+
+def hex_range(center: Hex, radius: int) -> np.ndarray:
+    """
+    Every hex within `radius` of `center`, ring by ring from the center
+    outwards, 3 * radius * (radius + 1) + 1 of them.
+    """
+    return np.concatenate([hex_ring(center, k) for k in range(radius + 1)])
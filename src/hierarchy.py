@@ -0,0 +1,278 @@
+"""
+Hierarchical pathfinding (HPA*) for long trips across the seen map.
+
+The map is cut into fixed-size clusters in offset coordinates. Where two
+clusters touch, every connected run of passable border hexes gets one
+entrance, and the costs between the entrances of a cluster are precomputed.
+Long queries search this small abstract graph and refine only the first
+steps into hexes, since an ant only walks a few of them per turn anyway.
+Clusters are rebuilt lazily after SeenTiles reports new or changed tiles in
+them.
+"""
+
+from typing import Callable, Iterable, List, Optional, Set
+
+from data_structs import VERY_LARGE_INT, SeenTiles
+from game_types import Hex
+from hex import distance, neighbors
+from pathfinding import MIN_STEP_COST, SearchSpace
+from search import SearchResult, best_first_search
+
+CLUSTER_SIZE = 10
+# Trips shorter than this are cheaper to search directly
+LONG_TRIP_DISTANCE = 2 * CLUSTER_SIZE
+
+Cluster = tuple[int, int]
+
+
+def cluster_of(hex_: Hex) -> Cluster:
+    return hex_.q // CLUSTER_SIZE, hex_.r // CLUSTER_SIZE
+
+
+class MapHierarchy:
+    """
+    Abstract graph of cluster entrances over a dense SeenTiles.
+    Entrances and all searches use MapGraph node indexes.
+    """
+
+    def __init__(self, seen_tiles: SeenTiles):
+        if seen_tiles.graph is None:
+            raise ValueError("MapHierarchy needs SeenTiles(dense=True)")
+        self.seen_tiles = seen_tiles
+        self.graph = seen_tiles.graph
+        # cluster of every graph node, grows with the graph
+        self.node_cluster: list[Cluster] = []
+        self.members: dict[Cluster, set[int]] = {}
+        # entrance pairs (a, b) between two clusters, keyed by the sorted pair
+        self.transitions: dict[tuple[Cluster, Cluster], list[tuple[int, int]]] = {}
+        # entrance -> entrance across a cluster border, cost of that one step
+        self.inter: dict[int, dict[int, int]] = {}
+        # entrance -> entrances of the same cluster, cost of the best path inside
+        self.intra: dict[int, dict[int, int]] = {}
+        self.cluster_entrances: dict[Cluster, set[int]] = {}
+        # clusters touched by changes since the last rebuild
+        self.dirty: set[Cluster] = set()
+        self.rebuilt_clusters = 0
+        self.mark_dirty(seen_tiles.keys())
+        seen_tiles.subscribe(self.mark_dirty)
+
+    def mark_dirty(self, hexes: Iterable[Hex]):
+        """SeenTiles callback: `hexes` were added or changed type."""
+        for hex_ in hexes:
+            self.dirty.add(cluster_of(hex_))
+            # a border hex also changes the entrances of the cluster next door
+            self.dirty.update(cluster_of(n) for n in neighbors(hex_))
+
+    def update(self):
+        """Rebuild the clusters marked dirty since the last call."""
+        if not self.dirty:
+            return
+        graph = self.graph
+        for node in range(len(self.node_cluster), len(graph)):
+            cluster = cluster_of(graph.hexes[node])
+            self.node_cluster.append(cluster)
+            self.members.setdefault(cluster, set()).add(node)
+        dirty = {cluster for cluster in self.dirty if cluster in self.members}
+        self.dirty = set()
+        pairs = set()
+        touched = set(dirty)
+        for cluster in dirty:
+            for other in self._neighbor_clusters(cluster):
+                pairs.add((min(cluster, other), max(cluster, other)))
+                touched.add(other)
+        for pair in pairs:
+            self._build_transitions(pair)
+        for cluster in touched:
+            self._build_intra(cluster)
+
+    def _neighbor_clusters(self, cluster: Cluster) -> Iterable[Cluster]:
+        cq, cr = cluster
+        for dq in (-1, 0, 1):
+            for dr in (-1, 0, 1):
+                if (dq or dr) and (cq + dq, cr + dr) in self.members:
+                    yield cq + dq, cr + dr
+
+    def _build_transitions(self, pair: tuple[Cluster, Cluster]):
+        for a, b in self.transitions.pop(pair, []):
+            self.inter.get(a, {}).pop(b, None)
+            self.inter.get(b, {}).pop(a, None)
+        inside, outside = pair
+        adj, cost, node_cluster = self.graph.adj, self.graph.cost, self.node_cluster
+        border: dict[int, int] = {}
+        for node in self.members.get(inside, ()):
+            if cost[node] >= VERY_LARGE_INT:
+                continue
+            for n in adj[6 * node : 6 * node + 6]:
+                if n != -1 and node_cluster[n] == outside and cost[n] < VERY_LARGE_INT:
+                    border.setdefault(node, n)
+                    break
+        # one entrance in the middle of each connected run of border hexes
+        transitions = []
+        while border:
+            run = [next(iter(border))]
+            seen = {run[0]}
+            for node in run:
+                for n in adj[6 * node : 6 * node + 6]:
+                    if n in border and n not in seen:
+                        seen.add(n)
+                        run.append(n)
+            hexes = self.graph.hexes
+            run.sort(key=lambda n: (hexes[n].r, hexes[n].q))
+            a = run[len(run) // 2]
+            transitions.append((a, border[a]))
+            for node in run:
+                del border[node]
+        if not transitions:
+            return
+        self.transitions[pair] = transitions
+        for a, b in transitions:
+            self.inter.setdefault(a, {})[b] = cost[b]
+            self.inter.setdefault(b, {})[a] = cost[a]
+
+    def _build_intra(self, cluster: Cluster):
+        for entrance in self.cluster_entrances.pop(cluster, ()):
+            self.intra.pop(entrance, None)
+        node_cluster = self.node_cluster
+        entrances = set()
+        for pair, transitions in self.transitions.items():
+            if cluster in pair:
+                entrances.update(
+                    n for t in transitions for n in t if node_cluster[n] == cluster
+                )
+        self.cluster_entrances[cluster] = entrances
+        self.rebuilt_clusters += 1
+        expand = self.local_expand(SearchSpace(self.seen_tiles), cluster)
+        for entrance in entrances:
+            result = best_first_search([entrance], expand)
+            self.intra[entrance] = {
+                other: result.dist[other]
+                for other in entrances
+                if other != entrance and other in result.dist
+            }
+
+    def local_expand(
+        self, space: SearchSpace, cluster: Cluster, reverse: bool = False
+    ) -> Callable[[int], List[tuple[int, int]]]:
+        """Search step restricted to `cluster`; `reverse` walks edges backwards."""
+        node_cluster = self.node_cluster
+        space_expand = space.expand_reverse if reverse else space.expand
+
+        def expand(node: int) -> List[tuple[int, int]]:
+            return [
+                (n, cost)
+                for n, cost in space_expand(node)
+                if node_cluster[n] == cluster
+            ]
+
+        return expand
+
+    def find_path(
+        self,
+        start: Hex,
+        goal: Hex,
+        blocked: Set[Hex],
+        refine_cost: int = VERY_LARGE_INT,
+        max_expansions: Optional[int] = None,
+    ) -> Optional[List[Hex]]:
+        """
+        Path from `start` towards `goal` through the abstract graph, refined
+        into hexes until it costs at least `refine_cost` (or reaches `goal`).
+        Returns None when the hierarchy can not help, e.g. both hexes share a
+        cluster or no abstract route exists within `max_expansions` abstract
+        nodes; callers then search directly. The searches inside one cluster
+        are bounded by its size.
+        """
+        self.update()
+        space = SearchSpace(self.seen_tiles, blocked)
+        start_node, goal_node = space.node(start), space.node(goal)
+        if start_node is None or goal_node is None or not space.passable(goal_node):
+            return None
+        start_cluster = self.node_cluster[start_node]
+        goal_cluster = self.node_cluster[goal_node]
+        if start_cluster == goal_cluster:
+            return None
+        # connect the start and the goal to the entrances of their clusters
+        start_search = best_first_search(
+            [start_node], self.local_expand(space, start_cluster)
+        )
+        start_edges = {
+            e: start_search.dist[e]
+            for e in self.cluster_entrances.get(start_cluster, ())
+            if e in start_search.dist and e != start_node
+        }
+        goal_search = best_first_search(
+            [goal_node], self.local_expand(space, goal_cluster, reverse=True)
+        )
+        goal_edges = {
+            e: goal_search.dist[e]
+            for e in self.cluster_entrances.get(goal_cluster, ())
+            if e in goal_search.dist and e != goal_node
+        }
+        if not start_edges or not goal_edges:
+            return None
+
+        def expand(node: int) -> List[tuple[int, int]]:
+            edges = list(self.inter.get(node, {}).items())
+            if node == start_node:
+                edges.extend(start_edges.items())
+            else:
+                edges.extend(self.intra.get(node, {}).items())
+            if node in goal_edges:
+                edges.append((goal_node, goal_edges[node]))
+            return edges
+
+        hexes = self.graph.hexes
+        abstract = best_first_search(
+            [start_node],
+            expand,
+            is_goal=lambda node: node == goal_node,
+            heuristic=lambda node: MIN_STEP_COST * distance(hexes[node], goal),
+            max_expansions=max_expansions,
+        )
+        waypoints = abstract.path()
+        if not waypoints:
+            return None
+        path = self._refine(waypoints, space, start_search, goal_search, refine_cost)
+        if path is None:
+            return None
+        return space.hexes(path)
+
+    def _refine(
+        self,
+        waypoints: List[int],
+        space: SearchSpace,
+        start_search: SearchResult,
+        goal_search: SearchResult,
+        refine_cost: int,
+    ) -> Optional[List[int]]:
+        start, goal = waypoints[0], waypoints[-1]
+        path = [start]
+        cost = 0
+        for a, b in zip(waypoints, waypoints[1:]):
+            if cost >= refine_cost:
+                break
+            if a == start and b in start_search.dist:
+                leg = start_search.path_to(b)
+                cost += start_search.dist[b]
+            elif b == goal and a in goal_search.dist:
+                # the reverse search from the goal leads back along parents
+                leg = goal_search.path_to(a)[::-1]
+                cost += goal_search.dist[a]
+            elif b in self.inter.get(a, {}):
+                if not space.passable(b):
+                    return None
+                leg = [a, b]
+                cost += self.inter[a][b]
+            else:
+                result = best_first_search(
+                    [a],
+                    self.local_expand(space, self.node_cluster[a]),
+                    is_goal=lambda node, b=b: node == b,
+                )
+                leg = result.path()
+                if not leg:
+                    # an ant stands in the way, let the caller search around it
+                    return None
+                cost += result.dist[b]
+            path.extend(leg[1:])
+        return path
@@ -0,0 +1,247 @@
+"""
+Instrumentation of AI turns: nested spans with wall time, node expansions,
+heap pushes, free-form counters and, while tracemalloc traces, peak memory.
+
+`span(name)` opens a span under the innermost open one. Spans of the same
+name under the same parent add up, so the per-ant spans of a phase read as
+one line with a call count. `finish_turn` closes the turn: every span's time
+goes into a rolling histogram and, with an `export` file, the tree is written
+as one JSON line. Expansions and pushes come from `search.totals`, so
+searches run on a process pool are not counted.
+
+Disabled, `span` returns one shared do-nothing context manager and `count`
+returns at once, so instrumented code pays a method call and nothing else.
+"""
+
+import json
+import time
+import tracemalloc
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional, TextIO
+
+import numpy as np
+
+from search import totals
+
+# Turns the rolling histograms keep
+HISTOGRAM_WINDOW = 100
+# Depth of the span tree shown in the HUD, the turn itself is depth 0
+HUD_DEPTH = 2
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    calls: int = 0
+    seconds: float = 0.0
+    expanded: int = 0
+    pushes: int = 0
+    # bytes traced by tracemalloc at the highest point of any call
+    peak_memory: int = 0
+    counters: dict[str, int] = field(default_factory=dict)
+    children: dict[str, "Span"] = field(default_factory=dict)
+
+    def child(self, name: str) -> "Span":
+        span = self.children.get(name)
+        if span is None:
+            span = self.children[name] = Span(name)
+        return span
+
+    def flat(self, prefix: str = "") -> dict[str, "Span"]:
+        """Every span below this one by its path, e.g. "workers/search"."""
+        spans = {}
+        for name, child in self.children.items():
+            path = prefix + name
+            spans[path] = child
+            spans.update(child.flat(path + "/"))
+        return spans
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "seconds": self.seconds,
+            "expanded": self.expanded,
+            "pushes": self.pushes,
+            "peak_memory": self.peak_memory,
+            "counters": self.counters,
+            "children": [child.to_dict() for child in self.children.values()],
+        }
+
+
+class RollingHistogram:
+    """The last `window` values of something measured once per turn."""
+
+    def __init__(self, window: int = HISTOGRAM_WINDOW):
+        self.values: deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def add(self, value: float):
+        self.values.append(value)
+
+    def percentile(self, q: float) -> float:
+        if not self.values:
+            return 0.0
+        return float(np.percentile(self.values, q, method="inverted_cdf"))
+
+    def counts(self, edges: list[float]) -> list[int]:
+        """How many values fall between each pair of consecutive `edges`."""
+        return np.histogram(self.values, bins=edges)[0].tolist()
+
+
+class _Disabled:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+DISABLED = _Disabled()
+
+
+class _Open:
+    """One call of a span, from `with` to the end of the block."""
+
+    __slots__ = ("instrumentation", "span", "started", "expanded", "pushes")
+
+    def __init__(self, instrumentation: "Instrumentation", span: Span):
+        self.instrumentation = instrumentation
+        self.span = span
+
+    def __enter__(self) -> Span:
+        instrumentation = self.instrumentation
+        if instrumentation.tracing:
+            instrumentation._fold_peak()
+        instrumentation.stack.append(self.span)
+        self.expanded = totals.expanded
+        self.pushes = totals.pushes
+        self.started = time.perf_counter()
+        return self.span
+
+    def __exit__(self, *exc):
+        span = self.span
+        span.seconds += time.perf_counter() - self.started
+        span.expanded += totals.expanded - self.expanded
+        span.pushes += totals.pushes - self.pushes
+        span.calls += 1
+        instrumentation = self.instrumentation
+        if instrumentation.tracing:
+            instrumentation._fold_peak()
+        instrumentation.stack.pop()
+        return False
+
+
+class Instrumentation:
+    def __init__(
+        self,
+        enabled: bool = True,
+        export: Optional[TextIO] = None,
+        window: int = HISTOGRAM_WINDOW,
+    ):
+        self.enabled = enabled
+        self.export = export
+        self.window = window
+        # the open spans, the turn first
+        self.stack: list[Span] = []
+        self.tracing = False
+        self.turn_no = 0
+        self._turn: Optional[_Open] = None
+        # the last finished turn
+        self.last: Optional[Span] = None
+        # span path ("turn" for the whole turn) -> seconds per turn
+        self.histograms: dict[str, RollingHistogram] = {}
+
+    def start_turn(self, turn_no: int):
+        """Open the span of a new turn, finishing the last one if still open."""
+        self.finish_turn()
+        if not self.enabled:
+            return
+        self.turn_no = turn_no
+        self.tracing = tracemalloc.is_tracing()
+        if self.tracing:
+            tracemalloc.reset_peak()
+        self._turn = _Open(self, Span("turn"))
+        self._turn.__enter__()
+
+    def finish_turn(self) -> Optional[Span]:
+        """Close the turn, record it and return its span (None when none is open)."""
+        opened = self._turn
+        if opened is None:
+            return None
+        self._turn = None
+        opened.__exit__(None, None, None)
+        turn = self.last = opened.span
+        self._histogram("turn").add(turn.seconds)
+        for path, span in turn.flat().items():
+            self._histogram(path).add(span.seconds)
+        if self.export is not None:
+            record = {"turn": self.turn_no, "spans": turn.to_dict()}
+            self.export.write(json.dumps(record) + "\n")
+            self.export.flush()
+        return turn
+
+    def span(self, name: str):
+        if not self.stack:
+            return DISABLED
+        return _Open(self, self.stack[-1].child(name))
+
+    def count(self, name: str, n: int = 1):
+        """Add `n` to a counter of the innermost open span."""
+        if not self.stack:
+            return
+        counters = self.stack[-1].counters
+        counters[name] = counters.get(name, 0) + n
+
+    def _histogram(self, path: str) -> RollingHistogram:
+        histogram = self.histograms.get(path)
+        if histogram is None:
+            histogram = self.histograms[path] = RollingHistogram(self.window)
+        return histogram
+
+    def _fold_peak(self):
+        """Give the peak since the last fold to every open span, then restart it."""
+        peak = tracemalloc.get_traced_memory()[1]
+        for span in self.stack:
+            if span.peak_memory < peak:
+                span.peak_memory = peak
+        tracemalloc.reset_peak()
+
+    def summary(self) -> str:
+        """One line with the time of the last turn and of its phases."""
+        turn = self.last
+        if turn is None:
+            return "No turn measured"
+        phases = ", ".join(
+            f"{name} {span.seconds * 1000:.0f}" for name, span in turn.children.items()
+        )
+        return f"Turn took {turn.seconds * 1000:.0f} ms: {phases}"
+
+    def hud_lines(self, depth: int = HUD_DEPTH) -> list[str]:
+        """The last turn's spans with their p50/p95 over the window, in ms."""
+        turn = self.last
+        if turn is None:
+            return []
+        lines = [f"{'':<24}{'last':>7}{'p50':>7}{'p95':>7}  calls  expanded"]
+
+        def add(path: str, span: Span, level: int):
+            histogram = self.histograms.get(path)
+            p50 = histogram.percentile(50) if histogram else 0.0
+            p95 = histogram.percentile(95) if histogram else 0.0
+            label = ("  " * level + span.name)[:24]
+            lines.append(
+                f"{label:<24}{span.seconds * 1000:>7.1f}{p50 * 1000:>7.1f}"
+                f"{p95 * 1000:>7.1f}{span.calls:>7}{span.expanded:>10}"
+            )
+            if level < depth:
+                for name, child in span.children.items():
+                    child_path = name if path == "turn" else f"{path}/{name}"
+                    add(child_path, child, level + 1)
+
+        add("turn", turn, 0)
+        return lines
@@ -0,0 +1,74 @@
+"""
+Ant intents: the goal an ant was sent to and the rest of its path, kept
+between turns so an ant that is still on track is not searched again.
+
+An intent breaks when the ant is not where its move should have put it,
+the goal is no longer one of the ant's targets, a hex of the remaining path
+was claimed this turn, or a tile of it changed after it was planned. The
+caller also drops it on new threats.
+"""
+
+from dataclasses import dataclass
+from typing import Container, Optional
+
+from data_structs import SeenTiles
+from game_types import Hex
+
+
+@dataclass(slots=True)
+class Intent:
+    # the hex the ant should be on next turn first, the goal last
+    path: list[Hex]
+    # SeenTiles version and turn the path was planned on
+    version: int
+    turn: int
+    # where the ant is headed when `path` stops short of it, e.g. at the
+    # cluster entrance a partially refined hierarchy path ends on
+    target: Optional[Hex] = None
+
+    @property
+    def goal(self) -> Hex:
+        return self.path[-1] if self.target is None else self.target
+
+    def valid(
+        self,
+        position: Hex,
+        targets: Container[Hex],
+        blocked: Optional[Container[Hex]],
+        seen_tiles: SeenTiles,
+    ) -> bool:
+        path = self.path
+        if len(path) < 2 or path[0] != position or self.goal not in targets:
+            return False
+        if blocked is not None and any(h in blocked for h in path[1:]):
+            return False
+        if seen_tiles.version != self.version:
+            changed_turn = seen_tiles.changed_turn
+            if any(changed_turn.get(h, self.turn) > self.turn for h in path):
+                return False
+        return True
+
+
+def follow(
+    full_path: list[Hex],
+    move_path: list[Hex],
+    seen_tiles: SeenTiles,
+    turn: int,
+    goal: Optional[Hex] = None,
+) -> Optional[Intent]:
+    """
+    The intent left after sending `move_path` along `full_path` towards `goal`
+    (the end of `full_path` by default), or None when the move does not end
+    on the path or already reaches its end.
+    """
+    if not move_path or not full_path:
+        return None
+    try:
+        end = full_path.index(move_path[-1])
+    except ValueError:
+        return None
+    if end == len(full_path) - 1:
+        return None
+    if goal == full_path[-1]:
+        goal = None
+    return Intent(full_path[end:], seen_tiles.version, turn, goal)
@@ -1,13 +1,14 @@
 import json
 import os
-import pickle
 import time
 from dataclasses import asdict
 
 from dotenv import load_dotenv
 
 from ai import AI
-from client import DatsClient
+from client import DatsClient, encode_moves
+from instrumentation import Instrumentation
+from map_store import MapStore, store_path
 from visualize_player_response_pygame import Visualizer
 
 
@@ -37,23 +38,27 @@ def main():
         else:
             break
 
-    cache_path = f"ai_ignore/{registration.realm}@main.py.pickle"
-    ai = None
-    if os.path.exists(cache_path):
-        try:
-            with open(cache_path, "rb") as f:
-                ai = pickle.load(f)
-            print(f"Restored AI state from {cache_path}")
-        except Exception as e:
-            print(f"Failed to load AI state: {e}")
-    if ai is None:
-        ai = AI()
+    # spans of every turn go to a JSON lines file, INSTRUMENT=0 turns them off
+    spans_log = open(f"ai_ignore/turn_spans_{registration.realm}.jsonl", "a")
+    spans = Instrumentation(
+        enabled=os.environ.get("INSTRUMENT", "1") != "0", export=spans_log
+    )
+    # PLANNING_WORKERS > 0 plans the ants on that many processes
+    ai = AI(workers=int(os.environ.get("PLANNING_WORKERS", "0")), instrumentation=spans)
+    # the seen map is written through to disk every turn, so a restarted bot
+    # picks it up even after a crash
+    map_store = MapStore(store_path(registration.realm))
+    map_store.attach(ai.seen_tiles)
+    print(f"Restored {len(map_store)} tiles from {map_store.path}")
     visualizer = Visualizer()
 
     try:
         while visualizer.running:
             # print(client.logs())
             player_response = client.arena()
+            # the turn's budget counts from here, logging the response included
+            received_at = time.perf_counter()
+            start_time = time.time()
             with open(
                 f"ai_ignore/player_response_{registration.realm}.json", "a+"
             ) as f:
@@ -61,15 +66,19 @@ def main():
                 f.write("\n\n\n")
 
             next_turn_in = player_response.nextTurnIn
-            start_time = time.time()
 
-            start_time = time.time()
-            move_commands = ai.get_move_commands(player_response)
-            end_time = time.time()
-            print(f"Time taken to get move commands: {end_time - start_time} seconds")
+            move_commands = ai.get_move_commands(player_response, received_at)
             if move_commands:
                 # print(f"Moving with commands: {move_commands}")
-                client.move(move_commands)
+                with spans.span("serialization"):
+                    body = encode_moves(move_commands)
+                request_start = time.time()
+                with spans.span("send"):
+                    client.move(move_commands, body)
+                # the next turn's budget keeps this much room for the request
+                ai.record_latency(time.time() - request_start)
+            spans.finish_turn()
+            print(spans.summary())
 
             while time.time() < start_time + next_turn_in:
                 if not visualizer.update(
@@ -78,6 +87,7 @@ def main():
                     move_commands=move_commands,
                     remembered_enemies=list(ai.memory.get_enemy_hexes()),
                     remembered_food=list(ai.memory.get_food_hexes()),
+                    hud_lines=spans.hud_lines(),
                 ):
                     break
 
@@ -86,14 +96,12 @@ def main():
 
             print()
     except KeyboardInterrupt:
-        print("Interrupted by user. Saving AI state...")
+        print("Interrupted by user. Saving map...")
     finally:
-        try:
-            with open(cache_path, "wb") as f:
-                pickle.dump(ai, f)
-            print(f"AI state saved to {cache_path}")
-        except Exception as e:
-            print(f"Failed to save AI state: {e}")
+        map_store.close()
+        print(f"Map saved to {map_store.path}")
+        ai.close()
+        spans_log.close()
         visualizer.close()
 
 
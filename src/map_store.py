@@ -0,0 +1,164 @@
+"""
+Memory-mapped on-disk store of the seen map, one file per realm.
+
+The file is a 16 byte header (magic, record count) followed by fixed-width
+records, one per hex, in the order the hexes were first seen:
+
+    q: int16, r: int16, type: uint8, cost: uint16, turn: int32
+
+`turn` is the turn the tile last changed on. Changed tiles are rewritten in
+place, so a crashed bot loses at most the tiles of its last turn, and a
+restarted one maps the file and reads the columns without unpickling
+anything. The hex -> record index is rebuilt from the q and r columns on
+open. Tools can read a store with `read_tiles` or `MapStore(path).records`.
+"""
+
+import mmap
+import os
+import struct
+from typing import Hashable, Iterable, Optional
+
+import numpy as np
+
+import hex_batch
+from data_structs import SeenTiles
+from game_types import Tile
+from hex import pack
+
+MAGIC = b"DPMAP\x00\x01\x00"
+HEADER = struct.Struct("<8sQ")
+RECORD = np.dtype(
+    [("q", "<i2"), ("r", "<i2"), ("type", "u1"), ("cost", "<u2"), ("turn", "<i4")]
+)
+# records the file grows by at once
+GROWTH = 4096
+
+
+def store_path(realm: str) -> str:
+    return f"ai_ignore/{realm}@map.store"
+
+
+class MapStore:
+    """
+    Write-through copy of a SeenTiles on disk. `attach` restores the stored
+    tiles into a SeenTiles in one batch and subscribes to its changes.
+    """
+
+    def __init__(self, path: str, readonly: bool = False):
+        self.path = path
+        self.readonly = readonly
+        if not readonly and not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, 0))
+                f.truncate(HEADER.size + GROWTH * RECORD.itemsize)
+        self._file = open(path, "rb" if readonly else "r+b")
+        self._mmap: Optional[mmap.mmap] = None
+        self._records: Optional[np.ndarray] = None
+        self._map()
+        magic, self.count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a map store")
+        # packed hex -> record number
+        records = self.records
+        coords = np.stack([records["q"], records["r"]], axis=-1).astype(np.int64)
+        self.index: dict[int, int] = dict(
+            zip(hex_batch.pack(coords).tolist(), range(self.count))
+        )
+        self.seen_tiles: Optional[SeenTiles] = None
+
+    def _map(self):
+        access = mmap.ACCESS_READ if self.readonly else mmap.ACCESS_WRITE
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=access)
+        capacity = (len(self._mmap) - HEADER.size) // RECORD.itemsize
+        self._records = np.ndarray(
+            (capacity,), dtype=RECORD, buffer=self._mmap, offset=HEADER.size
+        )
+
+    def _unmap(self):
+        # numpy views export the buffer, drop them before closing the map
+        self._records = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def records(self) -> np.ndarray:
+        """The stored records, a live view into the file."""
+        return self._records[: self.count]
+
+    def tiles(self) -> list[Tile]:
+        return to_tiles(self.records)
+
+    def refresh(self):
+        """Pick up the records another process added since the file was mapped."""
+        _, self.count = HEADER.unpack_from(self._mmap, 0)
+        if self.count > len(self._records):
+            self._unmap()
+            self._map()
+
+    def write(self, tiles: Iterable[tuple[Tile, int]]):
+        """Add or overwrite the records of `(tile, turn)` pairs."""
+        for tile, turn in tiles:
+            key = pack(tile.q, tile.r)
+            i = self.index.get(key)
+            if i is None:
+                if self.count == len(self._records):
+                    self._grow()
+                i = self.index[key] = self.count
+                self.count += 1
+            self._records[i] = (tile.q, tile.r, tile.type, tile.cost, turn)
+        HEADER.pack_into(self._mmap, 0, MAGIC, self.count)
+
+    def _grow(self):
+        self._unmap()
+        size = HEADER.size + (self.count + GROWTH) * RECORD.itemsize
+        self._file.truncate(size)
+        self._map()
+
+    def attach(self, seen_tiles: SeenTiles):
+        """
+        Restore the stored tiles, with the turns they changed on, into an
+        empty `seen_tiles`, then write every change of it through to the file.
+        """
+        seen_tiles.restore(self.tiles(), self.records["turn"].tolist())
+        self.seen_tiles = seen_tiles
+        seen_tiles.subscribe(self.on_change)
+
+    def on_change(self, keys: set[Hashable]):
+        """SeenTiles callback, see `SeenTiles.subscribe`."""
+        seen_tiles = self.seen_tiles
+        self.write((seen_tiles[key], seen_tiles.changed_turn[key]) for key in keys)
+
+    def flush(self):
+        if self._mmap is not None and not self.readonly:
+            self._mmap.flush()
+
+    def close(self):
+        self.flush()
+        self._unmap()
+        self._file.close()
+
+
+def to_tiles(records: np.ndarray) -> list[Tile]:
+    return [
+        Tile(cost=cost, q=q, r=r, type=type_)
+        for q, r, type_, cost in zip(
+            records["q"].tolist(),
+            records["r"].tolist(),
+            records["type"].tolist(),
+            records["cost"].tolist(),
+        )
+    ]
+
+
+def read_tiles(path: str) -> list[Tile]:
+    """Every tile of the store at `path`, e.g. for replays and the visualizer."""
+    store = MapStore(path, readonly=True)
+    try:
+        return store.tiles()
+    finally:
+        store.close()
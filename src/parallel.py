@@ -0,0 +1,259 @@
+"""
+Parallel planning of the ants' long searches over a process pool.
+
+Ants are split into spatial groups, each planned in order by one worker on
+its own copy of the seen map. The map goes to the workers through a
+`MapStore` file in shared memory (/dev/shm where there is one): the planner
+writes the changed tiles into it, stamped with the SeenTiles version, and a
+worker reads only the records newer than the version it has, so nothing is
+pickled but the per-turn target sets.
+
+Within a group an ant's target is blocked for the ants after it, like the
+sequential planner does with `taken_destinations`. Across groups the AI
+checks every planned path against the hexes claimed so far when it takes
+it, and plans the ant itself when the path conflicts (see `AI._planned_path`).
+Planning uses no randomness and each group is planned on its own, so the
+paths only depend on the inputs, not on the number of workers or the order
+they finish in. Only a `timeout` can drop the paths of the workers still
+busy when it runs out, the AI then plans those ants itself.
+"""
+
+import os
+import shutil
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Hashable, Iterable, Optional
+
+import numpy as np
+
+import hex_batch
+from data_structs import SeenTiles
+from game_types import Hex
+from hex import pack
+from map_store import MapStore, to_tiles
+from pathfinding import bfs_to_nearest_unexplored, find_min_cost_path_to_any
+
+# Side of the square of offset coordinates an ant group covers
+GROUP_SIZE = 16
+
+SHARED_MEMORY_DIR = "/dev/shm"
+
+
+class Target(IntEnum):
+    # nearest frontier hex, for scouts
+    FRONTIER = 0
+    # nearest food
+    FOOD = 1
+    # nearest visible enemy
+    ENEMY = 2
+    # the job's goal hex, else the nearest food
+    GOAL = 3
+
+
+@dataclass(frozen=True, slots=True)
+class AntJob:
+    ant_id: str
+    q: int
+    r: int
+    target: Target
+    goal: Optional[Hex] = None
+
+
+@dataclass
+class TurnTargets:
+    """The per-turn sets every group plans against, as packed keys."""
+
+    blocked: list[int]
+    frontier: list[int]
+    food: list[int]
+    enemies: list[int]
+
+    @classmethod
+    def of(
+        cls,
+        blocked: Iterable[Hex],
+        frontier: Iterable[Hex],
+        food: Iterable[Hex],
+        enemies: Iterable[Hex],
+    ) -> "TurnTargets":
+        return cls(
+            *(
+                [pack(h.q, h.r) for h in hexes]
+                for hexes in (blocked, frontier, food, enemies)
+            )
+        )
+
+
+def _hexes(keys: list[int]) -> set[Hex]:
+    if not keys:
+        return set()
+    return set(hex_batch.to_hexes(hex_batch.unpack(np.array(keys, dtype=np.int64))))
+
+
+def group_ants(jobs: list[AntJob], size: int = GROUP_SIZE) -> list[list[AntJob]]:
+    """Jobs bucketed by the square their ant stands in, in a fixed order."""
+    groups: dict[tuple[int, int], list[AntJob]] = {}
+    for job in jobs:
+        groups.setdefault((job.q // size, job.r // size), []).append(job)
+    return [groups[key] for key in sorted(groups)]
+
+
+def plan_group(
+    seen_tiles: SeenTiles,
+    jobs: list[AntJob],
+    targets: TurnTargets,
+    max_expansions: Optional[int] = None,
+) -> dict[str, list[tuple[int, int]]]:
+    """Paths of one group's ants, planned in order, each search capped."""
+    blocked = _hexes(targets.blocked)
+    frontier = _hexes(targets.frontier)
+    food = _hexes(targets.food)
+    enemies = _hexes(targets.enemies)
+    paths = {}
+    for job in jobs:
+        start = Hex(job.q, job.r)
+        if job.target == Target.FRONTIER:
+            # scouts pass through each other, their goals are not claimed
+            path = bfs_to_nearest_unexplored(
+                start, frontier, set(), seen_tiles, max_expansions=max_expansions
+            )
+            paths[job.ant_id] = [(h.q, h.r) for h in path]
+            continue
+        path = []
+        if job.target == Target.GOAL:
+            path = find_min_cost_path_to_any(
+                start,
+                {job.goal},
+                seen_tiles,
+                blocked,
+                max_expansions=max_expansions,
+                astar=True,
+            )
+        if not path:
+            goals = enemies if job.target == Target.ENEMY else food
+            path = find_min_cost_path_to_any(
+                start,
+                goals,
+                seen_tiles,
+                blocked,
+                max_expansions=max_expansions,
+                astar=True,
+            )
+        if path:
+            blocked.add(path[-1])
+        paths[job.ant_id] = [(h.q, h.r) for h in path]
+    return paths
+
+
+# store path -> (store, seen tiles, SeenTiles version they are synced to),
+# kept by each worker process between turns
+_worker_maps: dict[str, tuple[MapStore, SeenTiles, int]] = {}
+
+
+def _worker_seen_tiles(path: str, version: int) -> SeenTiles:
+    if path not in _worker_maps:
+        _worker_maps[path] = (MapStore(path, readonly=True), SeenTiles(dense=True), -1)
+    store, seen_tiles, synced = _worker_maps[path]
+    if synced != version:
+        store.refresh()
+        records = store.records
+        seen_tiles.update(to_tiles(records[records["turn"] > synced]))
+        synced = version
+    _worker_maps[path] = (store, seen_tiles, synced)
+    return seen_tiles
+
+
+def _plan_groups(
+    path: str,
+    version: int,
+    groups: list[list[AntJob]],
+    targets: TurnTargets,
+    max_expansions: Optional[int],
+) -> dict[str, list[tuple[int, int]]]:
+    """Worker entry point: plan `groups` on the shared map at `version`."""
+    seen_tiles = _worker_seen_tiles(path, version)
+    paths = {}
+    for jobs in groups:
+        paths.update(plan_group(seen_tiles, jobs, targets, max_expansions))
+    return paths
+
+
+class ParallelPlanner:
+    """
+    Plans ant groups on `workers` processes, mirroring `seen_tiles` into a
+    shared map store for them. The pool and the store are made on first use.
+    """
+
+    def __init__(self, seen_tiles: SeenTiles, workers: int):
+        self.seen_tiles = seen_tiles
+        self.workers = workers
+        self.pool: Optional[Executor] = None
+        self.store: Optional[MapStore] = None
+        self.store_dir: Optional[str] = None
+        seen_tiles.subscribe(self.on_change)
+
+    def _open_store(self):
+        shared = SHARED_MEMORY_DIR if os.path.isdir(SHARED_MEMORY_DIR) else None
+        self.store_dir = tempfile.mkdtemp(prefix="dpmap-", dir=shared)
+        self.store = MapStore(os.path.join(self.store_dir, "map.store"))
+        self.on_change(self.seen_tiles.keys())
+
+    def on_change(self, keys: Iterable[Hashable]):
+        """SeenTiles callback, the record turn column holds the version."""
+        if self.store is None:
+            return
+        seen_tiles = self.seen_tiles
+        version = seen_tiles.version
+        self.store.write((seen_tiles[key], version) for key in keys)
+
+    def plan(
+        self,
+        jobs: list[AntJob],
+        targets: TurnTargets,
+        max_expansions: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> dict[str, list[Hex]]:
+        """
+        Ant id -> full path to its target, empty when there is none or the
+        search ran out of `max_expansions`. Ants of the workers that are not
+        done within `timeout` seconds have no entry.
+        """
+        if self.store is None:
+            self._open_store()
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        groups = group_ants(jobs)
+        chunks = [groups[i :: self.workers] for i in range(self.workers)]
+        futures = [
+            self.pool.submit(
+                _plan_groups,
+                self.store.path,
+                self.seen_tiles.version,
+                chunk,
+                targets,
+                max_expansions,
+            )
+            for chunk in chunks
+            if chunk
+        ]
+        done, late = wait(futures, timeout=timeout)
+        for future in late:
+            future.cancel()
+        paths = {}
+        for future in futures:
+            if future not in done:
+                continue
+            for ant_id, path in future.result().items():
+                paths[ant_id] = [Hex(q, r) for q, r in path]
+        return paths
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+            shutil.rmtree(self.store_dir, ignore_errors=True)
@@ -2,23 +2,234 @@
 Pathfinding utilities for ant AI.
 """
 
-from typing import List, Set
+from typing import Callable, Hashable, Iterable, List, Optional, Set
 
-from data_structs import VERY_LARGE_INT, SeenTiles
+from data_structs import VERY_LARGE_INT, FrontierIndex, SeenTiles, hex_type_cost
 from game_types import UNIT_TYPE_STATS, Ant, Hex, HexType, Tile, UnitType
-from hex import neighbors
+from hex import (
+    neighbors,
+    oddr_to_cube,
+    pack_hex,
+    packed_neighbors,
+    unpack_hex,
+)
+from search import SearchResult, best_first_search
+from threat import ThreatMap
+
+Node = Hashable
+
+# Cheapest possible step, so hex distance times it never overestimates
+MIN_STEP_COST = min(hex_type_cost(t) for t in HexType)
+# Up to this many targets the A* heuristic checks each of them,
+# above it the heuristic uses the targets' bounding region
+SMALL_TARGET_SET = 8
 
 
 def tile_cost(tile: Tile) -> int:
-    t = HexType(tile.type)
-    if t in (HexType.EMPTY, HexType.ANTHILL):
-        return 1
-    elif t == HexType.DIRT:
-        return 2
-    elif t == HexType.ACID:
-        return 3
-    else:  # STONE or ACID
-        return VERY_LARGE_INT  # Use a large int for impassible
+    return hex_type_cost(tile.type)
+
+
+class SearchSpace:
+    """
+    Adapts SeenTiles to the search engine. Nodes are dense MapGraph indexes
+    when the graph is enabled, packed hex keys for packed SeenTiles and plain
+    hexes otherwise; `blocked` hexes and impassable tiles are never entered.
+    """
+
+    def __init__(self, seen_tiles: SeenTiles, blocked: Iterable[Hex] = ()):
+        self.seen_tiles = seen_tiles
+        self.graph = seen_tiles.graph
+        self.packed = seen_tiles.packed
+        # neighbors of a node that is a hex or a packed key
+        self.node_neighbors = packed_neighbors if self.packed else neighbors
+        if self.graph is not None:
+            self.blocked: set = self.graph.nodes_of(blocked)
+        elif self.packed:
+            self.blocked = {pack_hex(h) for h in blocked}
+        else:
+            self.blocked = (
+                blocked if isinstance(blocked, (set, frozenset)) else set(blocked)
+            )
+
+    def node(self, hex_: Hex) -> Optional[Node]:
+        if self.graph is not None:
+            return self.graph.index.get(hex_)
+        if self.packed:
+            return pack_hex(hex_)
+        return hex_
+
+    def nodes(self, hexes: Iterable[Hex]) -> set:
+        if self.graph is not None:
+            return self.graph.nodes_of(hexes)
+        if self.packed:
+            return {pack_hex(h) for h in hexes}
+        return set(hexes)
+
+    def hex(self, node: Node) -> Hex:
+        if self.graph is not None:
+            return self.graph.hexes[node]
+        if self.packed:
+            return unpack_hex(node)
+        return node
+
+    def hexes(self, nodes: Iterable[Node]) -> List[Hex]:
+        if self.graph is not None:
+            hexes = self.graph.hexes
+            return [hexes[node] for node in nodes]
+        if self.packed:
+            return [unpack_hex(node) for node in nodes]
+        return list(nodes)
+
+    def cost(self, node: Node) -> int:
+        """Cost of stepping onto `node`."""
+        if self.graph is not None:
+            return self.graph.cost[node]
+        tile = self.seen_tiles.get(node)
+        if not tile:
+            return VERY_LARGE_INT
+        return tile_cost(tile)
+
+    def passable(self, node: Node) -> bool:
+        return node not in self.blocked and self.cost(node) < VERY_LARGE_INT
+
+    def neighbor_nodes(self, hex_: Hex) -> List[Node]:
+        """Seen neighbors of `hex_`, which itself does not need to be seen."""
+        if self.graph is not None:
+            index = self.graph.index
+            return [index[n] for n in neighbors(hex_) if n in index]
+        if self.packed:
+            hex_ = pack_hex(hex_)
+        return [n for n in self.node_neighbors(hex_) if n in self.seen_tiles]
+
+    def expand(self, current: Node) -> List[tuple[Node, int]]:
+        blocked = self.blocked
+        result = []
+        if self.graph is not None:
+            base = 6 * current
+            cost = self.graph.cost
+            for neighbor in self.graph.adj[base : base + 6]:
+                if neighbor == -1 or neighbor in blocked:
+                    continue
+                n_cost = cost[neighbor]
+                if n_cost < VERY_LARGE_INT:
+                    result.append((neighbor, n_cost))
+            return result
+        for neighbor in self.node_neighbors(current):
+            if neighbor in blocked:
+                continue
+            n_cost = self.cost(neighbor)
+            if n_cost < VERY_LARGE_INT:
+                result.append((neighbor, n_cost))
+        return result
+
+    def expand_reverse(self, current: Node) -> List[tuple[Node, int]]:
+        """Neighbors that can step onto `current`, for searches run backwards."""
+        step_cost = self.cost(current)
+        if self.graph is not None:
+            base = 6 * current
+            return [
+                (neighbor, step_cost)
+                for neighbor in self.graph.adj[base : base + 6]
+                if neighbor != -1 and self.passable(neighbor)
+            ]
+        return [
+            (neighbor, step_cost)
+            for neighbor in self.node_neighbors(current)
+            if self.passable(neighbor)
+        ]
+
+
+class DistanceField:
+    """
+    Cost-to-go from every reached hex to the nearest of the source hexes.
+    Built once by a reverse multi-source Dijkstra, so many ants heading to the
+    same set of targets (e.g. carriers returning to the hive) share one search.
+    """
+
+    def __init__(
+        self,
+        sources: Iterable[Hex],
+        seen_tiles: SeenTiles,
+        blocked: Set[Hex],
+        stop_at: Optional[Set[Hex]] = None,
+        max_expansions: Optional[int] = None,
+    ):
+        self.space = space = SearchSpace(seen_tiles, blocked)
+        source_nodes = [
+            node
+            for node in map(space.node, sources)
+            if node is not None and space.passable(node)
+        ]
+        # Stop early once every hex we care about is settled. A blocked start
+        # leaves through one of its neighbors, so wait for those instead.
+        is_goal = None
+        if stop_at is not None:
+            pending = set()
+            for hex_ in stop_at:
+                node = space.node(hex_)
+                if node is not None and space.passable(node):
+                    pending.add(node)
+                else:
+                    pending.update(
+                        n for n in space.neighbor_nodes(hex_) if space.passable(n)
+                    )
+
+            def is_goal(node: Node) -> bool:
+                pending.discard(node)
+                return not pending
+
+        # `parent` of a node is its next step towards the closest source
+        self.result: SearchResult = best_first_search(
+            source_nodes,
+            space.expand_reverse,
+            is_goal=is_goal,
+            max_expansions=max_expansions,
+        )
+
+    def cost_from(self, start: Hex) -> int:
+        dist = self.result.dist
+        node = self.space.node(start)
+        if node in dist:
+            return dist[node]
+        first = self._first_step(start)
+        if first is None:
+            return VERY_LARGE_INT
+        return self.space.cost(first) + dist[first]
+
+    def path_from(self, start: Hex, max_steps: Optional[int] = None) -> List[Hex]:
+        """
+        Path from `start` to the closest source, including `start`,
+        in the same shape as `find_min_cost_path_to_any` returns.
+        The start itself may be blocked or unreached (e.g. an ant standing on
+        acid), in which case the best reached neighbor is used as the first step.
+        """
+        node = self.space.node(start)
+        if node not in self.result.dist:
+            node = self._first_step(start)
+            if node is None:
+                return []
+            nodes = [node]
+        else:
+            nodes = []
+        next_step = self.result.parent
+        while node in next_step:
+            if max_steps is not None and len(nodes) >= max_steps:
+                break
+            node = next_step[node]
+            nodes.append(node)
+        return [start] + self.space.hexes(nodes)
+
+    def _first_step(self, start: Hex) -> Optional[Node]:
+        dist = self.result.dist
+        best = None
+        best_cost = VERY_LARGE_INT
+        for neighbor in self.space.neighbor_nodes(start):
+            if neighbor not in dist:
+                continue
+            cost = self.space.cost(neighbor) + dist[neighbor]
+            if cost < best_cost:
+                best, best_cost = neighbor, cost
+        return best
 
 
 class PathTruncator:
@@ -26,8 +237,23 @@ class PathTruncator:
         self.seen_tiles = seen_tiles
         self.taken_destinations = taken_destinations
 
-    def truncate(self, ant: Ant, path: List[Hex]) -> List[Hex]:
+    def field_path(self, ant: Ant, field: DistanceField) -> List[Hex]:
+        """
+        This turn's part of the field's path for `ant`, start included, or []
+        when it enters a hex claimed this turn: the field was built before any
+        claims, the caller then searches around them instead.
+        """
+        speed = UNIT_TYPE_STATS[UnitType(ant.type)].speed
+        # every step costs at least 1, so `speed` steps is always enough
+        path = field.path_from(Hex(ant.q, ant.r), max_steps=speed)
+        if any(h in self.taken_destinations for h in path[1:]):
+            return []
+        return path
+
+    def truncate(self, ant: Ant, path: List[Hex] | DistanceField) -> List[Hex]:
         speed = UNIT_TYPE_STATS[UnitType(ant.type)].speed
+        if isinstance(path, DistanceField):
+            path = self.field_path(ant, path)
         if not path or len(path) < 2:
             return []
         truncated = []
@@ -42,86 +268,241 @@ class PathTruncator:
                 break
             truncated.append(curr)
             total_cost += step_cost
-        for i in range(1, len(truncated)):
-            if truncated[i] in self.taken_destinations:
+        for i, hex_ in enumerate(truncated):
+            if hex_ in self.taken_destinations:
                 truncated = truncated[:i]
                 break
         return truncated
 
 
+class ReachEnvelope:
+    """
+    Every hex an ant can reach this turn, from one Dijkstra bounded by its
+    speed. All local moves (truncating a path, fleeing, stepping aside) query
+    it, so they share one search and the `tile_cost` rules of the long
+    searches. Hexes other ants claim during the turn are not part of the
+    search, queries take the hexes to avoid instead.
+    """
+
+    def __init__(self, start: Hex, speed: int, seen_tiles: SeenTiles):
+        self.start = start
+        self.speed = speed
+        self.space = space = SearchSpace(seen_tiles)
+        self.start_node = space.node(start)
+        self.result = SearchResult()
+        if self.start_node is not None:
+            self.result = best_first_search(
+                [self.start_node], space.expand, max_cost=speed
+            )
+
+    def __contains__(self, hex_: Hex) -> bool:
+        return self.space.node(hex_) in self.result.dist
+
+    def cost(self, hex_: Hex) -> int:
+        """Cheapest way to `hex_` this turn, VERY_LARGE_INT if out of reach."""
+        return self.result.dist.get(self.space.node(hex_), VERY_LARGE_INT)
+
+    def step_cost(self, hex_: Hex) -> int:
+        """Cost of stepping onto `hex_`, VERY_LARGE_INT outside the envelope."""
+        node = self.space.node(hex_)
+        if node not in self.result.dist:
+            return VERY_LARGE_INT
+        return self.space.cost(node)
+
+    def hexes(self) -> List[Hex]:
+        """Reachable hexes without the start, cheapest first."""
+        return self.space.hexes(n for n in self.result.dist if n != self.start_node)
+
+    def first_steps(self) -> List[Hex]:
+        """Neighbors of the start that can be stepped on this turn."""
+        if self.start_node is None:
+            return []
+        dist = self.result.dist
+        return [
+            self.space.hex(n)
+            for n in self.space.neighbor_nodes(self.start)
+            if n in dist and n != self.start_node
+        ]
+
+    def path_to(self, hex_: Hex, avoid: Set[Hex] = frozenset()) -> List[Hex]:
+        """
+        Cheapest path to `hex_` without the start, [] if it is out of reach
+        or the path enters a hex in `avoid`.
+        """
+        node = self.space.node(hex_)
+        if node is None or node == self.start_node or node not in self.result.dist:
+            return []
+        path = self.space.hexes(self.result.path_to(node)[1:])
+        if avoid and not avoid.isdisjoint(path):
+            return []
+        return path
+
+
+class ReachEnvelopes(dict[str, ReachEnvelope]):
+    """ReachEnvelope of every ant that asked for one this turn, by ant id."""
+
+    def __init__(self, seen_tiles: SeenTiles):
+        super().__init__()
+        self.seen_tiles = seen_tiles
+
+    def of(self, ant: Ant) -> ReachEnvelope:
+        envelope = self.get(ant.id)
+        if envelope is None:
+            speed = UNIT_TYPE_STATS[UnitType(ant.type)].speed
+            envelope = self[ant.id] = ReachEnvelope(
+                Hex(ant.q, ant.r), speed, self.seen_tiles
+            )
+        return envelope
+
+
 def bfs_to_nearest_unexplored(
-    start_hex: Hex, unexplored: Set[Hex], food_hexes: Set[Hex], seen_tiles: SeenTiles
+    start_hex: Hex,
+    unexplored: Set[Hex],
+    food_hexes: Set[Hex],
+    seen_tiles: SeenTiles,
+    max_expansions: Optional[int] = None,
 ) -> List[Hex]:
-    import heapq
-    import itertools
-
-    queue = []
-    counter = itertools.count()
-    heapq.heappush(queue, (0, next(counter), [start_hex]))
-    visited = set()
-    while queue:
-        cost_so_far, _, path = heapq.heappop(queue)
-        current = path[-1]
-        if current in visited:
-            continue
-        visited.add(current)
-        if current in unexplored and current not in food_hexes:
-            return path
-        for neighbor in neighbors(current):
-            if neighbor in visited:
-                continue
-            tile = seen_tiles.get(neighbor)
-            if not tile:
-                continue
-            n_cost = tile_cost(tile)
-            if n_cost >= VERY_LARGE_INT:
-                continue
-            heapq.heappush(
-                queue, (cost_so_far + n_cost, next(counter), path + [neighbor])
+    space = SearchSpace(seen_tiles)
+    start = space.node(start_hex)
+    if start is None:
+        return []
+    goals = space.nodes(unexplored - food_hexes)
+    result = best_first_search(
+        [start],
+        space.expand,
+        is_goal=goals.__contains__,
+        max_expansions=max_expansions,
+    )
+    return space.hexes(result.path())
+
+
+def bfs_to_frontier(
+    start_hex: Hex,
+    frontier: FrontierIndex,
+    seen_tiles: SeenTiles,
+    max_expansions: Optional[int] = None,
+) -> List[Hex]:
+    """`bfs_to_nearest_unexplored` over a maintained frontier, without set copies."""
+    space = SearchSpace(seen_tiles)
+    start = space.node(start_hex)
+    if start is None:
+        return []
+    result = best_first_search(
+        [start],
+        space.expand,
+        is_goal=frontier.nodes.__contains__,
+        max_expansions=max_expansions,
+    )
+    return space.hexes(result.path())
+
+
+def hex_distance_heuristic(
+    space: SearchSpace, targets: Iterable[Hex]
+) -> Callable[[Node], int]:
+    """
+    Admissible and consistent A* heuristic: hex distance to the closest target
+    scaled by the cheapest step. Large target sets use the distance to their
+    bounding region in cube coordinates instead, which is cheaper to evaluate
+    and still a lower bound.
+    """
+    cubes = [oddr_to_cube(t) for t in targets]
+    to_hex = space.hex
+    if not cubes:
+        return lambda node: 0
+    if len(cubes) <= SMALL_TARGET_SET:
+
+        def heuristic(node: Node) -> int:
+            x, y, z = oddr_to_cube(to_hex(node))
+            return MIN_STEP_COST * min(
+                max(abs(x - tx), abs(y - ty), abs(z - tz)) for tx, ty, tz in cubes
             )
-    return []
+
+        return heuristic
+
+    xs, ys, zs = zip(*cubes)
+    x_lo, x_hi, y_lo, y_hi, z_lo, z_hi = (
+        min(xs),
+        max(xs),
+        min(ys),
+        max(ys),
+        min(zs),
+        max(zs),
+    )
+
+    def heuristic(node: Node) -> int:
+        x, y, z = oddr_to_cube(to_hex(node))
+        return MIN_STEP_COST * max(
+            x_lo - x, x - x_hi, y_lo - y, y - y_hi, z_lo - z, z - z_hi, 0
+        )
+
+    return heuristic
+
+
+def min_cost_search(
+    start: Hex,
+    targets: Set[Hex],
+    seen_tiles: SeenTiles,
+    taken_destinations: Set[Hex],
+    max_expansions: Optional[int] = None,
+    astar: bool = False,
+) -> tuple[SearchSpace, SearchResult]:
+    """Search behind `find_min_cost_path_to_any`, exposed for benchmarks."""
+    space = SearchSpace(seen_tiles, taken_destinations)
+    start_node = space.node(start)
+    if start_node is None:
+        return space, SearchResult()
+    valid_targets = targets - taken_destinations
+    goals = space.nodes(valid_targets)
+    # Validate path: must be more than just the start
+    goals.discard(start_node)
+    if not goals:
+        return space, SearchResult()
+    heuristic = None
+    if astar:
+        heuristic = hex_distance_heuristic(space, space.hexes(goals))
+    result = best_first_search(
+        [start_node],
+        space.expand,
+        is_goal=goals.__contains__,
+        max_expansions=max_expansions,
+        heuristic=heuristic,
+    )
+    return space, result
 
 
 def find_min_cost_path_to_any(
-    start: Hex, targets: Set[Hex], seen_tiles: SeenTiles, taken_destinations: Set[Hex]
+    start: Hex,
+    targets: Set[Hex],
+    seen_tiles: SeenTiles,
+    taken_destinations: Set[Hex],
+    max_expansions: Optional[int] = None,
+    astar: bool = False,
 ) -> List[Hex]:
-    import heapq
-    import itertools
-
-    queue = []
-    counter = itertools.count()
-    heapq.heappush(queue, (0, next(counter), [start]))
-    visited = set()
-    found_paths = {}
-    valid_targets = targets - taken_destinations
-    checked_paths = 0
-    MAX_PATHS_TO_CHECK = 30
-    while queue and checked_paths < MAX_PATHS_TO_CHECK:
-        cost_so_far, _, path = heapq.heappop(queue)
-        current = path[-1]
-        if current in visited:
+    space, result = min_cost_search(
+        start, targets, seen_tiles, taken_destinations, max_expansions, astar
+    )
+    return space.hexes(result.path())
+
+
+def find_safest_path(
+    envelope: ReachEnvelope,
+    threat: ThreatMap,
+    avoid: Set[Hex],
+) -> List[Hex]:
+    """
+    The hex of the ant's reach envelope with the least expected damage whose
+    path stays off `avoid`, the furthest one among equally safe hexes.
+    Returns the path without the start.
+    """
+    best: List[Hex] = []
+    best_damage = float("inf")
+    # settle order goes outwards, a later hex of the same damage is further
+    for curr in envelope.hexes():
+        damage = threat.damage(curr)
+        if damage > best_damage:
             continue
-        visited.add(current)
-        if current in valid_targets:
-            # Validate path: must be more than just the start
-            if len(path) > 1:
-                found_paths[current] = (cost_so_far, path)
-                checked_paths += 1
-        for neighbor in neighbors(current):
-            if neighbor in visited:
-                continue
-            if neighbor in taken_destinations and neighbor != start:
-                continue
-            tile = seen_tiles.get(neighbor)
-            if not tile:
-                continue
-            n_cost = tile_cost(tile)
-            if n_cost >= VERY_LARGE_INT:
-                continue
-            heapq.heappush(
-                queue, (cost_so_far + n_cost, next(counter), path + [neighbor])
-            )
-    if not found_paths:
-        return []
-    min_food, (min_cost, min_path) = min(found_paths.items(), key=lambda x: x[1][0])
-    return min_path
+        path = envelope.path_to(curr, avoid)
+        if path:
+            best_damage = damage
+            best = path
+    return best
@@ -0,0 +1,175 @@
+"""
+Incremental replanning for ants that keep the same goal across turns.
+
+D* Lite searches backwards from the goal, so the ant can move between turns
+and tiles or blocked hexes can change without throwing the search away: only
+nodes whose costs changed are repaired. Works on the dense MapGraph only.
+"""
+
+import heapq
+from typing import List, Optional, Set
+
+from data_structs import VERY_LARGE_INT, SeenTiles
+from game_types import Hex
+from hex import oddr_to_cube
+from pathfinding import MIN_STEP_COST, SearchSpace
+from search import totals
+
+INF = VERY_LARGE_INT
+
+
+class IncrementalPlanner:
+    """
+    Persistent D* Lite state for one ant heading to `goal`.
+    Call `plan` every turn with the ant position and that turn's blocked
+    hexes; it returns the cheapest path in the same shape as
+    `find_min_cost_path_to_any` does.
+    """
+
+    def __init__(self, goal: Hex):
+        self.goal = goal
+        self.goal_node: Optional[int] = None
+        self.g: dict[int, int] = {}
+        self.rhs: dict[int, int] = {}
+        self.queue: list[tuple[int, int, int]] = []
+        # current key of every node in the queue, older heap entries are stale
+        self.open: dict[int, tuple[int, int]] = {}
+        self.km = 0
+        self.start: Optional[int] = None
+        self.start_cube: tuple[int, int, int] = (0, 0, 0)
+        self.blocked: set[int] = set()
+        # position in `MapGraph.changed` that is already accounted for
+        self.seen_changes = 0
+        self.expanded = 0
+        self.space: Optional[SearchSpace] = None
+
+    def plan(
+        self,
+        start: Hex,
+        seen_tiles: SeenTiles,
+        blocked: Set[Hex],
+        max_expansions: Optional[int] = None,
+    ) -> List[Hex]:
+        """
+        Cheapest path from `start`, or [] when there is none or the search
+        stopped after `max_expansions` nodes; a later call resumes it.
+        """
+        graph = seen_tiles.graph
+        if graph is None:
+            raise ValueError("IncrementalPlanner needs SeenTiles(dense=True)")
+        self.space = space = SearchSpace(seen_tiles, blocked)
+        start_node = space.node(start)
+        goal_node = space.node(self.goal)
+        if start_node is None or goal_node is None or start_node == goal_node:
+            return []
+        if self.goal_node is None:
+            self.goal_node = goal_node
+            self.start = start_node
+            self.start_cube = oddr_to_cube(start)
+            self.rhs[goal_node] = 0
+            self._push(goal_node)
+        else:
+            if start_node != self.start:
+                last_start = self.start
+                self.start = start_node
+                self.start_cube = oddr_to_cube(start)
+                # keys already queued were measured from the last start
+                self.km += self._heuristic(last_start)
+            changed = set(graph.changed[self.seen_changes :])
+            changed |= self.blocked ^ space.blocked
+            adj = graph.adj
+            for node in changed:
+                # stepping onto `node` got cheaper or dearer for every neighbor
+                self._update(node)
+                for neighbor in adj[6 * node : 6 * node + 6]:
+                    if neighbor != -1:
+                        self._update(neighbor)
+        self.blocked = space.blocked
+        self.seen_changes = len(graph.changed)
+        expanded = self.expanded
+        done = self._compute(max_expansions)
+        totals.searches += 1
+        totals.expanded += self.expanded - expanded
+        if not done:
+            return []
+        return space.hexes(self._extract_path())
+
+    def _heuristic(self, node: int) -> int:
+        x, y, z = oddr_to_cube(self.space.hex(node))
+        sx, sy, sz = self.start_cube
+        return MIN_STEP_COST * max(abs(x - sx), abs(y - sy), abs(z - sz))
+
+    def _key(self, node: int) -> tuple[int, int]:
+        best = min(self.g.get(node, INF), self.rhs.get(node, INF))
+        return best + self._heuristic(node) + self.km, best
+
+    def _push(self, node: int):
+        key = self._key(node)
+        self.open[node] = key
+        heapq.heappush(self.queue, (key[0], key[1], node))
+
+    def _best_successor(self, node: int) -> tuple[int, Optional[int]]:
+        g = self.g
+        best_cost, best = INF, None
+        for neighbor, step_cost in self.space.expand(node):
+            cost = step_cost + g.get(neighbor, INF)
+            if cost < best_cost:
+                best_cost, best = cost, neighbor
+        return best_cost, best
+
+    def _update(self, node: int):
+        if node != self.goal_node:
+            self.rhs[node] = self._best_successor(node)[0]
+        if self.g.get(node, INF) != self.rhs.get(node, INF):
+            self._push(node)
+        else:
+            self.open.pop(node, None)
+
+    def _compute(self, max_expansions: Optional[int] = None) -> bool:
+        """Settle the start, False when `max_expansions` ran out first."""
+        g, rhs, queue, open_ = self.g, self.rhs, self.queue, self.open
+        adj = self.space.graph.adj
+        start = self.start
+        limit = INF if max_expansions is None else self.expanded + max_expansions
+        while queue:
+            k1, k2, node = queue[0]
+            if open_.get(node) != (k1, k2):
+                heapq.heappop(queue)
+                continue
+            if (k1, k2) >= self._key(start) and rhs.get(start, INF) == g.get(
+                start, INF
+            ):
+                break
+            if self.expanded >= limit:
+                return False
+            heapq.heappop(queue)
+            new_key = self._key(node)
+            if (k1, k2) < new_key:
+                self._push(node)
+                continue
+            del open_[node]
+            self.expanded += 1
+            if g.get(node, INF) > rhs.get(node, INF):
+                g[node] = rhs[node]
+            else:
+                g[node] = INF
+                self._update(node)
+            for neighbor in adj[6 * node : 6 * node + 6]:
+                if neighbor != -1:
+                    self._update(neighbor)
+        return True
+
+    def _extract_path(self) -> List[int]:
+        node = self.start
+        if self.g.get(node, INF) >= INF:
+            return []
+        path = [node]
+        # every step strictly lowers g, the bound only guards against bugs
+        for _ in range(len(self.space.graph)):
+            if node == self.goal_node:
+                return path
+            cost, node = self._best_successor(node)
+            if node is None or cost >= INF:
+                return []
+            path.append(node)
+        return []
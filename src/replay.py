@@ -0,0 +1,83 @@
+"""
+Reading arena responses and map stores recorded by main.py, and playing
+responses back through an AI.
+Each response is one JSON line; recordings separate them with blank lines.
+"""
+
+import contextlib
+import io
+import json
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+from dacite import from_dict
+
+from data_structs import SeenTiles
+from game_types import PlayerResponse
+from instrumentation import Span
+from map_store import read_tiles
+from search import totals
+
+
+def iter_player_responses(path: str) -> Iterator[PlayerResponse]:
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield from_dict(PlayerResponse, json.loads(line))
+
+
+def load_seen_tiles(store_path: str, dense: bool = False) -> SeenTiles:
+    """The map a bot had seen, from its `map_store` file."""
+    seen_tiles = SeenTiles(dense=dense)
+    seen_tiles.update(read_tiles(store_path))
+    return seen_tiles
+
+
+@dataclass
+class TurnRecord:
+    turn: int
+    ants: int
+    moves: int
+    seconds: float
+    expanded: int
+    # bytes traced at the highest point of the turn, 0 without tracing
+    peak_memory: int
+    # every span of the turn by its path, e.g. "workers/search"
+    phases: dict[str, Span]
+
+
+def replay(
+    responses: Iterable[PlayerResponse], ai, trace_memory: bool = True
+) -> Iterator[TurnRecord]:
+    """
+    Feed `responses` one by one to `ai` and measure every `get_move_commands`
+    with its instrumentation, which must be enabled.
+    Tracing memory slows the AI down, so times are only comparable between
+    runs that trace alike.
+    """
+    tracing = trace_memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    try:
+        for player_response in responses:
+            expanded = totals.expanded
+            with contextlib.redirect_stdout(io.StringIO()):
+                started = time.perf_counter()
+                move_commands = ai.get_move_commands(player_response)
+                seconds = time.perf_counter() - started
+            turn = ai.instrumentation.finish_turn()
+            yield TurnRecord(
+                turn=player_response.turnNo,
+                ants=len(player_response.ants),
+                moves=sum(1 for move in move_commands.moves if move.path),
+                seconds=seconds,
+                expanded=totals.expanded - expanded,
+                peak_memory=turn.peak_memory,
+                phases=turn.flat(),
+            )
+    finally:
+        if tracing:
+            tracemalloc.stop()
@@ -0,0 +1,111 @@
+"""
+Best-first search core shared by the pathfinding routines.
+
+Nodes can be anything hashable (hexes or dense graph indexes). The engine
+keeps predecessor links instead of whole paths in the heap and rebuilds only
+the path that is asked for.
+"""
+
+import heapq
+import itertools
+from dataclasses import dataclass, field
+from typing import Callable, Generic, Hashable, Iterable, Optional, TypeVar
+
+N = TypeVar("N", bound=Hashable)
+
+
+@dataclass(slots=True)
+class SearchResult(Generic[N]):
+    dist: dict[N, int] = field(default_factory=dict)
+    parent: dict[N, N] = field(default_factory=dict)
+    goal: Optional[N] = None
+    expanded: int = 0
+    pushes: int = 0
+    out_of_budget: bool = False
+
+    def path_to(self, node: N) -> list[N]:
+        """Path from the start that reached `node` to `node`, both included."""
+        if node not in self.dist:
+            return []
+        path = [node]
+        parent = self.parent
+        while node in parent:
+            node = parent[node]
+            path.append(node)
+        path.reverse()
+        return path
+
+    def path(self) -> list[N]:
+        if self.goal is None:
+            return []
+        return self.path_to(self.goal)
+
+
+@dataclass(slots=True)
+class SearchTotals:
+    """Work of every search run in this process so far, read by benchmarks."""
+
+    searches: int = 0
+    expanded: int = 0
+    pushes: int = 0
+
+
+totals = SearchTotals()
+
+
+def best_first_search(
+    starts: Iterable[N],
+    expand: Callable[[N], Iterable[tuple[N, int]]],
+    is_goal: Optional[Callable[[N], bool]] = None,
+    max_expansions: Optional[int] = None,
+    max_cost: Optional[int] = None,
+    heuristic: Optional[Callable[[N], int]] = None,
+) -> SearchResult[N]:
+    """
+    Dijkstra from every node in `starts`, or A* when a `heuristic` is given.
+    The heuristic must be consistent (never drop by more than the step cost),
+    otherwise settled costs are not optimal.
+    `expand(node)` yields `(neighbor, step_cost)` pairs.
+    Stops at the first settled node for which `is_goal` is true, after
+    `max_expansions` expanded nodes, or when nothing cheaper than `max_cost`
+    is left.
+    """
+    result: SearchResult[N] = SearchResult()
+    dist = result.dist
+    parent = result.parent
+    queue = []
+    counter = itertools.count()
+    for start in starts:
+        priority = heuristic(start) if heuristic is not None else 0
+        heapq.heappush(queue, (priority, next(counter), 0, start, None))
+    while queue:
+        _, _, cost_so_far, current, came_from = heapq.heappop(queue)
+        if current in dist:
+            continue
+        dist[current] = cost_so_far
+        if came_from is not None:
+            parent[current] = came_from
+        if is_goal is not None and is_goal(current):
+            result.goal = current
+            break
+        if max_expansions is not None and result.expanded >= max_expansions:
+            result.out_of_budget = True
+            break
+        result.expanded += 1
+        for neighbor, step_cost in expand(current):
+            if neighbor in dist:
+                continue
+            new_cost = cost_so_far + step_cost
+            if max_cost is not None and new_cost > max_cost:
+                continue
+            priority = new_cost
+            if heuristic is not None:
+                priority += heuristic(neighbor)
+            heapq.heappush(
+                queue, (priority, next(counter), new_cost, neighbor, current)
+            )
+            result.pushes += 1
+    totals.searches += 1
+    totals.expanded += result.expanded
+    totals.pushes += result.pushes
+    return result
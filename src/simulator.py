@@ -0,0 +1,534 @@
+"""
+Headless simulator of the game rules (rules.txt), to run the AI offline.
+
+uv run ./src/simulator.py [--players 2] [--size 60] [--turns 300] [--seed 0]
+
+A `Game` holds the full state and advances one turn per `step`, taking each
+player's `PlayerMoveCommands` and doing what the server does between turns,
+in the order of the rules:
+
+1. the units are shuffled, that order is used for the rest of the turn
+2. units move along their paths, stopping before hexes they cannot enter,
+   then acid hurts the units that ended on it
+3. anthills hit every enemy unit within `HILL_RADIUS`, once per turn
+   even where the zones of several hills overlap
+4. units next to enemies where the turn ends attack one of them at random,
+   with the support and anthill bonuses of table 2; the survivors drop
+   their food on their own anthill or pick up food where they stand
+5. every anthill spawns a unit unless the colony is at `UNIT_LIMIT` or a
+   unit of the drawn type already stands on its spot
+6. food appears on random free hexes
+
+Raids on enemy anthills and the nectar they store are not simulated, food
+brought home counts its calories straight to the score. `response(player)`
+is what that player sees: the hexes in view of its units, along the paths
+they walked this turn too, and around its spot.
+
+Everything random goes through one `random.Random(seed)`, so a game is
+reproducible given the seed and the commands.
+"""
+
+import argparse
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+import numpy as np
+
+import hex_batch
+from game_types import (
+    FOOD_TYPE_STATS,
+    UNIT_TYPE_STATS,
+    Ant,
+    AntMoveCommand,
+    Food,
+    FoodOnMap,
+    FoodType,
+    Hex,
+    HexType,
+    PlayerEnemy,
+    PlayerMoveCommands,
+    PlayerResponse,
+    Tile,
+    UnitType,
+)
+from hex import neighbors
+from vision import revealed_keys
+
+# Movement points of stepping onto each hex type, as the server reports them
+TILE_COST = {
+    HexType.ANTHILL: 1,
+    HexType.EMPTY: 1,
+    HexType.DIRT: 2,
+    HexType.ACID: 1,
+    HexType.STONE: 30,
+}
+ACID_DAMAGE = 20
+HILL_DAMAGE = 20
+HILL_RADIUS = 2
+# How far the spot sees
+SPOT_VIEW = 2
+SUPPORT_BONUS = 0.5
+HILL_BONUS = 0.25
+UNIT_LIMIT = 100
+# Chance per turn that food appears, on how many hexes of the map per 1000
+FOOD_PROBABILITY = 0.5
+FOOD_HEXES_PER_1000 = 3
+MAX_FOOD_PER_HEX = 10
+NEXT_TURN_IN = 2.0
+
+
+@dataclass(slots=True)
+class Unit:
+    id: str
+    player: int
+    type: UnitType
+    q: int
+    r: int
+    health: int
+    food_type: int = 0
+    food_amount: int = 0
+    last_move: list[Hex] = field(default_factory=list)
+    last_attack: Optional[Hex] = None
+    last_enemy: Optional[str] = None
+
+    @property
+    def hex(self) -> Hex:
+        return Hex(self.q, self.r)
+
+    @property
+    def alive(self) -> bool:
+        return self.health > 0
+
+
+@dataclass
+class Player:
+    home: list[Hex]
+    score: int = 0
+    # units spawned so far, for their ids
+    spawned: int = 0
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def spot(self) -> Hex:
+        return self.home[0]
+
+
+class Game:
+    def __init__(
+        self,
+        types: dict[Hex, HexType],
+        homes: list[list[Hex]],
+        food: Optional[dict[Hex, FoodOnMap]] = None,
+        seed: int = 0,
+        next_turn_in: float = NEXT_TURN_IN,
+    ):
+        self.rng = random.Random(seed)
+        self.types = types
+        self.tiles = {
+            h: Tile(cost=TILE_COST[t], q=h.q, r=h.r, type=t) for h, t in types.items()
+        }
+        self.players = [Player(list(home)) for home in homes]
+        # anthill hex -> owner
+        self.hills = {h: p for p, home in enumerate(homes) for h in home}
+        self.food: dict[Hex, FoodOnMap] = dict(food or {})
+        self.units: dict[str, Unit] = {}
+        self.turn = 0
+        self.next_turn_in = next_turn_in
+        # hex -> owners of the anthills within HILL_RADIUS of it
+        self.hill_zone: dict[Hex, set[int]] = {}
+        for h, owner in self.hills.items():
+            for near in hex_batch.to_hexes(hex_batch.hex_range(h, HILL_RADIUS)):
+                self.hill_zone.setdefault(near, set()).add(owner)
+        self.free_hexes = [
+            h for h, t in types.items() if t != HexType.STONE and h not in self.hills
+        ]
+        for player in range(len(self.players)):
+            for unit_type in UnitType:
+                self._spawn(player, unit_type)
+
+    @classmethod
+    def generate(
+        cls, players: int = 2, size: int = 60, seed: int = 0, **kwargs
+    ) -> "Game":
+        """Random square map with the anthills spread evenly on a circle."""
+        rng = random.Random(seed)
+        types = {
+            Hex(q, r): rng.choices(
+                [HexType.EMPTY, HexType.DIRT, HexType.ACID, HexType.STONE],
+                [75, 12, 3, 10],
+            )[0]
+            for q in range(size)
+            for r in range(size)
+        }
+        homes = []
+        radius = size / 3
+        for p in range(players):
+            angle = 2 * np.pi * p / players
+            spot = Hex(
+                round(size / 2 + radius * np.cos(angle)),
+                round(size / 2 + radius * np.sin(angle)),
+            )
+            home = [spot] + list(neighbors(spot)[:2])
+            for h in hex_batch.to_hexes(hex_batch.hex_range(spot, HILL_RADIUS)):
+                if h in types and types[h] == HexType.STONE:
+                    types[h] = HexType.EMPTY
+            for h in home:
+                types[h] = HexType.ANTHILL
+            homes.append(home)
+        free = [
+            h for h, t in types.items() if t not in (HexType.STONE, HexType.ANTHILL)
+        ]
+        food = {
+            h: FoodOnMap(
+                amount=rng.randint(1, MAX_FOOD_PER_HEX),
+                q=h.q,
+                r=h.r,
+                type=rng.choice([FoodType.APPLE, FoodType.BREAD]),
+            )
+            for h in rng.sample(free, len(free) // 40)
+        }
+        return cls(types, homes, food, seed=seed, **kwargs)
+
+    # --- state ---
+
+    def units_of(self, player: int) -> list[Unit]:
+        return [u for u in self.units.values() if u.player == player]
+
+    def _positions(self) -> dict[Hex, list[Unit]]:
+        positions: dict[Hex, list[Unit]] = {}
+        for unit in self.units.values():
+            positions.setdefault(unit.hex, []).append(unit)
+        return positions
+
+    def _spawn(self, player: int, unit_type: UnitType) -> Optional[Unit]:
+        owner = self.players[player]
+        spot = owner.spot
+        if any(
+            u.player == player and u.type == unit_type and u.hex == spot
+            for u in self.units.values()
+        ):
+            return None
+        owner.spawned += 1
+        unit = Unit(
+            id=f"p{player}-{owner.spawned}",
+            player=player,
+            type=unit_type,
+            q=spot.q,
+            r=spot.r,
+            health=UNIT_TYPE_STATS[unit_type].health,
+        )
+        self.units[unit.id] = unit
+        return unit
+
+    def _hurt(self, unit: Unit, damage: float):
+        unit.health -= damage
+        if unit.health <= 0:
+            self._kill(unit)
+
+    def _kill(self, unit: Unit):
+        del self.units[unit.id]
+        if unit.food_amount:
+            self._drop(unit.hex, unit.food_type, unit.food_amount)
+
+    def _drop(self, at: Hex, food_type: int, amount: int):
+        """Food of a dead unit goes to its hex, or the closest hex it fits on."""
+        for h in (at,) + neighbors(at):
+            if h not in self.types or self.types[h] == HexType.STONE:
+                continue
+            there = self.food.get(h)
+            if there is None or there.type == food_type:
+                total = amount + (there.amount if there else 0)
+                self.food[h] = FoodOnMap(amount=total, q=h.q, r=h.r, type=food_type)
+                return
+
+    # --- turn ---
+
+    def step(self, commands: dict[int, PlayerMoveCommands]) -> list[PlayerResponse]:
+        """Advance one turn with each player's commands, return what they see next."""
+        for player in self.players:
+            player.errors.clear()
+        order = sorted(self.units.values(), key=lambda u: u.id)
+        self.rng.shuffle(order)
+        paths = self._validated_paths(commands)
+        for unit in order:
+            unit.last_move = []
+        self._moves(order, paths)
+        for unit in order:
+            if unit.id in self.units and self.types[unit.hex] == HexType.ACID:
+                self._hurt(unit, ACID_DAMAGE)
+        # combat, deliveries and raids all go by where the turn ends
+        self._hill_attacks()
+        self._attacks([u for u in order if u.alive and u.id in self.units])
+        self._collect([u for u in order if u.id in self.units])
+        for player in range(len(self.players)):
+            if len(self.units_of(player)) < UNIT_LIMIT:
+                unit_type = self.rng.choices(
+                    list(UNIT_TYPE_STATS),
+                    [stats.prob for stats in UNIT_TYPE_STATS.values()],
+                )[0]
+                self._spawn(player, unit_type)
+        self._grow_food()
+        self.turn += 1
+        return [self.response(p) for p in range(len(self.players))]
+
+    def _hill_attacks(self):
+        for unit in list(self.units.values()):
+            owners = self.hill_zone.get(unit.hex, ())
+            enemies = len(owners) - (unit.player in owners)
+            # a unit takes damage from one hex a turn, however many hills reach it
+            if enemies:
+                self._hurt(unit, HILL_DAMAGE)
+
+    def _attacks(self, order: list[Unit]):
+        positions = self._positions()
+        for unit in order:
+            if not unit.alive:
+                continue
+            targets = [
+                enemy
+                for h in neighbors(unit.hex)
+                for enemy in positions.get(h, ())
+                if enemy.player != unit.player and enemy.alive
+            ]
+            if not targets:
+                continue
+            target = self.rng.choice(targets)
+            bonus = 1.0
+            if self._supported(unit, target, positions):
+                bonus += SUPPORT_BONUS
+            if unit.player in self.hill_zone.get(unit.hex, ()):
+                bonus += HILL_BONUS
+            unit.last_attack = target.hex
+            unit.last_enemy = target.id
+            self._hurt(target, UNIT_TYPE_STATS[unit.type].attack * bonus)
+
+    @staticmethod
+    def _supported(unit: Unit, target: Unit, positions: dict[Hex, list[Unit]]) -> bool:
+        """Another ally next to both the unit and its target, not on the unit's hex."""
+        around_target = set(neighbors(target.hex))
+        for h in neighbors(unit.hex):
+            if h not in around_target:
+                continue
+            for ally in positions.get(h, ()):
+                if ally.player == unit.player and ally is not unit and ally.alive:
+                    return True
+        return False
+
+    def _validated_paths(
+        self, commands: dict[int, PlayerMoveCommands]
+    ) -> dict[str, list[Hex]]:
+        """The API checks: own unit, known adjacent hexes, within its speed."""
+        paths = {}
+        for player, player_commands in commands.items():
+            errors = self.players[player].errors
+            for move in player_commands.moves:
+                unit = self.units.get(move.ant)
+                if unit is None or unit.player != player:
+                    errors.append(f"unknown ant {move.ant}")
+                    continue
+                error = self._path_error(unit, move)
+                if error:
+                    errors.append(f"ant {move.ant}: {error}")
+                    continue
+                paths[unit.id] = list(move.path)
+        return paths
+
+    def _path_error(self, unit: Unit, move: AntMoveCommand) -> Optional[str]:
+        points = UNIT_TYPE_STATS[unit.type].speed
+        at = unit.hex
+        for h in move.path:
+            if h not in self.types:
+                return f"{h} is off the map"
+            if h not in neighbors(at):
+                return f"{h} is not next to {at}"
+            points -= TILE_COST[self.types[h]]
+            at = h
+        if points < 0:
+            return "path is longer than the unit's speed"
+        return None
+
+    def _moves(self, order: list[Unit], paths: dict[str, list[Hex]]):
+        positions = self._positions()
+        for unit in order:
+            for h in paths.get(unit.id, ()):
+                if self.types[h] == HexType.STONE:
+                    break
+                if self.hills.get(h, unit.player) != unit.player:
+                    break
+                blocked = any(
+                    other.player != unit.player or other.type == unit.type
+                    for other in positions.get(h, ())
+                )
+                if blocked:
+                    break
+                positions[unit.hex].remove(unit)
+                unit.q, unit.r = h.q, h.r
+                positions.setdefault(h, []).append(unit)
+                unit.last_move.append(h)
+
+    def _collect(self, order: list[Unit]):
+        for unit in order:
+            at = unit.hex
+            if self.hills.get(at) == unit.player:
+                if unit.food_amount:
+                    calories = FOOD_TYPE_STATS[FoodType(unit.food_type)].calories
+                    self.players[unit.player].score += unit.food_amount * calories
+                    unit.food_amount = 0
+                    unit.food_type = 0
+                continue
+            food = self.food.get(at)
+            if food is None or unit.food_amount and unit.food_type != food.type:
+                continue
+            room = UNIT_TYPE_STATS[unit.type].capacity - unit.food_amount
+            taken = min(room, food.amount)
+            if taken <= 0:
+                continue
+            unit.food_type = food.type
+            unit.food_amount += taken
+            if taken == food.amount:
+                del self.food[at]
+            else:
+                self.food[at] = FoodOnMap(
+                    amount=food.amount - taken, q=at.q, r=at.r, type=food.type
+                )
+
+    def _grow_food(self):
+        if self.rng.random() >= FOOD_PROBABILITY:
+            return
+        occupied = self._positions()
+        count = max(1, len(self.types) * FOOD_HEXES_PER_1000 // 1000)
+        for h in self.rng.sample(self.free_hexes, min(count, len(self.free_hexes))):
+            if h in self.food or h in occupied:
+                continue
+            self.food[h] = FoodOnMap(
+                amount=self.rng.randint(1, MAX_FOOD_PER_HEX),
+                q=h.q,
+                r=h.r,
+                type=self.rng.choice([FoodType.APPLE, FoodType.BREAD]),
+            )
+
+    # --- views ---
+
+    def visible(self, player: int) -> set[Hex]:
+        """Hexes in view of the player's units, along their moves, and its spot."""
+        by_radius: dict[int, list[Hex]] = {SPOT_VIEW: [self.players[player].spot]}
+        for unit in self.units_of(player):
+            radius = UNIT_TYPE_STATS[unit.type].view
+            by_radius.setdefault(radius, []).append(unit.hex)
+            by_radius[radius].extend(unit.last_move)
+        seen = hex_batch.unpack(revealed_keys(by_radius))
+        return {h for h in hex_batch.to_hexes(seen) if h in self.types}
+
+    def response(self, player: int) -> PlayerResponse:
+        visible = self.visible(player)
+        owner = self.players[player]
+        ants = []
+        enemies = []
+        for unit in self.units.values():
+            food = Food(amount=unit.food_amount, type=unit.food_type)
+            if unit.player == player:
+                ants.append(
+                    Ant(
+                        food=food,
+                        health=unit.health,
+                        id=unit.id,
+                        lastAttack=unit.last_attack,
+                        lastEnemyAnt=unit.last_enemy,
+                        q=unit.q,
+                        r=unit.r,
+                        type=unit.type,
+                        lastMove=list(unit.last_move),
+                    )
+                )
+            elif unit.hex in visible:
+                enemies.append(
+                    PlayerEnemy(
+                        attack=UNIT_TYPE_STATS[unit.type].attack,
+                        food=food,
+                        health=unit.health,
+                        q=unit.q,
+                        r=unit.r,
+                        type=unit.type,
+                    )
+                )
+        tiles = self.tiles
+        return PlayerResponse(
+            ants=ants,
+            enemies=enemies,
+            food=[food for h, food in self.food.items() if h in visible],
+            home=list(owner.home),
+            map=[tiles[h] for h in visible],
+            nextTurnIn=self.next_turn_in,
+            score=owner.score,
+            spot=owner.spot,
+            turnNo=self.turn,
+        )
+
+
+def wander(game: Game, player: int, rng: random.Random) -> PlayerMoveCommands:
+    """Every unit of `player` walks randomly as far as its speed allows."""
+    moves = []
+    for unit in game.units_of(player):
+        points = UNIT_TYPE_STATS[unit.type].speed
+        path = []
+        at = unit.hex
+        while True:
+            step = rng.choice(neighbors(at))
+            cost = TILE_COST.get(game.types.get(step, HexType.STONE))
+            if cost > points:
+                break
+            points -= cost
+            path.append(step)
+            at = step
+        moves.append(AntMoveCommand(ant=unit.id, path=path))
+    return PlayerMoveCommands(moves=moves)
+
+
+def play(game: Game, ais: Iterable, turns: int) -> dict[str, float]:
+    """Run `turns` turns with one AI per player, return where the time went."""
+    ais = list(ais)
+    responses = [game.response(p) for p in range(len(ais))]
+    seconds = {"ai": 0.0, "game": 0.0}
+    for _ in range(turns):
+        started = time.perf_counter()
+        commands = {
+            p: ai.get_move_commands(response)
+            for p, (ai, response) in enumerate(zip(ais, responses))
+        }
+        seconds["ai"] += time.perf_counter() - started
+        started = time.perf_counter()
+        responses = game.step(commands)
+        seconds["game"] += time.perf_counter() - started
+    return seconds
+
+
+def main():
+    import contextlib
+    import io
+
+    from ai import AI
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, default=2)
+    parser.add_argument("--size", type=int, default=60)
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    game = Game.generate(args.players, args.size, args.seed)
+    ais = [AI() for _ in range(args.players)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        seconds = play(game, ais, args.turns)
+    for p, player in enumerate(game.players):
+        print(f"player {p}: score {player.score}, {len(game.units_of(p))} units")
+    print(
+        f"{args.turns} turns: {seconds['ai']:.1f} s planning, "
+        f"{seconds['game']:.2f} s simulating "
+        f"({args.turns / seconds['game'] * 60:.0f} turns per minute)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Spatial index for radius and nearest-neighbor queries over hexes.
+
+Entries are hashed into square buckets of offset coordinates. A step moves q
+and r by at most one each, so a hex at distance d from a center lies within
+d buckets' worth of q and r of it: queries only visit the buckets around the
+center and check exact distances there.
+"""
+
+import heapq
+from typing import Hashable, Iterator, List
+
+from game_types import Hex
+from hex import oddr_to_cube
+
+BUCKET_SIZE = 8
+
+Bucket = tuple[int, int]
+
+
+def _cube(q: int, r: int) -> tuple[int, int, int]:
+    x = q - (r - (r & 1)) // 2
+    return x, -x - r, r
+
+
+class SpatialIndex:
+    """
+    Hexes bucketed for "everything within R of H" and "k nearest to H".
+    Keys are opaque (Hex or packed ints), their coordinates are given on add.
+    """
+
+    def __init__(self, bucket_size: int = BUCKET_SIZE):
+        self.bucket_size = bucket_size
+        # bucket -> key -> cube coordinates of the key
+        self.buckets: dict[Bucket, dict[Hashable, tuple[int, int, int]]] = {}
+        self.key_bucket: dict[Hashable, Bucket] = {}
+
+    def __len__(self) -> int:
+        return len(self.key_bucket)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.key_bucket
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self.key_bucket)
+
+    def _bucket(self, q: int, r: int) -> Bucket:
+        return q // self.bucket_size, r // self.bucket_size
+
+    def add(self, key: Hashable, q: int, r: int):
+        bucket = self._bucket(q, r)
+        old = self.key_bucket.get(key)
+        if old is not None and old != bucket:
+            self.remove(key)
+        self.key_bucket[key] = bucket
+        self.buckets.setdefault(bucket, {})[key] = _cube(q, r)
+
+    def remove(self, key: Hashable):
+        bucket = self.key_bucket.pop(key, None)
+        if bucket is None:
+            return
+        entries = self.buckets[bucket]
+        del entries[key]
+        if not entries:
+            del self.buckets[bucket]
+
+    def clear(self):
+        self.buckets.clear()
+        self.key_bucket.clear()
+
+    def within(self, center: Hex, radius: int) -> List[Hashable]:
+        """Keys at most `radius` away from `center`."""
+        cx, cy, cz = oddr_to_cube(center)
+        q_lo, r_lo = self._bucket(center.q - radius, center.r - radius)
+        q_hi, r_hi = self._bucket(center.q + radius, center.r + radius)
+        found = []
+        buckets = self.buckets
+        for bq in range(q_lo, q_hi + 1):
+            for br in range(r_lo, r_hi + 1):
+                entries = buckets.get((bq, br))
+                if not entries:
+                    continue
+                for key, (x, y, z) in entries.items():
+                    if max(abs(x - cx), abs(y - cy), abs(z - cz)) <= radius:
+                        found.append(key)
+        return found
+
+    def nearest(self, center: Hex, k: int) -> List[Hashable]:
+        """
+        Up to `k` keys closest to `center`, closest first. Buckets are visited
+        in growing square rings and the search stops once no unvisited bucket
+        can hold anything closer than the k-th key found.
+        """
+        if k <= 0 or not self.key_bucket:
+            return []
+        cx, cy, cz = oddr_to_cube(center)
+        size = self.bucket_size
+        bq, br = self._bucket(center.q, center.r)
+        # furthest ring that can hold anything at all
+        max_ring = max(max(abs(q - bq), abs(r - br)) for q, r in self.buckets.keys())
+        best: list[tuple[int, int, Hashable]] = []  # max-heap of (-dist, -tie, key)
+        tie = 0
+        for ring in range(max_ring + 1):
+            if len(best) == k and ring > 0:
+                # hexes in this ring are at least this far in q or r
+                closest = min(
+                    center.q - (bq - ring + 1) * size + 1,
+                    (bq + ring) * size - center.q,
+                    center.r - (br - ring + 1) * size + 1,
+                    (br + ring) * size - center.r,
+                )
+                if closest >= -best[0][0]:
+                    break
+            for q, r in self._ring(bq, br, ring):
+                for key, (x, y, z) in self.buckets.get((q, r), {}).items():
+                    dist = max(abs(x - cx), abs(y - cy), abs(z - cz))
+                    tie += 1
+                    if len(best) < k:
+                        heapq.heappush(best, (-dist, -tie, key))
+                    elif dist < -best[0][0]:
+                        heapq.heapreplace(best, (-dist, -tie, key))
+        return [key for _, _, key in sorted(best, key=lambda e: (-e[0], -e[1]))]
+
+    @staticmethod
+    def _ring(bq: int, br: int, ring: int) -> Iterator[Bucket]:
+        if ring == 0:
+            yield bq, br
+            return
+        for q in range(bq - ring, bq + ring + 1):
+            yield q, br - ring
+            yield q, br + ring
+        for r in range(br - ring + 1, br + ring):
+            yield bq - ring, r
+            yield bq + ring, r
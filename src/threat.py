@@ -0,0 +1,110 @@
+"""
+Threat map: the damage an ant can expect for ending its turn on a hex.
+
+Units fight at the end of a turn when they stand next to each other, and an
+enemy moves before that, so every hex within its speed + 1 is under threat:
+fully next to where it stands, with `REACH_WEIGHT` further out. Remembered
+enemies out of sight count with `REMEMBERED_WEIGHT`, enemies near their own
+anthill get its attack bonus, and every hex within `HILL_RADIUS` of an enemy
+anthill takes its `HILL_DAMAGE` (once, however many anthill hexes are near).
+The support bonus is left out.
+
+The map is built in one pass: every source stamps its `vision.view_mask` of
+values into a grid around the sources with `np.add.at`, and lookups are a
+list index.
+"""
+
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+import hex_batch
+from game_types import UNIT_TYPE_STATS, Hex, PlayerEnemy
+from vision import view_mask
+
+# Damage of an enemy anthill to every unit within HILL_RADIUS of it
+HILL_DAMAGE = 20
+HILL_RADIUS = 2
+# Attack bonus of units within HILL_RADIUS of their own anthill
+HILL_BONUS = 1.25
+# Chance an enemy that can get next to a hex this turn does so
+REACH_WEIGHT = 0.5
+# Chance a remembered enemy out of sight is still around
+REMEMBERED_WEIGHT = 0.5
+
+
+@lru_cache(maxsize=None)
+def ring_of(radius: int) -> np.ndarray:
+    """Distance from the center of every offset of `view_mask(radius)`."""
+    # hex_range lists the hexes ring by ring, 6 * k of them in ring k
+    return np.repeat(np.arange(radius + 1), [1] + [6 * k for k in range(1, radius + 1)])
+
+
+class ThreatMap:
+    """Expected damage per hex, zero outside the grid around the sources."""
+
+    def __init__(self, q0: int = 0, r0: int = 0, damage: Optional[np.ndarray] = None):
+        if damage is None:
+            damage = np.zeros((0, 0))
+        self.q0 = q0
+        self.r0 = r0
+        self.array = damage
+        self.height, self.width = damage.shape
+        # nested lists index faster than the array
+        self.rows: List[List[float]] = damage.tolist()
+
+    @classmethod
+    def build(
+        cls,
+        enemies: Iterable[PlayerEnemy],
+        remembered: Iterable[PlayerEnemy] = (),
+        enemy_hills: Iterable[Hex] = (),
+    ) -> "ThreatMap":
+        units = [(e, 1.0) for e in enemies]
+        units += [(e, REMEMBERED_WEIGHT) for e in remembered]
+        hills = hex_batch.as_array(enemy_hills)
+        if not units and not len(hills):
+            return cls()
+        coords = np.array([(e.q, e.r) for e, _ in units], dtype=np.int64).reshape(-1, 2)
+        attack = np.array([e.attack * w for e, w in units], dtype=np.float64)
+        reach = np.array(
+            [UNIT_TYPE_STATS[e.type].speed + 1 for e, _ in units], dtype=np.int64
+        )
+        if len(units) and len(hills):
+            near_hill = (
+                hex_batch.distance_matrix(coords, hills).min(axis=1) <= HILL_RADIUS
+            )
+            attack = np.where(near_hill, attack * HILL_BONUS, attack)
+
+        radius = int(reach.max(initial=HILL_RADIUS))
+        centers = np.concatenate([coords, hills])
+        q0, r0 = (centers.min(axis=0) - radius).tolist()
+        q1, r1 = (centers.max(axis=0) + radius).tolist()
+        damage = np.zeros((r1 - r0 + 1, q1 - q0 + 1))
+        for unit_reach in np.unique(reach).tolist():
+            chosen = reach == unit_reach
+            center = coords[chosen]
+            cells = center[:, None, :] + view_mask(unit_reach)[center[:, 1] & 1]
+            rings = ring_of(unit_reach)
+            weight = np.where(rings <= 1, 1.0, REACH_WEIGHT)
+            values = attack[chosen, None] * weight
+            np.add.at(damage, (cells[..., 1] - r0, cells[..., 0] - q0), values)
+        if len(hills):
+            cells = hills[:, None, :] + view_mask(HILL_RADIUS)[hills[:, 1] & 1]
+            hill = np.zeros_like(damage)
+            hill[cells[..., 1] - r0, cells[..., 0] - q0] = HILL_DAMAGE
+            damage += hill
+        return cls(q0, r0, damage)
+
+    def damage(self, hex_: Hex) -> float:
+        r = hex_.r - self.r0
+        q = hex_.q - self.q0
+        if 0 <= r < self.height and 0 <= q < self.width:
+            return self.rows[r][q]
+        return 0.0
+
+    def hexes_at_least(self, damage: float) -> List[Hex]:
+        """Hexes expecting `damage` or more."""
+        rs, qs = np.nonzero(self.array >= damage)
+        return [Hex(q + self.q0, r + self.r0) for q, r in zip(qs.tolist(), rs.tolist())]
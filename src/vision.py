@@ -0,0 +1,86 @@
+"""
+Field of view: the hexes a unit reveals from where it stands and along a path.
+
+A unit sees every hex within its `view` of each hex it passes during a turn.
+In odd-r coordinates the offsets of that range depend on the row parity of
+the center, so every radius has a mask per parity and a batch of centers
+picks its rows with `r & 1`.
+"""
+
+from functools import lru_cache
+from typing import Iterable, List
+
+import numpy as np
+
+import hex_batch
+from game_types import UNIT_TYPE_STATS, Hex, UnitType
+from hex import PACK_BITS
+
+# bits of one packed key, a path index can go above them
+KEY_BITS = 2 * PACK_BITS
+
+
+@lru_cache(maxsize=None)
+def view_mask(radius: int) -> np.ndarray:
+    """(2, M, 2) offsets of the hexes within `radius`, for even and odd rows."""
+    return np.stack(
+        [
+            hex_batch.hex_range(Hex(0, 0), radius),
+            hex_batch.hex_range(Hex(0, 1), radius) - np.array([0, 1]),
+        ]
+    )
+
+
+VIEW_MASKS = {
+    unit_type: view_mask(stats.view) for unit_type, stats in UNIT_TYPE_STATS.items()
+}
+
+
+def visible_from(coords: np.ndarray, radius: int) -> np.ndarray:
+    """(N, M, 2) hexes seen from each of the (N, 2) `coords`."""
+    return coords[:, None, :] + view_mask(radius)[coords[:, 1] & 1]
+
+
+def revealed_by_path(path: Iterable[Hex], unit_type: UnitType) -> set[Hex]:
+    """Every hex a unit of `unit_type` sees walking `path`, start included."""
+    coords = hex_batch.as_array(path)
+    radius = UNIT_TYPE_STATS[UnitType(unit_type)].view
+    keys = np.unique(hex_batch.pack(visible_from(coords, radius)))
+    return set(hex_batch.to_hexes(hex_batch.unpack(keys)))
+
+
+def revealed_keys(by_radius: dict[int, list[Hex]]) -> np.ndarray:
+    """
+    Sorted packed keys (see `hex_batch.pack`) of every hex seen from the hexes
+    listed under each view radius, one batch per radius.
+    """
+    keys = [
+        hex_batch.pack(visible_from(hex_batch.as_array(hexes), radius)).ravel()
+        for radius, hexes in by_radius.items()
+        if hexes
+    ]
+    if not keys:
+        return np.empty(0, dtype=np.int64)
+    return np.unique(np.concatenate(keys))
+
+
+def score_paths(
+    paths: List[List[Hex]], unit_type: UnitType, known: np.ndarray
+) -> np.ndarray:
+    """
+    How many hexes outside `known` (packed keys, see `hex_batch.pack`) each
+    of `paths` would reveal, all paths in one batch.
+    """
+    counts = np.zeros(len(paths), dtype=np.int64)
+    lengths = [len(path) for path in paths]
+    if not sum(lengths):
+        return counts
+    coords = hex_batch.as_array(h for path in paths for h in path)
+    radius = UNIT_TYPE_STATS[UnitType(unit_type)].view
+    keys = hex_batch.pack(visible_from(coords, radius))
+    # tag every key with its path so one `unique` dedups within paths only
+    path_ids = np.repeat(np.arange(len(paths), dtype=np.int64), lengths)
+    tagged = np.unique((path_ids[:, None] << KEY_BITS) | keys)
+    new = ~np.isin(tagged & ((1 << KEY_BITS) - 1), known)
+    counts += np.bincount(tagged[new] >> KEY_BITS, minlength=len(paths))
+    return counts
@@ -1,10 +1,13 @@
 import math
 
+import numpy as np
 import pygame
 
+import hex_batch
 from game_types import (
     FOOD_TYPE_NAMES,
     UNIT_TYPE_NAMES,
+    UNIT_TYPE_STATS,
     FoodType,
     Hex,
     HexType,
@@ -13,6 +16,7 @@ from game_types import (
     Tile,
     UnitType,
 )
+from vision import revealed_keys
 
 # Color palettes for types
 HEX_TYPE_COLORS = {
@@ -45,6 +49,9 @@ class Visualizer:
         self.surface = pygame.display.set_mode((self.width, self.height))
         self.font = pygame.font.SysFont(None, 14)
         self.title_font = pygame.font.SysFont(None, 20)
+        self.hud_font = pygame.font.SysFont("monospace", 12)
+        # the span timings panel, toggled with H
+        self.show_hud = True
         self.running = True
         self.camera_offset = [0, 0]  # [x, y] offset in pixels
         self._dragging = False
@@ -66,6 +73,8 @@ class Visualizer:
                     self.camera_offset[1] += 40
                 elif event.key == pygame.K_DOWN:
                     self.camera_offset[1] -= 40
+                elif event.key == pygame.K_h:
+                    self.show_hud = not self.show_hud
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:
                     self._dragging = True
@@ -112,6 +121,7 @@ class Visualizer:
         move_commands: PlayerMoveCommands,
         remembered_enemies=None,  # New argument: list of Hex or PlayerEnemy
         remembered_food=None,  # New argument: list of FoodOnMap or Hex
+        hud_lines=None,  # Instrumentation.hud_lines() of the last turn
     ):
         self.handle_events()
         if not self.running:
@@ -185,9 +195,24 @@ class Visualizer:
 
         # Compute current vision
         current_vision = {(tile.q, tile.r) for tile in resp.map}
-        tiles_to_draw = seen_tiles.values() if seen_tiles is not None else resp.map
+        # and what the planned moves will reveal, drawn under a lighter fog
+        planned_paths = {move.ant: move.path for move in move_commands.moves}
+        by_radius: dict[int, list[Hex]] = {}
+        for ant in resp.ants:
+            radius = UNIT_TYPE_STATS[UnitType(ant.type)].view
+            hexes = by_radius.setdefault(radius, [])
+            hexes.append(Hex(ant.q, ant.r))
+            hexes.extend(planned_paths.get(ant.id) or [])
+        tiles_to_draw = list(
+            seen_tiles.values() if seen_tiles is not None else resp.map
+        )
+        # one batch for every ant, then one lookup for every tile
+        predicted_vision = np.isin(
+            hex_batch.pack(hex_batch.as_array(Hex(t.q, t.r) for t in tiles_to_draw)),
+            revealed_keys(by_radius),
+        )
         # Draw map tiles
-        for tile in tiles_to_draw:
+        for tile, predicted in zip(tiles_to_draw, predicted_vision.tolist()):
             hex_type = HexType(tile.type)
             color_hex = HEX_TYPE_COLORS.get(hex_type, "#eeeeee")
             color = tuple(int(color_hex.lstrip("#")[i : i + 2], 16) for i in (0, 2, 4))
@@ -197,7 +222,8 @@ class Visualizer:
             # Overlay a dark fog if not in vision
             if not in_vision:
                 fog_color = (0, 0, 0)
-                fog_alpha = 140  # Stronger fog overlay
+                # Stronger fog overlay, lighter where the ants are about to look
+                fog_alpha = 70 if predicted else 140
                 draw_hex(
                     surface,
                     tile.q,
@@ -515,9 +541,26 @@ class Visualizer:
             f"Turn {resp.turnNo} | Score: {resp.score}", True, (0, 0, 0)
         )
         surface.blit(title, (10, 10))
+        if hud_lines and self.show_hud:
+            self._draw_hud(hud_lines)
         pygame.display.flip()
         pygame.display.update()
         return True
 
+    def _draw_hud(self, lines: list[str]):
+        font = self.hud_font
+        line_h = font.get_height() + 1
+        w = max(font.size(line)[0] for line in lines) + 10
+        h = len(lines) * line_h + 6
+        x = self.width - w - 10
+        y = 10
+        panel = pygame.Surface((w, h), pygame.SRCALPHA)
+        panel.fill((255, 255, 255, 210))
+        self.surface.blit(panel, (x, y))
+        pygame.draw.rect(self.surface, (128, 128, 128), (x, y, w, h), 1)
+        for i, line in enumerate(lines):
+            text = font.render(line, True, (0, 0, 0))
+            self.surface.blit(text, (x + 5, y + 3 + i * line_h))
+
     def close(self):
         pygame.quit()
@@ -0,0 +1,76 @@
+import dataclasses
+import itertools
+import random
+
+from test_pathfinding import make_ant, make_grid
+
+from assignment import assign_food, auction_assignment, food_value
+from game_types import FoodOnMap, FoodType, Hex, UnitType
+from pathfinding import DistanceField
+
+
+def best_total(benefits: dict[int, dict[int, float]], objects: list[int]) -> float:
+    """Brute force over every way to give each person an object or nothing."""
+    people = list(benefits)
+    best = 0.0
+    options = objects + [None] * len(people)
+    for picks in itertools.permutations(options, len(people)):
+        total = 0.0
+        for person, obj in zip(people, picks):
+            if obj is None:
+                continue
+            if obj not in benefits[person]:
+                break
+            total += benefits[person][obj]
+        else:
+            best = max(best, total)
+    return best
+
+
+def test_auction_is_near_optimal():
+    for seed in range(30):
+        rng = random.Random(seed)
+        objects = list(range(rng.randint(1, 4)))
+        benefits = {
+            person: {
+                obj: rng.uniform(1, 10)
+                for obj in rng.sample(objects, rng.randint(0, len(objects)))
+            }
+            for person in range(rng.randint(1, 4))
+        }
+        assigned = auction_assignment(benefits, eps=1e-4)
+        assert len(set(assigned.values())) == len(assigned)
+        total = sum(benefits[p][o] for p, o in assigned.items())
+        assert total >= best_total(benefits, objects) - len(benefits) * 1e-4
+
+
+def test_food_value_uses_capacity_and_calories():
+    food = FoodOnMap(amount=5, q=0, r=0, type=FoodType.NECTAR)
+    assert food_value(make_ant(0, 0, UnitType.WORKER), food) == 5 * 60
+    assert food_value(make_ant(0, 0, UnitType.SCOUT), food) == 2 * 60
+
+
+def test_assign_food_beats_first_come_first_served():
+    seen_tiles = make_grid(12, 12, dense=True)
+    first = make_ant(3, 5)
+    second = dataclasses.replace(make_ant(5, 5), id="second")
+    food = {
+        Hex(4, 5): FoodOnMap(amount=5, q=4, r=5, type=FoodType.BREAD),
+        Hex(0, 5): FoodOnMap(amount=5, q=0, r=5, type=FoodType.BREAD),
+    }
+    assigned = assign_food([first, second], food, seen_tiles, set())
+    # greedily the first ant takes the tile next to both and the second one
+    # walks 5 steps, swapping them costs 3 + 1 steps instead of 1 + 5
+    assert assigned == {first.id: Hex(0, 5), second.id: Hex(4, 5)}
+
+
+def test_assign_food_counts_the_trip_home():
+    seen_tiles = make_grid(12, 12, dense=True)
+    ant = make_ant(5, 5)
+    food = {
+        Hex(7, 5): FoodOnMap(amount=5, q=7, r=5, type=FoodType.BREAD),
+        Hex(2, 5): FoodOnMap(amount=5, q=2, r=5, type=FoodType.BREAD),
+    }
+    assert assign_food([ant], food, seen_tiles, set()) == {ant.id: Hex(7, 5)}
+    field = DistanceField([Hex(0, 5)], seen_tiles, set())
+    assert assign_food([ant], food, seen_tiles, set(), field) == {ant.id: Hex(2, 5)}
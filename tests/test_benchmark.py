@@ -0,0 +1,45 @@
+from ai import AI
+from benchmark import percentiles, regressions, simulated_responses, summarize
+from instrumentation import Span
+from replay import TurnRecord, replay
+
+
+def make_record(seconds: float, planning: float = 0.0) -> TurnRecord:
+    phases = {"workers": Span("workers", 1, planning, 100)} if planning else {}
+    return TurnRecord(1, 10, 5, seconds, 1000, 0, phases)
+
+
+def test_percentiles():
+    stats = percentiles(range(1, 101))
+    assert stats == {"p50": 50, "p95": 95, "max": 100}
+    assert percentiles([]) == {"p50": 0, "p95": 0, "max": 0}
+
+
+def test_summary_and_regressions():
+    records = [make_record(0.1, planning=0.05) for _ in range(9)]
+    records.append(make_record(0.5))
+    summary = summarize(records)
+    assert summary["turn"]["seconds"]["max"] == 0.5
+    # the phase did not run on the last turn
+    assert summary["workers"]["seconds"]["p95"] == 0.05
+    assert summary["workers"]["seconds"]["max"] == 0.05
+    assert regressions(summary, summary) == []
+
+    slower = summarize([make_record(0.2, planning=0.05) for _ in range(10)])
+    found = regressions(slower, summary, threshold=0.5)
+    # the slow last turn of the baseline hides the regression from p95
+    assert found == ["turn seconds p50: 0.1 -> 0.2 (+100%)"]
+    assert regressions(slower, summary, threshold=1.5) == []
+
+
+def test_replay_measures_phases():
+    responses = simulated_responses(40, 2, 4, seed=1)
+    ai = AI()
+    records = list(replay(responses, ai))
+    assert [r.turn for r in records] == [0, 1, 2, 3]
+    for record in records:
+        assert record.peak_memory > 0
+        assert "setup" in record.phases
+        phases = [p for path, p in record.phases.items() if "/" not in path]
+        assert sum(p.seconds for p in phases) <= record.seconds
+        assert sum(p.expanded for p in phases) <= record.expanded
@@ -0,0 +1,61 @@
+from budget import SAFETY_MARGIN, Quality, TurnBudget, smoothed_latency
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_quality_degrades_with_time():
+    clock = FakeClock()
+    budget = TurnBudget(1.0 + SAFETY_MARGIN, latency=0.0, clock=clock)
+    assert budget.quality() == Quality.FULL
+    clock.now = 0.5
+    assert budget.quality() == Quality.FULL
+    clock.now = 0.8
+    assert budget.quality() == Quality.REDUCED
+    clock.now = 1.0
+    assert budget.quality() == Quality.SKIPPED
+
+
+def test_latency_comes_off_the_budget():
+    clock = FakeClock()
+    budget = TurnBudget(1.0, latency=0.5, clock=clock)
+    clock.now = 0.5
+    assert budget.quality() == Quality.SKIPPED
+
+
+def test_budget_counts_from_the_response_arrival():
+    clock = FakeClock()
+    clock.now = 10.5
+    # the response came in half a second ago, e.g. while it was logged
+    budget = TurnBudget(1.0 + SAFETY_MARGIN, clock=clock, start=10.0)
+    assert budget.remaining() == 0.5
+    assert budget.quality() == Quality.FULL
+    clock.now = 10.8
+    assert budget.quality() == Quality.REDUCED
+
+
+def test_unbounded_budget_never_runs_out():
+    clock = FakeClock()
+    budget = TurnBudget(0, clock=clock)
+    clock.now = 1e6
+    assert budget.quality() == Quality.FULL
+
+
+def test_summary_counts_recorded_ants():
+    budget = TurnBudget(1.0, clock=FakeClock())
+    budget.record(Quality.FULL)
+    budget.record(Quality.FULL)
+    budget.record(Quality.SKIPPED)
+    assert budget.summary().startswith(
+        "Planned 2 ants at full quality, 0 reduced, 1 skipped"
+    )
+
+
+def test_smoothed_latency_moves_towards_sample():
+    assert 0.2 < smoothed_latency(0.2, 1.0) < 1.0
+    assert smoothed_latency(0.3, 0.3) == 0.3
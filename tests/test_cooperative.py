@@ -0,0 +1,111 @@
+from test_pathfinding import make_ant, make_grid
+
+from cooperative import CooperativeTruncator, ReservationTable, plan_window
+from game_types import Hex, HexType, UnitType
+from hex import distance
+from pathfinding import (
+    DistanceField,
+    ReachEnvelope,
+    find_min_cost_path_to_any,
+    tile_cost,
+)
+
+
+def goal_distance(goal: Hex, seen_tiles):
+    return DistanceField([goal], seen_tiles, set()).cost_from
+
+
+def test_plan_window_follows_cost_to_go():
+    seen_tiles = make_grid(10, 1)
+    path = plan_window(
+        "a",
+        ReachEnvelope(Hex(0, 0), 4, seen_tiles),
+        goal_distance(Hex(9, 0), seen_tiles),
+        set(),
+        ReservationTable(),
+    )
+    assert path == [Hex(1, 0), Hex(2, 0), Hex(3, 0), Hex(4, 0)]
+
+
+def test_paths_may_cross_at_different_steps():
+    seen_tiles = make_grid(10, 10)
+    reservations = ReservationTable()
+    # the first ant passes (4, 4) on its second step
+    reservations.reserve("a", Hex(2, 4), [Hex(3, 4), Hex(4, 4), Hex(5, 4)])
+    # the second ant gets there on its first step, a flat blocked set of the
+    # first path would have forced a detour
+    path = plan_window(
+        "b",
+        ReachEnvelope(Hex(4, 3), 2, seen_tiles),
+        goal_distance(Hex(4, 5), seen_tiles),
+        set(),
+        reservations,
+    )
+    assert path[-1] == Hex(4, 5)
+    assert len(path) == 2
+
+
+def test_no_stop_where_another_ant_passes_later():
+    seen_tiles = make_grid(10, 10)
+    reservations = ReservationTable()
+    # the first ant passes (3, 4) on its third step
+    reservations.reserve("a", Hex(0, 4), [Hex(1, 4), Hex(2, 4), Hex(3, 4), Hex(4, 4)])
+    envelope = ReachEnvelope(Hex(3, 6), 2, seen_tiles)
+    path = plan_window(
+        "c", envelope, goal_distance(Hex(3, 4), seen_tiles), set(), reservations
+    )
+    # ending on (3, 4) after two steps would be in the first ant's way
+    assert path and path[-1] != Hex(3, 4)
+    # the first ant's last hex stays taken after it arrives
+    assert not reservations.is_free_after(Hex(4, 4), 2, "c")
+
+
+def test_unmoved_ant_holds_its_hex():
+    seen_tiles = make_grid(10, 1)
+    reservations = ReservationTable()
+    reservations.reserve_start("a", Hex(3, 0))
+    to_go = goal_distance(Hex(9, 0), seen_tiles)
+    path = plan_window(
+        "b", ReachEnvelope(Hex(0, 0), 4, seen_tiles), to_go, set(), reservations
+    )
+    assert path == [Hex(1, 0), Hex(2, 0)]
+    # once it moves on, the hex is free after its first step
+    reservations.reserve("a", Hex(3, 0), [Hex(4, 0)])
+    path = plan_window(
+        "b", ReachEnvelope(Hex(0, 0), 4, seen_tiles), to_go, set(), reservations
+    )
+    assert path[-1] == Hex(3, 0)
+
+
+def test_head_on_swap_is_avoided():
+    seen_tiles = make_grid(10, 2)
+    reservations = ReservationTable()
+    reservations.reserve("a", Hex(2, 0), [Hex(1, 0), Hex(0, 1)])
+    to_go = goal_distance(Hex(9, 0), seen_tiles)
+    envelope = ReachEnvelope(Hex(1, 0), 4, seen_tiles)
+    path = plan_window("b", envelope, to_go, set(), reservations)
+    # stepping onto the hex the other ant leaves towards us would swap them
+    assert path and path[0] != Hex(2, 0)
+
+
+def test_following_one_step_behind():
+    seen_tiles = make_grid(10, 1)
+    reservations = ReservationTable()
+    reservations.reserve("a", Hex(1, 0), [Hex(2, 0), Hex(3, 0), Hex(4, 0)])
+    to_go = goal_distance(Hex(9, 0), seen_tiles)
+    envelope = ReachEnvelope(Hex(0, 0), 3, seen_tiles)
+    path = plan_window("b", envelope, to_go, set(), reservations)
+    assert path == [Hex(1, 0), Hex(2, 0), Hex(3, 0)]
+
+
+def test_truncator_plans_this_turn_of_a_long_path():
+    types = {Hex(3, 0): HexType.DIRT}
+    seen_tiles = make_grid(12, 3, types)
+    # through the dirt is as far as any way round it this turn
+    truncator = CooperativeTruncator(seen_tiles, set(), ReservationTable())
+    ant = make_ant(0, 0, UnitType.FIGHTER)
+    goal = Hex(11, 0)
+    full_path = find_min_cost_path_to_any(Hex(0, 0), {goal}, seen_tiles, set())
+    move = truncator.truncate(ant, full_path)
+    assert sum(tile_cost(seen_tiles[h]) for h in move) <= 4
+    assert distance(move[-1], goal) == distance(Hex(0, 0), goal) - 3
@@ -1,8 +1,11 @@
 from ai import PathTruncator
 from data_structs import (
+    VERY_LARGE_INT,
+    FrontierIndex,
     SeenTiles,
 )
 from game_types import Ant, Food, Hex, HexType, Tile, UnitType
+from hex import unpack_hex
 
 # def test_cost_dict_value():
 #     h1 = Hex(0, 0)
@@ -273,3 +276,114 @@ def test_path_truncator_truncate():
     truncated_long = truncator.truncate(ant_slow, path_long)
     # (0,0)->(1,0):2, (1,0)->(2,0):1, (2,0)->(3,0):2, total=5>4, so should stop before (3,0)
     assert truncated_long == [Hex(1, 0), Hex(2, 0)]
+
+
+def test_seen_tiles_dense_graph_grows_with_updates():
+    seen = SeenTiles(dense=True)
+    seen.update([Tile(cost=1, q=3, r=3, type=HexType.EMPTY)])
+    graph = seen.graph
+    center = graph.index[Hex(3, 3)]
+    assert graph.adj[6 * center : 6 * center + 6] == [-1] * 6
+    # add every neighbor of (3,3); links must be filled in both directions
+    seen.update(
+        [
+            Tile(cost=2, q=4, r=3, type=HexType.DIRT),
+            Tile(cost=1, q=3, r=2, type=HexType.STONE),
+            Tile(cost=1, q=4, r=2, type=HexType.EMPTY),
+            Tile(cost=1, q=2, r=3, type=HexType.EMPTY),
+            Tile(cost=1, q=3, r=4, type=HexType.EMPTY),
+            Tile(cost=1, q=4, r=4, type=HexType.EMPTY),
+        ]
+    )
+    neighbor_nodes = graph.adj[6 * center : 6 * center + 6]
+    assert {graph.hexes[n] for n in neighbor_nodes} == {
+        Hex(4, 3),
+        Hex(3, 2),
+        Hex(4, 2),
+        Hex(2, 3),
+        Hex(3, 4),
+        Hex(4, 4),
+    }
+    for d, node in enumerate(neighbor_nodes):
+        assert graph.adj[6 * node + (d + 3) % 6] == center
+    assert graph.cost[graph.index[Hex(4, 3)]] == 2
+    assert graph.cost[graph.index[Hex(3, 2)]] == VERY_LARGE_INT
+    # a type change on an already seen hex updates the cost in place
+    seen.update([Tile(cost=1, q=4, r=3, type=HexType.EMPTY)])
+    assert len(graph) == 7
+    assert graph.cost[graph.index[Hex(4, 3)]] == 1
+
+
+def test_frontier_index_follows_visible_tiles():
+    def row(qs):
+        return [Tile(cost=1, q=q, r=0, type=HexType.EMPTY) for q in qs]
+
+    for dense, packed in ((False, False), (True, False), (False, True)):
+        seen = SeenTiles(dense=dense, packed=packed)
+        frontier = FrontierIndex(seen)
+        seen.update(row(range(0, 5)))
+        frontier.update(row(range(0, 5)), set())
+        assert frontier.hexes == set()
+        # the view moves right, the left part goes out of sight
+        seen.update(row(range(3, 8)))
+        frontier.update(row(range(3, 8)), {Hex(1, 0)})
+        assert frontier.hexes == {Hex(0, 0), Hex(2, 0)}
+        version = frontier.version
+        frontier.update(row(range(3, 8)), {Hex(1, 0)})
+        assert frontier.version == version
+        # food at (1, 0) is gone, (2, 0) is in sight again
+        frontier.update(row(range(2, 6)), set())
+        assert frontier.hexes == {Hex(0, 0), Hex(1, 0), Hex(6, 0), Hex(7, 0)}
+        assert frontier.version > version
+        if dense:
+            assert {seen.graph.hexes[n] for n in frontier.nodes} == frontier.hexes
+        elif packed:
+            assert {unpack_hex(n) for n in frontier.nodes} == frontier.hexes
+        else:
+            assert frontier.nodes == frontier.hexes
+
+
+def test_seen_tiles_tracks_changes_and_notifies():
+    seen = SeenTiles()
+    notified = []
+    seen.subscribe(notified.append)
+    seen.update([Tile(cost=1, q=0, r=0, type=HexType.EMPTY)], turn=1)
+    assert seen.version == 1
+    assert seen.last_changed == {Hex(0, 0)}
+    # the same tile again changes nothing
+    new = seen.update([Tile(cost=1, q=0, r=0, type=HexType.EMPTY)], turn=2)
+    assert new == []
+    assert seen.version == 1 and seen.last_changed == set()
+    # a type change is reported although the tile is not new
+    new = seen.update(
+        [
+            Tile(cost=1, q=0, r=0, type=HexType.DIRT),
+            Tile(cost=1, q=1, r=0, type=HexType.EMPTY),
+        ],
+        turn=3,
+    )
+    assert new == [Tile(cost=1, q=1, r=0, type=HexType.EMPTY)]
+    assert seen.version == 2
+    assert seen.changed_turn == {Hex(0, 0): 3, Hex(1, 0): 3}
+    assert notified == [{Hex(0, 0)}, {Hex(0, 0), Hex(1, 0)}]
+
+
+def test_seen_tiles_type_index_follows_changes():
+    packed = SeenTiles(packed=True)
+    packed.update([Tile(cost=1, q=0, r=0, type=HexType.STONE)])
+    # hexes whatever the keys
+    assert packed.of_type(HexType.STONE) == {Hex(0, 0)}
+    seen = SeenTiles(dense=True)
+    seen.update(
+        [
+            Tile(cost=1, q=0, r=0, type=HexType.STONE),
+            Tile(cost=1, q=1, r=0, type=HexType.ACID),
+            Tile(cost=1, q=2, r=0, type=HexType.ANTHILL),
+        ]
+    )
+    assert seen.of_type(HexType.STONE) == {Hex(0, 0)}
+    assert seen.of_type(HexType.ACID) == {Hex(1, 0)}
+    seen.update([Tile(cost=1, q=1, r=0, type=HexType.DIRT)])
+    assert seen.of_type(HexType.ACID) == set()
+    assert seen.of_type(HexType.DIRT) == {Hex(1, 0)}
+    assert seen.of_type(HexType.ANTHILL) == {Hex(2, 0)}
@@ -1,5 +1,14 @@
 from data_structs import SeenTiles
-from hex import Hex, neighbors, distance
+from hex import (
+    Hex,
+    neighbors,
+    distance,
+    pack,
+    pack_hex,
+    packed_neighbors,
+    unpack,
+    unpack_hex,
+)
 from ai import AI
 from game_types import Tile, Hex, HexType
 
@@ -42,6 +51,16 @@ def test_distance():
     assert distance(Hex(0, 6), Hex(6, 0)) == 9
 
 
+def test_packed_keys_round_trip():
+    for hex in [Hex(0, 0), Hex(3, 7), Hex(-5, 2), Hex(4, -9), Hex(-1, -1)]:
+        key = pack_hex(hex)
+        assert key == pack(hex.q, hex.r)
+        assert unpack(key) == (hex.q, hex.r)
+        assert unpack_hex(key) == hex
+        assert [unpack_hex(n) for n in packed_neighbors(key)] == list(neighbors(hex))
+    assert len({pack(q, r) for q in range(-3, 4) for r in range(-3, 4)}) == 49
+
+
 def test_update_cost_dict_simple():
     # Create two adjacent tiles: EMPTY and DIRT
     tile1 = Tile(cost=1, q=0, r=0, type=HexType.EMPTY)
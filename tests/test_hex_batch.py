@@ -0,0 +1,63 @@
+import random
+
+import numpy as np
+
+import hex as scalar
+import hex_batch
+from game_types import Hex
+
+
+def random_hexes(n: int, seed: int) -> list[Hex]:
+    rng = random.Random(seed)
+    return [Hex(rng.randint(-30, 30), rng.randint(-30, 30)) for _ in range(n)]
+
+
+def test_cube_round_trip_matches_scalar():
+    hexes = random_hexes(200, 0)
+    coords = hex_batch.as_array(hexes)
+    cubes = hex_batch.oddr_to_cube(coords)
+    assert [tuple(c) for c in cubes.tolist()] == [scalar.oddr_to_cube(h) for h in hexes]
+    assert hex_batch.to_hexes(hex_batch.cube_to_oddr(cubes)) == hexes
+
+
+def test_distances_match_scalar():
+    a, b = random_hexes(50, 1), random_hexes(40, 2)
+    matrix = hex_batch.distance_matrix(hex_batch.as_array(a), hex_batch.as_array(b))
+    assert matrix.tolist() == [[scalar.distance(x, y) for y in b] for x in a]
+    pairwise = hex_batch.distance(hex_batch.as_array(a[:40]), hex_batch.as_array(b))
+    assert pairwise.tolist() == [scalar.distance(x, y) for x, y in zip(a, b)]
+    one_to_many = hex_batch.distance(np.array([a[0].q, a[0].r]), hex_batch.as_array(b))
+    assert one_to_many.tolist() == matrix[0].tolist()
+
+
+def test_neighbors_match_scalar():
+    hexes = random_hexes(100, 3)
+    expanded = hex_batch.neighbors(hex_batch.as_array(hexes))
+    assert expanded.shape == (100, 6, 2)
+    for h, row in zip(hexes, expanded):
+        assert hex_batch.to_hexes(row) == list(scalar.neighbors(h))
+
+
+def test_ring_and_range_match_scalar():
+    for center in random_hexes(10, 4):
+        for radius in range(5):
+            ring = hex_batch.hex_ring(center, radius)
+            assert hex_batch.to_hexes(ring) == scalar.hex_ring(center, radius)
+        filled = hex_batch.to_hexes(hex_batch.hex_range(center, 4))
+        assert len(filled) == len(set(filled)) == 3 * 4 * 5 + 1
+        assert all(scalar.distance(center, h) <= 4 for h in filled)
+
+
+def test_empty_input():
+    empty = hex_batch.as_array([])
+    assert empty.shape == (0, 2)
+    origin = hex_batch.as_array([Hex(0, 0)])
+    assert hex_batch.distance_matrix(empty, origin).shape == (0, 1)
+    assert hex_batch.neighbors(empty).shape == (0, 6, 2)
+
+
+def test_pack_matches_scalar():
+    hexes = random_hexes(100, 5)
+    keys = hex_batch.pack(hex_batch.as_array(hexes))
+    assert keys.tolist() == [scalar.pack_hex(h) for h in hexes]
+    assert hex_batch.to_hexes(hex_batch.unpack(keys)) == hexes
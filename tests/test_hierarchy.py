@@ -0,0 +1,66 @@
+import random
+
+from test_pathfinding import make_grid, path_cost, random_types
+
+from game_types import Hex, HexType, Tile
+from hex import neighbors
+from hierarchy import CLUSTER_SIZE, MapHierarchy
+from pathfinding import find_min_cost_path_to_any
+
+
+def assert_walkable(seen_tiles, path: list[Hex], blocked: set[Hex]):
+    for a, b in zip(path, path[1:]):
+        assert b in neighbors(a)
+        assert seen_tiles[b].type != HexType.STONE
+        assert b not in blocked
+
+
+def test_hierarchy_paths_are_valid_and_near_optimal():
+    types = random_types(50, 50, 3)
+    seen_tiles = make_grid(50, 50, types, dense=True)
+    hierarchy = MapHierarchy(seen_tiles)
+    rng = random.Random(3)
+    passable = [h for h, t in types.items() if t != HexType.STONE]
+    checked = 0
+    for _ in range(20):
+        start, goal = rng.sample(passable, 2)
+        taken = set(rng.sample(passable, 30)) - {start, goal}
+        path = hierarchy.find_path(start, goal, taken)
+        expected = find_min_cost_path_to_any(start, {goal}, seen_tiles, taken)
+        if path is None:
+            continue
+        checked += 1
+        assert path[0] == start and path[-1] == goal
+        assert_walkable(seen_tiles, path, taken)
+        assert path_cost(seen_tiles, path) <= 1.5 * path_cost(seen_tiles, expected)
+    assert checked > 10
+
+
+def test_hierarchy_refines_only_the_start_of_long_paths():
+    seen_tiles = make_grid(60, 10, dense=True)
+    hierarchy = MapHierarchy(seen_tiles)
+    start, goal = Hex(0, 5), Hex(59, 5)
+    full = hierarchy.find_path(start, goal, set())
+    partial = hierarchy.find_path(start, goal, set(), refine_cost=8)
+    assert full[-1] == goal
+    assert 8 <= path_cost(seen_tiles, partial) < path_cost(seen_tiles, full)
+    assert_walkable(seen_tiles, partial, set())
+
+
+def test_hierarchy_rebuilds_only_touched_clusters():
+    seen_tiles = make_grid(60, 60, dense=True)
+    hierarchy = MapHierarchy(seen_tiles)
+    hierarchy.update()
+    total = len(hierarchy.cluster_entrances)
+    rebuilt = hierarchy.rebuilt_clusters
+    # a wall with a single gap inside one cluster, away from its borders
+    wall = [Tile(cost=1, q=q, r=35, type=HexType.STONE) for q in range(60) if q != 3]
+    seen_tiles.update(wall)
+    path = hierarchy.find_path(Hex(30, 55), Hex(30, 5), set())
+    assert path[-1] == Hex(30, 5)
+    assert Hex(3, 35) in path
+    assert_walkable(seen_tiles, path, set())
+    # the wall row lies inside one row of clusters, only it and its
+    # neighbors above and below are rebuilt
+    clusters_in_row = 60 // CLUSTER_SIZE
+    assert hierarchy.rebuilt_clusters - rebuilt <= 3 * clusters_in_row < total
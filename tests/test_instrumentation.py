@@ -0,0 +1,95 @@
+import io
+import json
+import tracemalloc
+
+from instrumentation import DISABLED, Instrumentation, RollingHistogram
+from search import best_first_search
+
+
+def line_search(length: int):
+    """Dijkstra along a line of `length` nodes."""
+    return best_first_search(
+        [0], lambda n: [(n + 1, 1)] if n + 1 < length else [], lambda n: False
+    )
+
+
+def test_nested_spans_add_up():
+    spans = Instrumentation()
+    spans.start_turn(7)
+    with spans.span("workers"):
+        for _ in range(3):
+            with spans.span("search"):
+                line_search(10)
+                spans.count("searches")
+    with spans.span("scouts"):
+        pass
+    turn = spans.finish_turn()
+    workers = turn.children["workers"]
+    search = workers.children["search"]
+    assert (workers.calls, search.calls) == (1, 3)
+    assert search.expanded == 30 and search.pushes == 27
+    assert workers.expanded == turn.expanded == 30
+    assert search.counters == {"searches": 3}
+    assert turn.seconds >= workers.seconds >= search.seconds > 0
+    assert list(turn.flat()) == ["workers", "workers/search", "scouts"]
+    # nothing is open between turns
+    assert spans.span("late") is DISABLED
+    assert spans.finish_turn() is None
+
+
+def test_disabled_records_nothing():
+    spans = Instrumentation(enabled=False)
+    spans.start_turn(1)
+    assert spans.span("workers") is DISABLED
+    with spans.span("workers"):
+        spans.count("searches")
+    assert spans.finish_turn() is None
+    assert spans.histograms == {}
+    assert spans.hud_lines() == []
+
+
+def test_export_and_histograms():
+    export = io.StringIO()
+    spans = Instrumentation(export=export, window=3)
+    for turn_no in range(5):
+        spans.start_turn(turn_no)
+        with spans.span("setup"):
+            pass
+    spans.finish_turn()
+    records = [json.loads(line) for line in export.getvalue().splitlines()]
+    assert [r["turn"] for r in records] == [0, 1, 2, 3, 4]
+    assert records[0]["spans"]["children"][0]["name"] == "setup"
+    assert len(spans.histograms["turn"]) == len(spans.histograms["setup"]) == 3
+    lines = spans.hud_lines()
+    assert len(lines) == 3 and lines[2].lstrip().startswith("setup")
+
+
+def test_peak_memory_of_nested_spans():
+    spans = Instrumentation()
+    tracemalloc.start()
+    try:
+        spans.start_turn(1)
+        with spans.span("small"):
+            small = bytearray(10_000)
+        with spans.span("large"):
+            with spans.span("inner"):
+                large = bytearray(1_000_000)
+            del large
+        turn = spans.finish_turn()
+    finally:
+        tracemalloc.stop()
+    del small
+    inner = turn.children["large"].children["inner"]
+    assert turn.children["large"].peak_memory >= inner.peak_memory >= 1_000_000
+    assert turn.children["small"].peak_memory < 1_000_000
+    assert turn.peak_memory == turn.children["large"].peak_memory
+
+
+def test_rolling_histogram():
+    histogram = RollingHistogram(window=10)
+    for value in range(20):
+        histogram.add(value)
+    assert len(histogram) == 10
+    assert histogram.percentile(50) == 14
+    assert histogram.percentile(100) == 19
+    assert histogram.counts([0, 10, 15, 20]) == [0, 5, 5]
@@ -0,0 +1,52 @@
+from data_structs import SeenTiles
+from game_types import Hex, HexType, Tile
+from intents import follow
+
+
+def make_line(length: int) -> SeenTiles:
+    seen_tiles = SeenTiles(dense=True)
+    seen_tiles.update(
+        [Tile(cost=1, q=q, r=0, type=HexType.EMPTY) for q in range(length)], turn=1
+    )
+    return seen_tiles
+
+
+def test_follow_keeps_the_rest_of_the_path():
+    seen_tiles = make_line(8)
+    full_path = [Hex(q, 0) for q in range(8)]
+    intent = follow(full_path, full_path[1:3], seen_tiles, turn=1)
+    assert intent.path == full_path[2:]
+    assert intent.goal == Hex(7, 0)
+    # arriving or leaving the path leaves nothing to follow
+    assert follow(full_path, full_path[1:], seen_tiles, turn=1) is None
+    assert follow(full_path, [Hex(2, 1)], seen_tiles, turn=1) is None
+
+
+def test_intent_breaks():
+    seen_tiles = make_line(8)
+    full_path = [Hex(q, 0) for q in range(8)]
+    intent = follow(full_path, full_path[1:3], seen_tiles, turn=1)
+    goal = {Hex(7, 0)}
+    assert intent.valid(Hex(2, 0), goal, set(), seen_tiles)
+    # the ant did not get where it was sent
+    assert not intent.valid(Hex(1, 0), goal, set(), seen_tiles)
+    # the goal is gone
+    assert not intent.valid(Hex(2, 0), {Hex(6, 0)}, set(), seen_tiles)
+    # another ant claimed a hex on the way
+    assert not intent.valid(Hex(2, 0), goal, {Hex(5, 0)}, seen_tiles)
+    # new tiles elsewhere leave it alone, a changed tile on the way does not
+    seen_tiles.update([Tile(cost=1, q=0, r=1, type=HexType.EMPTY)], turn=2)
+    assert intent.valid(Hex(2, 0), goal, set(), seen_tiles)
+    seen_tiles.update([Tile(cost=1, q=5, r=0, type=HexType.STONE)], turn=3)
+    assert not intent.valid(Hex(2, 0), goal, set(), seen_tiles)
+
+
+def test_intent_keeps_the_target_of_a_partial_path():
+    seen_tiles = make_line(8)
+    # refined up to a cluster entrance on the way to (7, 0)
+    partial_path = [Hex(q, 0) for q in range(5)]
+    intent = follow(partial_path, partial_path[1:3], seen_tiles, 1, Hex(7, 0))
+    assert intent.path == partial_path[2:]
+    assert intent.goal == Hex(7, 0)
+    assert intent.valid(Hex(2, 0), {Hex(7, 0)}, set(), seen_tiles)
+    assert not intent.valid(Hex(2, 0), {Hex(4, 0)}, set(), seen_tiles)
@@ -0,0 +1,51 @@
+from data_structs import SeenTiles
+from game_types import Hex, HexType, Tile
+from map_store import GROWTH, MapStore, read_tiles
+from replay import load_seen_tiles
+
+
+def links(graph) -> set[tuple[Hex, int, Hex]]:
+    hexes = graph.hexes
+    return {(hexes[i // 6], i % 6, hexes[n]) for i, n in enumerate(graph.adj) if n >= 0}
+
+
+def test_store_writes_through_and_reopens(tmp_path):
+    path = str(tmp_path / "realm@map.store")
+    seen = SeenTiles(dense=True)
+    store = MapStore(path)
+    store.attach(seen)
+    seen.update([Tile(cost=1, q=q, r=0, type=HexType.EMPTY) for q in range(5)], 1)
+    seen.update([Tile(cost=1, q=2, r=0, type=HexType.STONE)], 2)
+    # a crashed bot never closes its store, the records are already there
+    reopened = MapStore(path, readonly=True)
+    assert len(reopened) == 5
+    assert (
+        reopened.records["type"].tolist()
+        == [HexType.EMPTY] * 2 + [HexType.STONE] + [HexType.EMPTY] * 2
+    )
+    assert reopened.records["turn"].tolist() == [1, 1, 2, 1, 1]
+    reopened.close()
+    store.close()
+
+    restarted = SeenTiles(dense=True)
+    MapStore(path).attach(restarted)
+    assert restarted == seen
+    assert restarted.of_type(HexType.STONE) == {Hex(2, 0)}
+    # restored in one batch, as if seen tile by tile
+    assert restarted.changed_turn == seen.changed_turn
+    assert links(restarted.graph) == links(seen.graph)
+
+
+def test_store_grows_past_its_capacity(tmp_path):
+    path = str(tmp_path / "big.store")
+    store = MapStore(path)
+    tiles = [
+        Tile(cost=1, q=q, r=r, type=HexType.DIRT)
+        for q in range(-40, 40)
+        for r in range(GROWTH // 60)
+    ]
+    store.write((tile, 7) for tile in tiles)
+    assert len(store) == len(tiles) > GROWTH
+    store.close()
+    assert read_tiles(path) == tiles
+    assert len(load_seen_tiles(path)) == len(tiles)
@@ -0,0 +1,109 @@
+import random
+import time
+from concurrent.futures import Executor, Future
+
+from data_structs import SeenTiles
+from game_types import Hex, HexType, Tile
+from parallel import (
+    AntJob,
+    ParallelPlanner,
+    Target,
+    TurnTargets,
+    group_ants,
+    plan_group,
+)
+
+
+def make_map(size: int, seed: int, stone: int = 10) -> list[Tile]:
+    rng = random.Random(seed)
+    types = [HexType.EMPTY, HexType.DIRT, HexType.STONE]
+    return [
+        Tile(cost=1, q=q, r=r, type=rng.choices(types, [90 - stone, 10, stone])[0])
+        for q in range(size)
+        for r in range(size)
+    ]
+
+
+def random_jobs(seen_tiles: SeenTiles, n: int, seed: int) -> list[AntJob]:
+    rng = random.Random(seed)
+    free = sorted(
+        (h for h, t in seen_tiles.items() if t.type != HexType.STONE),
+        key=lambda h: (h.q, h.r),
+    )
+    return [
+        AntJob(f"ant-{i}", h.q, h.r, rng.choice([Target.FOOD, Target.ENEMY]))
+        for i, h in enumerate(rng.sample(free, n))
+    ]
+
+
+def test_group_claims_targets_in_order():
+    seen_tiles = SeenTiles(dense=True)
+    seen_tiles.update(make_map(10, seed=0, stone=0))
+    food = [Hex(5, 5), Hex(5, 8)]
+    jobs = [
+        AntJob("a", 4, 5, Target.FOOD),
+        AntJob("b", 4, 5, Target.FOOD),
+        AntJob("c", 4, 5, Target.GOAL, Hex(5, 5)),
+    ]
+    paths = plan_group(seen_tiles, jobs, TurnTargets.of([], [], food, []))
+    assert paths["a"][-1] == (5, 5)
+    assert paths["b"][-1] == (5, 8)
+    # the goal is claimed and every other food too
+    assert paths["c"] == []
+
+
+def test_pool_plans_like_one_process():
+    tiles = make_map(40, seed=1)
+    seen_tiles = SeenTiles(dense=True)
+    planner = ParallelPlanner(seen_tiles, workers=2)
+    try:
+        seen_tiles.update(tiles[: len(tiles) // 2])
+        for turn in range(2):
+            jobs = random_jobs(seen_tiles, 30, seed=turn)
+            free = [h for h, t in seen_tiles.items() if t.type != HexType.STONE]
+            rng = random.Random(turn)
+            targets = TurnTargets.of(
+                [], rng.sample(free, 20), rng.sample(free, 15), rng.sample(free, 5)
+            )
+            expected = {}
+            for group in group_ants(jobs):
+                expected.update(plan_group(seen_tiles, group, targets))
+            paths = planner.plan(jobs, targets)
+            assert {a: [(h.q, h.r) for h in p] for a, p in paths.items()} == expected
+            # the workers pick up the rest of the map on the next turn
+            seen_tiles.update(tiles)
+    finally:
+        planner.close()
+
+
+class StalledPool(Executor):
+    """Runs every task in place but the first, which never finishes."""
+
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, fn, /, *args, **kwargs):
+        self.submitted += 1
+        future = Future()
+        if self.submitted > 1:
+            future.set_result(fn(*args, **kwargs))
+        return future
+
+
+def test_stalled_worker_leaves_its_ants_out():
+    seen_tiles = SeenTiles(dense=True)
+    seen_tiles.update(make_map(40, seed=2, stone=0))
+    planner = ParallelPlanner(seen_tiles, workers=2)
+    planner.pool = StalledPool()
+    try:
+        jobs = random_jobs(seen_tiles, 30, seed=0)
+        targets = TurnTargets.of([], [], [Hex(20, 20)], [Hex(5, 5)])
+        started = time.monotonic()
+        paths = planner.plan(jobs, targets, timeout=0.2)
+        assert time.monotonic() - started < 1
+        # the second worker's groups are planned, the first one's are not
+        groups = group_ants(jobs)
+        second = {job.ant_id for group in groups[1::2] for job in group}
+        assert set(paths) == second
+    finally:
+        planner.close()
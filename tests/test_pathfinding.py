@@ -0,0 +1,209 @@
+import random
+
+from data_structs import FrontierIndex, SeenTiles
+from game_types import Ant, Food, Hex, HexType, Tile, UnitType
+from pathfinding import (
+    DistanceField,
+    PathTruncator,
+    ReachEnvelope,
+    bfs_to_frontier,
+    bfs_to_nearest_unexplored,
+    find_min_cost_path_to_any,
+    tile_cost,
+)
+
+
+def make_ant(q: int, r: int, type: UnitType = UnitType.WORKER) -> Ant:
+    return Ant(
+        food=Food(amount=1, type=1),
+        health=100,
+        id="ant",
+        lastAttack=None,
+        lastEnemyAnt=None,
+        q=q,
+        r=r,
+        type=type,
+    )
+
+
+def make_grid(
+    width: int,
+    height: int,
+    types: dict[Hex, HexType] | None = None,
+    dense: bool = False,
+    packed: bool = False,
+) -> SeenTiles:
+    types = types or {}
+    seen_tiles = SeenTiles(dense=dense, packed=packed)
+    seen_tiles.update(
+        [
+            Tile(cost=1, q=q, r=r, type=types.get(Hex(q, r), HexType.EMPTY))
+            for q in range(width)
+            for r in range(height)
+        ]
+    )
+    return seen_tiles
+
+
+def path_cost(seen_tiles: SeenTiles, path: list[Hex]) -> int:
+    return sum(tile_cost(seen_tiles[h]) for h in path[1:])
+
+
+def test_distance_field_matches_per_ant_search():
+    types = {
+        Hex(3, 0): HexType.STONE,
+        Hex(3, 1): HexType.STONE,
+        Hex(3, 2): HexType.STONE,
+        Hex(2, 4): HexType.DIRT,
+        Hex(4, 4): HexType.ACID,
+    }
+    seen_tiles = make_grid(8, 8, types)
+    home = [Hex(0, 0), Hex(1, 0)]
+    field = DistanceField(home, seen_tiles, set())
+    for start in [Hex(7, 7), Hex(5, 1), Hex(2, 6), Hex(6, 0)]:
+        expected = find_min_cost_path_to_any(start, set(home), seen_tiles, set())
+        path = field.path_from(start)
+        assert path[0] == start
+        assert path[-1] in home
+        assert field.cost_from(start) == path_cost(seen_tiles, expected)
+        assert path_cost(seen_tiles, path) == path_cost(seen_tiles, expected)
+
+
+def test_distance_field_blocked_start_and_unreachable():
+    types = {Hex(5, 5): HexType.STONE}
+    seen_tiles = make_grid(4, 4, types)
+    field = DistanceField([Hex(0, 0)], seen_tiles, blocked={Hex(2, 2)})
+    # blocked start still finds its way out through a neighbor
+    path = field.path_from(Hex(2, 2))
+    assert path[0] == Hex(2, 2)
+    assert path[-1] == Hex(0, 0)
+    assert Hex(2, 2) not in path[1:]
+    # hex outside the seen map is unreachable
+    assert field.path_from(Hex(10, 10)) == []
+
+
+def test_distance_field_stop_at_settles_requested_hexes():
+    seen_tiles = make_grid(20, 20)
+    field = DistanceField([Hex(0, 0)], seen_tiles, set(), stop_at={Hex(2, 2)})
+    assert field.cost_from(Hex(2, 2)) == 3
+    assert field.result.expanded < len(seen_tiles)
+
+
+def test_path_truncator_consumes_distance_field():
+    seen_tiles = make_grid(10, 1)
+    field = DistanceField([Hex(0, 0)], seen_tiles, set())
+    truncator = PathTruncator(seen_tiles, set())
+    truncated = truncator.truncate(make_ant(9, 0), field)
+    assert truncated == [Hex(8, 0), Hex(7, 0), Hex(6, 0), Hex(5, 0), Hex(4, 0)]
+    # the field does not know this turn's claims, the caller searches around them
+    truncator = PathTruncator(seen_tiles, {Hex(8, 0)})
+    assert truncator.truncate(make_ant(9, 0), field) == []
+    assert truncator.truncate(make_ant(9, 0), [Hex(9, 0), Hex(8, 0)]) == []
+
+
+def test_reach_envelope_uses_tile_costs():
+    types = {Hex(1, 0): HexType.ACID, Hex(2, 0): HexType.DIRT}
+    seen_tiles = make_grid(6, 1, types, dense=True)
+    envelope = ReachEnvelope(Hex(0, 0), 5, seen_tiles)
+    # acid costs as much here as in every other search
+    assert envelope.cost(Hex(1, 0)) == 3
+    assert envelope.cost(Hex(2, 0)) == 5
+    assert Hex(3, 0) not in envelope
+    assert envelope.hexes() == [Hex(1, 0), Hex(2, 0)]
+    assert envelope.first_steps() == [Hex(1, 0)]
+    assert envelope.path_to(Hex(2, 0)) == [Hex(1, 0), Hex(2, 0)]
+    assert envelope.path_to(Hex(2, 0), avoid={Hex(1, 0)}) == []
+
+
+def random_types(width: int, height: int, seed: int) -> dict[Hex, HexType]:
+    rng = random.Random(seed)
+    kinds = [HexType.EMPTY] * 6 + [HexType.DIRT, HexType.ACID, HexType.STONE]
+    return {Hex(q, r): rng.choice(kinds) for q in range(width) for r in range(height)}
+
+
+def test_dense_searches_match_dict_searches():
+    for seed in range(5):
+        types = random_types(15, 15, seed)
+        sparse = make_grid(15, 15, types)
+        dense = make_grid(15, 15, types, dense=True)
+        rng = random.Random(seed)
+        passable = [h for h, t in types.items() if t != HexType.STONE]
+        start = rng.choice(passable)
+        targets = set(rng.sample(passable, 5))
+        taken = set(rng.sample(passable, 20)) - {start}
+
+        assert find_min_cost_path_to_any(
+            start, targets, dense, taken
+        ) == find_min_cost_path_to_any(start, targets, sparse, taken)
+        assert bfs_to_nearest_unexplored(
+            start, targets, set(), dense
+        ) == bfs_to_nearest_unexplored(start, targets, set(), sparse)
+        assert (
+            ReachEnvelope(start, 7, dense).hexes()
+            == ReachEnvelope(start, 7, sparse).hexes()
+        )
+
+
+def test_packed_searches_match_dict_searches():
+    for seed in range(5):
+        types = random_types(15, 15, seed)
+        sparse = make_grid(15, 15, types)
+        packed = make_grid(15, 15, types, packed=True)
+        rng = random.Random(seed)
+        passable = [h for h, t in types.items() if t != HexType.STONE]
+        start = rng.choice(passable)
+        targets = set(rng.sample(passable, 5))
+        taken = set(rng.sample(passable, 20)) - {start}
+
+        for astar in (False, True):
+            assert find_min_cost_path_to_any(
+                start, targets, packed, taken, astar=astar
+            ) == find_min_cost_path_to_any(start, targets, sparse, taken, astar=astar)
+        field = DistanceField(targets, packed, taken)
+        expected = DistanceField(targets, sparse, taken)
+        for hex_ in passable:
+            assert field.cost_from(hex_) == expected.cost_from(hex_)
+        assert ReachEnvelope(start, 7, packed).hexes() == (
+            ReachEnvelope(start, 7, sparse).hexes()
+        )
+
+
+def test_astar_matches_dijkstra_costs():
+    for seed in range(10):
+        types = random_types(20, 20, seed)
+        seen_tiles = make_grid(20, 20, types, dense=seed % 2 == 0)
+        rng = random.Random(seed)
+        passable = [h for h, t in types.items() if t != HexType.STONE]
+        start = rng.choice(passable)
+        taken = set(rng.sample(passable, 10)) - {start}
+        # one target, a handful, and enough to use the bounding region
+        for n_targets in (1, 3, 30):
+            targets = set(rng.sample(passable, n_targets))
+            dijkstra = find_min_cost_path_to_any(start, targets, seen_tiles, taken)
+            astar = find_min_cost_path_to_any(
+                start, targets, seen_tiles, taken, astar=True
+            )
+            assert path_cost(seen_tiles, astar) == path_cost(seen_tiles, dijkstra)
+            assert bool(astar) == bool(dijkstra)
+            if astar:
+                assert astar[-1] in targets
+
+
+def test_bfs_to_frontier_matches_unexplored_search():
+    for dense, packed in ((False, False), (True, False), (False, True)):
+        types = random_types(15, 15, 1)
+        seen_tiles = make_grid(15, 15, types, dense=dense, packed=packed)
+        visible = [
+            tile
+            for tile in seen_tiles.values()
+            if 4 <= tile.q < 11 and 4 <= tile.r < 11
+        ]
+        food = {Hex(3, 7), Hex(11, 7)}
+        frontier = FrontierIndex(seen_tiles)
+        frontier.update(visible, food)
+        unexplored = set(types) - set(Hex(t.q, t.r) for t in visible)
+        assert frontier.hexes == unexplored - food
+        start = Hex(7, 7)
+        assert bfs_to_frontier(start, frontier, seen_tiles) == (
+            bfs_to_nearest_unexplored(start, unexplored, food, seen_tiles)
+        )
@@ -0,0 +1,100 @@
+import random
+
+from test_pathfinding import make_grid, path_cost, random_types
+
+from game_types import Hex, HexType, Tile
+from pathfinding import MIN_STEP_COST, find_min_cost_path_to_any
+from replanning import IncrementalPlanner
+
+
+def test_planner_matches_fresh_search():
+    for seed in range(5):
+        types = random_types(20, 20, seed)
+        seen_tiles = make_grid(20, 20, types, dense=True)
+        rng = random.Random(seed)
+        passable = [h for h, t in types.items() if t != HexType.STONE]
+        start, goal = rng.sample(passable, 2)
+        taken = set(rng.sample(passable, 15)) - {start, goal}
+        path = IncrementalPlanner(goal).plan(start, seen_tiles, taken)
+        expected = find_min_cost_path_to_any(start, {goal}, seen_tiles, taken)
+        assert bool(path) == bool(expected)
+        assert path_cost(seen_tiles, path) == path_cost(seen_tiles, expected)
+        if path:
+            assert path[0] == start and path[-1] == goal
+            assert not taken & set(path[1:])
+
+
+def test_planner_repairs_after_moves_and_map_changes():
+    seen_tiles = make_grid(30, 30, dense=True)
+    goal = Hex(28, 15)
+    planner = IncrementalPlanner(goal)
+    start = Hex(1, 15)
+    taken = set()
+    rng = random.Random(0)
+    from_scratch = 0
+    for _ in range(8):
+        path = planner.plan(start, seen_tiles, taken)
+        fresh = IncrementalPlanner(goal)
+        expected = fresh.plan(start, seen_tiles, taken)
+        from_scratch += fresh.expanded
+        assert path_cost(seen_tiles, path) == path_cost(seen_tiles, expected)
+        assert path[-1] == goal
+        start = path[3]
+        # a wall appears across the remaining route and some tiles turn to dirt
+        wall_q = path[6].q
+        seen_tiles.update(
+            [Tile(cost=1, q=wall_q, r=r, type=HexType.STONE) for r in range(8, 22)]
+            + [
+                Tile(
+                    cost=1, q=rng.randrange(30), r=rng.randrange(30), type=HexType.DIRT
+                )
+                for _ in range(5)
+            ]
+        )
+        # claims of other ants move around
+        taken = {Hex(rng.randrange(30), rng.randrange(30)) for _ in range(10)}
+        taken -= {start, goal}
+    assert planner.expanded < from_scratch
+
+
+def test_planner_keeps_keys_when_start_moves():
+    seen_tiles = make_grid(20, 20, dense=True)
+    goal = Hex(18, 10)
+    planner = IncrementalPlanner(goal)
+    path = planner.plan(Hex(1, 10), seen_tiles, set())
+    assert planner.km == 0
+    start = path[4]
+    path = planner.plan(start, seen_tiles, {Hex(10, 10)})
+    # four steps along a row of empty hexes
+    assert planner.km == 4 * MIN_STEP_COST
+    expected = find_min_cost_path_to_any(start, {goal}, seen_tiles, {Hex(10, 10)})
+    assert path_cost(seen_tiles, path) == path_cost(seen_tiles, expected)
+
+
+def test_planner_handles_new_tiles():
+    seen_tiles = make_grid(10, 10, dense=True)
+    goal = Hex(9, 5)
+    planner = IncrementalPlanner(goal)
+    start = Hex(0, 5)
+    assert planner.plan(start, seen_tiles, set())[-1] == goal
+    # the old route is walled off and only a newly seen row leads around it
+    seen_tiles.update(
+        [Tile(cost=1, q=5, r=r, type=HexType.STONE) for r in range(10)]
+        + [Tile(cost=1, q=q, r=10, type=HexType.EMPTY) for q in range(10)]
+    )
+    path = planner.plan(start, seen_tiles, set())
+    expected = find_min_cost_path_to_any(start, {goal}, seen_tiles, set())
+    assert path[-1] == goal
+    assert path_cost(seen_tiles, path) == path_cost(seen_tiles, expected)
+    assert Hex(5, 10) in path
+
+
+def test_capped_planner_resumes():
+    seen_tiles = make_grid(20, 20, dense=True)
+    goal = Hex(18, 10)
+    planner = IncrementalPlanner(goal)
+    assert planner.plan(Hex(1, 10), seen_tiles, set(), max_expansions=5) == []
+    assert planner.expanded == 5
+    path = planner.plan(Hex(1, 10), seen_tiles, set())
+    expected = find_min_cost_path_to_any(Hex(1, 10), {goal}, seen_tiles, set())
+    assert path_cost(seen_tiles, path) == path_cost(seen_tiles, expected)
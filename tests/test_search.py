@@ -0,0 +1,42 @@
+from search import best_first_search
+
+
+def line_graph(n: int):
+    """0 - 1 - 2 - ... - n-1, stepping onto node i costs i % 3 + 1."""
+
+    def expand(node: int):
+        for neighbor in (node - 1, node + 1):
+            if 0 <= neighbor < n:
+                yield neighbor, neighbor % 3 + 1
+
+    return expand
+
+
+def test_best_first_search_rebuilds_goal_path():
+    result = best_first_search([0], line_graph(10), is_goal=lambda n: n == 4)
+    assert result.goal == 4
+    assert result.path() == [0, 1, 2, 3, 4]
+    assert result.dist[4] == 2 + 3 + 1 + 2
+    assert result.parent[4] == 3
+
+
+def test_best_first_search_multi_source():
+    result = best_first_search([0, 9], line_graph(10), is_goal=lambda n: n == 7)
+    assert result.path() == [9, 8, 7]
+
+
+def test_best_first_search_max_cost_bounds_reached_set():
+    result = best_first_search([0], line_graph(10), max_cost=6)
+    assert result.goal is None
+    assert set(result.dist) == {0, 1, 2, 3}
+    assert result.path() == []
+
+
+def test_best_first_search_expansion_budget():
+    result = best_first_search(
+        [0], line_graph(100), is_goal=lambda n: n == 99, max_expansions=10
+    )
+    assert result.goal is None
+    assert result.out_of_budget
+    assert result.expanded == 10
+    assert result.path_to(5) == [0, 1, 2, 3, 4, 5]
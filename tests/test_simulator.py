@@ -0,0 +1,174 @@
+import contextlib
+import io
+
+from ai import AI
+from game_types import (
+    FOOD_TYPE_STATS,
+    UNIT_TYPE_STATS,
+    AntMoveCommand,
+    FoodOnMap,
+    FoodType,
+    Hex,
+    HexType,
+    PlayerMoveCommands,
+    UnitType,
+)
+from simulator import ACID_DAMAGE, HILL_DAMAGE, SUPPORT_BONUS, Game, Unit, play
+
+
+def make_game(size: int = 20, types: dict = None, food: dict = None) -> Game:
+    """Two players on an empty map, no units yet."""
+    tiles = {Hex(q, r): HexType.EMPTY for q in range(size) for r in range(size)}
+    tiles.update(types or {})
+    homes = [[Hex(1, 1)], [Hex(size - 2, size - 2)]]
+    for home in homes:
+        tiles[home[0]] = HexType.ANTHILL
+    game = Game(tiles, homes, food, seed=0)
+    game.units.clear()
+    return game
+
+
+def add_unit(game: Game, id: str, player: int, type: UnitType, q: int, r: int) -> Unit:
+    unit = Unit(id, player, type, q, r, UNIT_TYPE_STATS[type].health)
+    game.units[id] = unit
+    return unit
+
+
+def move(ant: str, *path: Hex) -> PlayerMoveCommands:
+    return PlayerMoveCommands(moves=[AntMoveCommand(ant=ant, path=list(path))])
+
+
+def test_moves_stop_before_blocked_hexes():
+    game = make_game()
+    worker = add_unit(game, "w", 0, UnitType.WORKER, 5, 5)
+    add_unit(game, "w2", 0, UnitType.WORKER, 7, 5)
+    game.step({0: move("w", Hex(6, 5), Hex(7, 5), Hex(8, 5))})
+    # a friendly unit of the same type blocks the way
+    assert worker.hex == Hex(6, 5)
+    assert worker.last_move == [Hex(6, 5)]
+    # and so does an enemy
+    fighter = add_unit(game, "f", 0, UnitType.FIGHTER, 7, 6)
+    add_unit(game, "e", 1, UnitType.SCOUT, 9, 5)
+    game.step({0: move("f", Hex(8, 6), Hex(8, 5), Hex(9, 5))})
+    assert fighter.hex == Hex(8, 5)
+
+
+def test_move_points():
+    game = make_game(types={Hex(q, 5): HexType.DIRT for q in range(6, 9)})
+    add_unit(game, "w", 0, UnitType.WORKER, 5, 5)
+    # three dirt hexes cost 6 points, a worker has 5
+    game.step({0: move("w", Hex(6, 5), Hex(7, 5), Hex(8, 5))})
+    assert game.units["w"].hex == Hex(5, 5)
+    assert game.players[0].errors
+    # a hex that is not next to the last one
+    game.step({0: move("w", Hex(7, 5))})
+    assert game.units["w"].hex == Hex(5, 5)
+    game.step({0: move("w", Hex(6, 5), Hex(7, 5))})
+    assert game.units["w"].hex == Hex(7, 5)
+    assert not game.players[0].errors
+
+
+def test_acid_and_combat():
+    game = make_game(types={Hex(6, 5): HexType.ACID})
+    worker = add_unit(game, "w", 0, UnitType.WORKER, 5, 5)
+    game.step({0: move("w", Hex(6, 5))})
+    assert worker.health == UNIT_TYPE_STATS[UnitType.WORKER].health - ACID_DAMAGE
+
+    game = make_game()
+    fighter = add_unit(game, "f", 0, UnitType.FIGHTER, 10, 10)
+    enemy = add_unit(game, "e", 1, UnitType.FIGHTER, 11, 10)
+    game.step({})
+    attack = UNIT_TYPE_STATS[UnitType.FIGHTER].attack
+    assert fighter.health == enemy.health == 180 - attack
+    # an ally next to both adds the support bonus
+    add_unit(game, "s", 0, UnitType.SCOUT, 10, 9)
+    game.units["e"].health = 1000
+    game.step({})
+    scout_attack = UNIT_TYPE_STATS[UnitType.SCOUT].attack
+    expected = 1000 - (attack + scout_attack) * (1 + SUPPORT_BONUS)
+    assert enemy.health == expected
+    assert fighter.last_enemy == "e"
+
+
+def test_units_fight_where_they_end_the_turn():
+    game = make_game()
+    fighter = add_unit(game, "f", 0, UnitType.FIGHTER, 8, 10)
+    enemy = add_unit(game, "e", 1, UnitType.FIGHTER, 11, 10)
+    game.step({0: move("f", Hex(9, 10), Hex(10, 10))})
+    assert fighter.hex == Hex(10, 10)
+    attack = UNIT_TYPE_STATS[UnitType.FIGHTER].attack
+    assert fighter.health == enemy.health == 180 - attack
+    assert fighter.last_enemy == "e"
+
+
+def test_anthill_hits_enemies():
+    game = make_game()
+    enemy = add_unit(game, "e", 1, UnitType.FIGHTER, 2, 2)
+    own = add_unit(game, "o", 0, UnitType.WORKER, 3, 1)
+    game.step({})
+    assert enemy.health == UNIT_TYPE_STATS[UnitType.FIGHTER].health - HILL_DAMAGE
+    assert own.health == UNIT_TYPE_STATS[UnitType.WORKER].health
+
+
+def test_overlapping_anthills_hit_once():
+    tiles = {Hex(q, r): HexType.EMPTY for q in range(12) for r in range(12)}
+    homes = [[Hex(5, 5)], [Hex(1, 1)], [Hex(9, 5)]]
+    for home in homes:
+        tiles[home[0]] = HexType.ANTHILL
+    game = Game(tiles, homes, seed=0)
+    game.units.clear()
+    # within reach of both enemy anthills
+    unit = add_unit(game, "u", 1, UnitType.FIGHTER, 7, 5)
+    assert game.hill_zone[unit.hex] == {0, 2}
+    game.step({})
+    assert unit.health == UNIT_TYPE_STATS[UnitType.FIGHTER].health - HILL_DAMAGE
+
+
+def test_food_pickup_and_deposit():
+    food = {Hex(3, 1): FoodOnMap(amount=12, q=3, r=1, type=FoodType.BREAD)}
+    game = make_game(food=food)
+    worker = add_unit(game, "w", 0, UnitType.WORKER, 4, 1)
+    game.step({0: move("w", Hex(3, 1))})
+    assert (worker.food_type, worker.food_amount) == (FoodType.BREAD, 8)
+    assert game.food[Hex(3, 1)].amount == 4
+    game.step({0: move("w", Hex(2, 1), Hex(1, 1))})
+    assert worker.food_amount == 0
+    assert game.players[0].score == 8 * FOOD_TYPE_STATS[FoodType.BREAD].calories
+    # a killed unit drops what it carried
+    worker.food_type, worker.food_amount = FoodType.APPLE, 5
+    game._hurt(worker, 1000)
+    assert game.food[Hex(1, 1)].amount == 5
+
+
+def test_spawn_skips_an_occupied_spot():
+    game = make_game()
+    for i, unit_type in enumerate(UnitType):
+        add_unit(game, f"u{i}", 0, unit_type, 1, 1)
+    game.step({})
+    assert len(game.units_of(0)) == 3
+    assert len(game.units_of(1)) == 1
+
+
+def test_visibility_along_the_path():
+    game = make_game(size=30)
+    add_unit(game, "s", 0, UnitType.SCOUT, 10, 10)
+    game.step({0: move("s", *[Hex(q, 10) for q in range(11, 18)])})
+    visible = game.visible(0)
+    assert Hex(7, 10) in visible
+    assert Hex(21, 10) in visible
+    assert Hex(6, 10) not in visible
+    # the spot sees around it
+    assert Hex(2, 2) in visible
+    enemy = add_unit(game, "e", 1, UnitType.WORKER, 20, 10)
+    response = game.response(0)
+    assert [e.health for e in response.enemies] == [enemy.health]
+    assert "s" in [ant.id for ant in response.ants]
+
+
+def test_plays_with_the_ai():
+    game = Game.generate(players=2, size=40, seed=1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        play(game, [AI(), AI()], turns=5)
+    assert game.turn == 5
+    assert all(not player.errors for player in game.players)
+    assert all(len(game.units_of(p)) > 3 for p in range(2))
@@ -0,0 +1,50 @@
+import random
+
+from game_types import Hex
+from hex import distance, pack
+from spatial import SpatialIndex
+
+
+def random_index(seed: int, n: int) -> tuple[SpatialIndex, list[Hex]]:
+    rng = random.Random(seed)
+    hexes = list({Hex(rng.randint(-40, 40), rng.randint(-40, 40)) for _ in range(n)})
+    index = SpatialIndex(bucket_size=5)
+    for h in hexes:
+        index.add(h, h.q, h.r)
+    return index, hexes
+
+
+def test_within_matches_brute_force():
+    index, hexes = random_index(0, 400)
+    rng = random.Random(1)
+    for _ in range(50):
+        center = Hex(rng.randint(-45, 45), rng.randint(-45, 45))
+        radius = rng.randint(0, 12)
+        expected = {h for h in hexes if distance(center, h) <= radius}
+        assert set(index.within(center, radius)) == expected
+
+
+def test_nearest_matches_brute_force():
+    index, hexes = random_index(2, 300)
+    rng = random.Random(3)
+    for _ in range(50):
+        center = Hex(rng.randint(-60, 60), rng.randint(-60, 60))
+        k = rng.randint(1, 10)
+        found = index.nearest(center, k)
+        expected = sorted(distance(center, h) for h in hexes)[:k]
+        assert [distance(center, h) for h in found] == expected
+    assert len(index.nearest(Hex(0, 0), 1000)) == len(hexes)
+
+
+def test_add_moves_and_remove_forgets():
+    index = SpatialIndex(bucket_size=4)
+    index.add("enemy", 0, 0)
+    index.add("enemy", 20, 20)
+    assert index.within(Hex(0, 0), 3) == []
+    assert index.within(Hex(20, 20), 0) == ["enemy"]
+    index.remove("enemy")
+    index.remove("enemy")
+    assert len(index) == 0 and not index.buckets
+    # keys are opaque, e.g. packed hexes
+    index.add(pack(3, 3), 3, 3)
+    assert index.nearest(Hex(0, 0), 1) == [pack(3, 3)]
@@ -0,0 +1,93 @@
+import random
+
+from data_structs import SeenTiles
+from game_types import UNIT_TYPE_STATS, Food, Hex, HexType, PlayerEnemy, Tile, UnitType
+from hex import distance
+from pathfinding import ReachEnvelope, find_safest_path
+from threat import (
+    HILL_BONUS,
+    HILL_DAMAGE,
+    HILL_RADIUS,
+    REACH_WEIGHT,
+    REMEMBERED_WEIGHT,
+    ThreatMap,
+)
+
+
+def make_enemy(q: int, r: int, type: UnitType, attack: int = 70) -> PlayerEnemy:
+    return PlayerEnemy(
+        attack=attack, food=Food(amount=0, type=0), health=100, q=q, r=r, type=type
+    )
+
+
+def test_fighter_threat_by_distance():
+    threat = ThreatMap.build([make_enemy(10, 10, UnitType.FIGHTER)])
+    reach = UNIT_TYPE_STATS[UnitType.FIGHTER].speed + 1
+    assert threat.damage(Hex(10, 10)) == 70
+    assert threat.damage(Hex(11, 10)) == 70
+    assert threat.damage(Hex(10 + reach, 10)) == 70 * REACH_WEIGHT
+    assert threat.damage(Hex(11 + reach, 10)) == 0
+    assert threat.damage(Hex(-100, 3)) == 0
+
+
+def test_remembered_enemies_and_hills():
+    hills = [Hex(0, 0), Hex(1, 0)]
+    threat = ThreatMap.build(
+        [], [make_enemy(20, 20, UnitType.WORKER, attack=30)], hills
+    )
+    assert threat.damage(Hex(20, 21)) == 30 * REMEMBERED_WEIGHT
+    # two hill hexes in range still hit once
+    assert threat.damage(Hex(1, 1)) == HILL_DAMAGE
+    assert threat.damage(Hex(4, 0)) == 0
+    # an enemy next to its hill hits harder
+    threat = ThreatMap.build([make_enemy(2, 0, UnitType.WORKER, attack=30)], [], hills)
+    assert threat.damage(Hex(3, 0)) == 30 * HILL_BONUS + HILL_DAMAGE
+
+
+def test_threat_matches_brute_force():
+    rng = random.Random(0)
+    enemies = [
+        make_enemy(
+            rng.randint(-20, 20), rng.randint(-20, 20), rng.choice(list(UnitType))
+        )
+        for _ in range(15)
+    ]
+    remembered = enemies[10:]
+    enemies = enemies[:10]
+    hills = [Hex(rng.randint(-20, 20), rng.randint(-20, 20)) for _ in range(3)]
+    threat = ThreatMap.build(enemies, remembered, hills)
+
+    def expected(h: Hex) -> float:
+        total = 0.0
+        for enemy, weight in [(e, 1.0) for e in enemies] + [
+            (e, REMEMBERED_WEIGHT) for e in remembered
+        ]:
+            e_hex = Hex(enemy.q, enemy.r)
+            attack = enemy.attack * weight
+            if any(distance(e_hex, hill) <= HILL_RADIUS for hill in hills):
+                attack *= HILL_BONUS
+            d = distance(e_hex, h)
+            if d <= 1:
+                total += attack
+            elif d <= UNIT_TYPE_STATS[enemy.type].speed + 1:
+                total += attack * REACH_WEIGHT
+        if any(distance(h, hill) <= HILL_RADIUS for hill in hills):
+            total += HILL_DAMAGE
+        return total
+
+    for q in range(-30, 31):
+        for r in range(-30, 31):
+            assert abs(threat.damage(Hex(q, r)) - expected(Hex(q, r))) < 1e-9
+
+
+def test_safest_path_leaves_the_threat():
+    seen_tiles = SeenTiles()
+    seen_tiles.update([Tile(cost=1, q=q, r=0, type=HexType.EMPTY) for q in range(20)])
+    threat = ThreatMap.build([make_enemy(2, 0, UnitType.FIGHTER)])
+    envelope = ReachEnvelope(Hex(4, 0), 7, seen_tiles)
+    path = find_safest_path(envelope, threat, set())
+    assert threat.damage(path[-1]) == 0
+    assert path[-1] == Hex(11, 0)
+    # with the way out taken, only the hexes next to the enemy are worse
+    path = find_safest_path(envelope, threat, {Hex(8, 0)})
+    assert threat.damage(path[-1]) == 70 * REACH_WEIGHT
@@ -0,0 +1,61 @@
+import numpy as np
+
+import hex_batch
+from game_types import UNIT_TYPE_STATS, Hex, UnitType
+from hex import distance
+from vision import VIEW_MASKS, revealed_by_path, revealed_keys, score_paths, view_mask
+
+
+def test_masks_match_hex_distance_on_both_parities():
+    for radius in range(5):
+        for center in [Hex(3, 4), Hex(3, 5), Hex(-2, -3)]:
+            coords = hex_batch.as_array([center])
+            seen = hex_batch.to_hexes(coords + view_mask(radius)[center.r & 1])
+            assert len(seen) == len(set(seen)) == 3 * radius * (radius + 1) + 1
+            assert all(distance(center, h) <= radius for h in seen)
+    for unit_type, stats in UNIT_TYPE_STATS.items():
+        assert VIEW_MASKS[unit_type].shape[1] == 3 * stats.view * (stats.view + 1) + 1
+
+
+def test_revealed_by_path_covers_every_step():
+    path = [Hex(0, 0), Hex(1, 0), Hex(1, 1)]
+    revealed = revealed_by_path(path, UnitType.SCOUT)
+    expected = {
+        Hex(q, r)
+        for q in range(-10, 12)
+        for r in range(-10, 12)
+        if any(distance(Hex(q, r), p) <= 4 for p in path)
+    }
+    assert revealed == expected
+
+
+def test_revealed_keys_batches_every_radius():
+    scout = [Hex(0, 0), Hex(1, 0)]
+    worker = [Hex(8, 8)]
+    keys = revealed_keys({4: scout, 1: worker, 2: []})
+    expected = revealed_by_path(scout, UnitType.SCOUT) | {
+        Hex(8, 8),
+        *hex_batch.to_hexes(hex_batch.hex_range(Hex(8, 8), 1)),
+    }
+    assert set(hex_batch.to_hexes(hex_batch.unpack(keys))) == expected
+    assert revealed_keys({}).size == 0
+
+
+def test_score_paths_counts_only_unknown_hexes():
+    known_hexes = [Hex(q, r) for q in range(-5, 6) for r in range(-5, 6)]
+    known = hex_batch.pack(hex_batch.as_array(known_hexes))
+    paths = [
+        [Hex(0, 0)],
+        [Hex(0, 0), Hex(1, 0), Hex(2, 0), Hex(3, 0)],
+        [Hex(0, 0), Hex(0, 1), Hex(0, 2), Hex(0, 3)],
+        [],
+    ]
+    scores = score_paths(paths, UnitType.SCOUT, known)
+    for path, score in zip(paths, scores.tolist()):
+        revealed = revealed_by_path(path, UnitType.SCOUT) if path else set()
+        assert score == len(revealed - set(known_hexes))
+    assert scores[0] == 0 and scores[3] == 0 and scores[1] > 0
+    assert np.array_equal(
+        score_paths(paths, UnitType.SCOUT, np.array([], dtype=np.int64)),
+        [len(revealed_by_path(p, UnitType.SCOUT)) if p else 0 for p in paths],
+    )